@@ -0,0 +1,266 @@
+'''
+address_parser.py
+Splits scraped Maine addresses into street, unit, city, state and ZIP.
+
+The old comma-splitting parser assumed "street, city, state zip" and put
+whatever came second into city, so "506 Main Street, Suite 26A, ME 04092"
+produced city "Suite 26A". This parser works from a gazetteer instead:
+a word trie of Maine municipality and postal place names plus a
+ZIP->city table (gazetteer/maine_gazetteer.json), both loaded once.
+
+An address is tokenized in one pass by a single precompiled pattern into
+ZIPs, unit designators ("Suite 26A", "#4"), words and segment breaks
+(commas, newlines). Tokens are then claimed from the right: ZIP, state,
+then the longest place name that ends a segment and is not the start of
+a street ("Gray Road"). When no such name is found, the city comes from
+the ZIP table. The segment with a house number becomes the street, and
+anything else left over (a building name) is returned as place.
+
+To check accuracy and speed against the labeled fixtures:
+    python address_parser.py --check fixtures/address_fixtures.json
+'''
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+
+GAZETTEER_PATH = Path(__file__).parent / 'gazetteer' / 'maine_gazetteer.json'
+
+TOKEN_RE = re.compile(r"""
+    (?P<sep>[,;\n]+)
+  | (?P<zip>\b\d{5}(?:-\d{4})?\b)
+  | (?P<unit>\#\s*[\w-]+
+      | \b(?:suite|ste|unit|apt|apartment|room|rm|floor|fl|bldg|building)\b\.?\s*\#?\s*[\w-]*\d[\w-]*)
+  | (?P<word>[^\s,;\n#]+)
+""", re.IGNORECASE | re.VERBOSE)
+
+STATES = frozenset(('me', 'maine'))
+
+# A place name followed by one of these is part of a street ("Gray Road")
+STREET_SUFFIXES = frozenset("""
+    alley aly ave avenue blvd boulevard cir circle ct court cove dr drive ext extension hwy highway
+    la lane ln loop pkwy parkway pier pl place plaza point pt rd road route rt rte row sq square st
+    street ter terrace trl trail way wharf
+""".split())
+
+# A segment starting like this is a street even without a house number
+STREET_STARTS = frozenset(('po', 'p.o.', 'route', 'rt', 'rte', 'us', 'state'))
+
+# Spelled-out forms of abbreviations used in place names ("St. George")
+PLACE_ABBREVIATIONS = {'st': 'saint', 'mt': 'mount', 'n': 'north', 's': 'south', 'e': 'east', 'w': 'west',
+                       'no': 'north', 'so': 'south'}
+
+_END = object()
+
+
+def fold_word(word):
+    """A word as the trie stores it: lowercase without periods or apostrophes"""
+    return word.casefold().replace('.', '').replace("'", '').replace('’', '')
+
+
+class Gazetteer:
+    """Maine place names (as a reversed word trie) and the ZIP->city table"""
+
+    def __init__(self, municipalities, zip_cities):
+        self.zip_cities = dict(zip_cities)
+        # Keyed on reversed words, so a name can be matched leftwards from its last word
+        self.trie = {}
+        for name in set(municipalities) | set(self.zip_cities.values()):
+            words = [fold_word(word) for word in name.split()]
+            node = self.trie
+            for word in reversed(words):
+                node = node.setdefault(word, {})
+            node[_END] = name
+
+    @classmethod
+    def load(cls, path=GAZETTEER_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['municipalities'], data['zip_codes'])
+
+    def match_ending_at(self, words, end):
+        """(start, name) of the longest place name that is words[start:end + 1], or None"""
+        node = self.trie
+        found = None
+        for index in range(end, -1, -1):
+            word = words[index]
+            child = node.get(word)
+            if child is None and word in PLACE_ABBREVIATIONS:
+                child = node.get(PLACE_ABBREVIATIONS[word])
+            if child is None:
+                break
+            node = child
+            if _END in node:
+                found = (index, node[_END])
+        return found
+
+
+_gazetteer = None
+
+
+def default_gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer.load()
+    return _gazetteer
+
+
+def tokenize(text):
+    """[(kind, text, segment)] for an address; segment counts comma/newline breaks"""
+    tokens = []
+    segment = 0
+    for match in TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == 'sep':
+            segment += 1
+            continue
+        tokens.append((kind, match.group(), segment))
+    return tokens
+
+
+def parse(text, gazetteer=None):
+    """Components of an address as a dict: street, unit, city, state, zip_code, place.
+
+    Components that are not present are None.
+    """
+    result = {'street': None, 'unit': None, 'city': None, 'state': None, 'zip_code': None, 'place': None}
+    if not text or not text.strip():
+        return result
+    gazetteer = gazetteer or default_gazetteer()
+    tokens = tokenize(text)
+
+    # ZIP: the last 5-digit number that does not start a street ("12345 Main St")
+    for index in range(len(tokens) - 1, -1, -1):
+        if tokens[index][0] == 'zip' and not (index + 1 < len(tokens) and tokens[index + 1][0] == 'word'
+                                              and tokens[index + 1][2] == tokens[index][2]):
+            result['zip_code'] = tokens[index][1][:5]
+            del tokens[index]
+            break
+
+    units = [token for token in tokens if token[0] == 'unit']
+    if units:
+        result['unit'] = ', '.join(' '.join(token[1].split()) for token in units)
+        tokens = [token for token in tokens if token[0] != 'unit']
+    words = [token for token in tokens if token[0] in ('word', 'zip')]
+
+    # State: the last word, if it names Maine
+    if words and fold_word(words[-1][1]) in STATES:
+        result['state'] = 'ME'
+        words.pop()
+
+    # City: the rightmost place name that ends its segment, so "Gray" in "406 Gray Road" never counts
+    folded = [fold_word(token[1]) for token in words]
+    city_span = None
+    for end in range(len(words) - 1, -1, -1):
+        if end + 1 < len(words) and words[end + 1][2] == words[end][2]:
+            # Not the last word of its segment
+            continue
+        match = gazetteer.match_ending_at(folded, end)
+        if match is None:
+            continue
+        start, name = match
+        if any(words[index][2] != words[end][2] for index in range(start, end + 1)):
+            continue
+        if start > 0 and words[start - 1][2] == words[end][2] and folded[start - 1][:1].isdigit() \
+                and start == end:
+            # "12 Portland" is a house number and a street name, not a city
+            continue
+        city_span = (start, end)
+        result['city'] = name
+        break
+    if city_span is None and result['zip_code'] in gazetteer.zip_cities:
+        result['city'] = gazetteer.zip_cities[result['zip_code']]
+    if result['city'] and not result['state']:
+        result['state'] = 'ME'
+
+    # Street: the remaining segment that looks like one; the rest is a place name
+    remaining = [token for index, token in enumerate(words)
+                 if city_span is None or not city_span[0] <= index <= city_span[1]]
+    segments = {}
+    for _, word, segment in remaining:
+        segments.setdefault(segment, []).append(word)
+    street_segment = next((segment for segment, segment_words in segments.items()
+                           if fold_word(segment_words[0])[:1].isdigit()
+                           or fold_word(segment_words[0]) in STREET_STARTS), None)
+    if street_segment is None:
+        street_segment = next((segment for segment, segment_words in segments.items()
+                               if fold_word(segment_words[-1]) in STREET_SUFFIXES), None)
+    if street_segment is None and len(segments) == 1:
+        street_segment = next(iter(segments))
+    if street_segment is not None:
+        result['street'] = ' '.join(segments.pop(street_segment))
+    if segments:
+        result['place'] = ', '.join(' '.join(segment_words) for segment_words in segments.values())
+    return result
+
+
+def parse_address(text, gazetteer=None):
+    """(street, city, state, zip_code) as the scrapers store them.
+
+    A unit ("Suite 26A") stays on the street line, which is what
+    Location.address holds.
+    """
+    parts = parse(text, gazetteer)
+    street = parts['street']
+    if parts['unit']:
+        street = f"{street}, {parts['unit']}" if street else parts['unit']
+    return street, parts['city'], parts['state'], parts['zip_code']
+
+
+def check_fixtures(path, repeat=200):
+    """Field accuracy on labeled fixtures and parse throughput; returns the mismatches"""
+    with open(path, 'r', encoding='utf-8') as f:
+        fixtures = json.load(f)
+    gazetteer = default_gazetteer()
+    fields = ('street', 'unit', 'city', 'state', 'zip_code')
+    correct = dict.fromkeys(fields, 0)
+    mismatches = []
+    for fixture in fixtures:
+        parsed = parse(fixture['address'], gazetteer)
+        wrong = [field for field in fields if parsed[field] != fixture['expected'].get(field)]
+        for field in fields:
+            correct[field] += field not in wrong
+        if wrong:
+            mismatches.append((fixture['address'], {field: (parsed[field], fixture['expected'].get(field))
+                                                    for field in wrong}))
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for fixture in fixtures:
+            parse(fixture['address'], gazetteer)
+    elapsed = time.perf_counter() - started
+    parsed_count = repeat * len(fixtures)
+
+    print(f"{'=' * 60}")
+    print(f"Address Parser Check:")
+    print(f"Fixtures: {len(fixtures)} ({len(fixtures) - len(mismatches)} fully correct)")
+    for field in fields:
+        print(f"  {field}: {correct[field]}/{len(fixtures)} ({correct[field] / len(fixtures):.1%})")
+    for address, wrong in mismatches:
+        print(f"  MISMATCH {address!r}: " + ', '.join(f"{field} got {got!r} expected {expected!r}"
+                                                    for field, (got, expected) in wrong.items()))
+    print(f"Speed: {parsed_count / elapsed:.0f} addresses/sec ({elapsed / parsed_count * 1e6:.1f} us each)")
+    print(f"{'=' * 60}")
+    return mismatches
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Parse Maine addresses with the gazetteer')
+    parser.add_argument('address', nargs='*', help='Addresses to parse')
+    parser.add_argument('--check', metavar='FIXTURES',
+                        help='Report accuracy and speed on a labeled fixture file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.check:
+        mismatches = check_fixtures(args.check)
+        raise SystemExit(1 if mismatches else 0)
+    for address in args.address:
+        print(json.dumps(parse(address)))
+
+
+if __name__ == "__main__":
+    main()
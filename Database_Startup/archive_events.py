@@ -0,0 +1,190 @@
+'''
+archive_events.py
+Moves events older than a cutoff, plus their RSVPs and reviews, from the
+hot tables into Event_archive, RSVP_archive and review_archive.
+
+Work is done in small batches, each in its own short READ COMMITTED
+transaction, so the job never holds locks on Event, RSVP or review for long.
+Favorites on archived events are removed (partitioned
+Event tables have no ON DELETE CASCADE to do it for us).
+
+Run once from cron, e.g. nightly:
+    python archive_events.py --older-than-days 1
+or keep it running and archive every N minutes:
+    python archive_events.py --every 60
+'''
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+
+import mysql.connector
+from mysql.connector import errorcode
+
+from startup import load_config
+
+EVENT_COLUMNS = ('event_id, event_name, event_date, start_time, end_time, max_capacity, '
+                 'organizer_id, location_id, description, view_count')
+RSVP_COLUMNS = 'RSVP_id, RSVP_status, user_id, event_id, status_changed_at'
+REVIEW_COLUMNS = 'review_id, rating, comments, user_id, event_id'
+
+# Lock waits are expected to be rare; give up quickly and retry the batch later
+LOCK_WAIT_TIMEOUT = 5
+MAX_RETRIES = 3
+
+
+def connect(config):
+    connection = mysql.connector.connect(
+        host=config['host'],
+        user=config['user'],
+        password=config['password'],
+        database=config['database']
+    )
+    cursor = connection.cursor()
+    cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+    cursor.execute(f"SET SESSION innodb_lock_wait_timeout = {LOCK_WAIT_TIMEOUT}")
+    cursor.close()
+    return connection
+
+
+def next_batch(cursor, cutoff, batch_size):
+    """Return the ids of the oldest events before cutoff (uses idx_event_date_time)"""
+    cursor.execute(
+        """
+        SELECT event_id FROM Event
+        WHERE event_date < %s
+        ORDER BY event_date, start_time, event_id
+        LIMIT %s
+        """,
+        (cutoff, batch_size)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def archive_batch(connection, event_ids):
+    """Move one batch of events and their RSVPs/reviews in a single transaction"""
+    cursor = connection.cursor()
+    placeholders = ', '.join(['%s'] * len(event_ids))
+    ids = tuple(event_ids)
+
+    try:
+        cursor.execute(
+            f"INSERT IGNORE INTO RSVP_archive ({RSVP_COLUMNS}) "
+            f"SELECT {RSVP_COLUMNS} FROM RSVP WHERE event_id IN ({placeholders})", ids)
+        rsvps = cursor.rowcount
+        cursor.execute(f"DELETE FROM RSVP WHERE event_id IN ({placeholders})", ids)
+
+        cursor.execute(
+            f"INSERT IGNORE INTO review_archive ({REVIEW_COLUMNS}) "
+            f"SELECT {REVIEW_COLUMNS} FROM review WHERE event_id IN ({placeholders})", ids)
+        reviews = cursor.rowcount
+        cursor.execute(f"DELETE FROM review WHERE event_id IN ({placeholders})", ids)
+
+        cursor.execute(f"DELETE FROM UserFavoriteEvent WHERE event_id IN ({placeholders})", ids)
+        cursor.execute(f"DELETE FROM upcoming_event_listing WHERE event_id IN ({placeholders})", ids)
+        cursor.execute(f"DELETE FROM event_capacity WHERE event_id IN ({placeholders})", ids)
+
+        cursor.execute(
+            f"INSERT IGNORE INTO Event_archive ({EVENT_COLUMNS}) "
+            f"SELECT {EVENT_COLUMNS} FROM Event WHERE event_id IN ({placeholders})", ids)
+        cursor.execute(f"DELETE FROM Event WHERE event_id IN ({placeholders})", ids)
+        events = cursor.rowcount
+
+        connection.commit()
+        return events, rsvps, reviews
+    except mysql.connector.Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def archive_past_events(connection, cutoff, batch_size=200, pause=0.2):
+    """Archive every event dated before cutoff, batch by batch"""
+    totals = {'events': 0, 'rsvps': 0, 'reviews': 0, 'batches': 0}
+    retries = 0
+    cursor = connection.cursor()
+
+    while True:
+        event_ids = next_batch(cursor, cutoff, batch_size)
+        connection.commit()  # end the read snapshot before the write transaction
+        if not event_ids:
+            break
+
+        try:
+            events, rsvps, reviews = archive_batch(connection, event_ids)
+        except mysql.connector.Error as e:
+            if e.errno != errorcode.ER_LOCK_WAIT_TIMEOUT or retries >= MAX_RETRIES:
+                raise
+            retries += 1
+            print(f"  Lock wait timeout, retrying batch ({retries}/{MAX_RETRIES})")
+            time.sleep(pause * 10)
+            continue
+
+        retries = 0
+        totals['events'] += events
+        totals['rsvps'] += rsvps
+        totals['reviews'] += reviews
+        totals['batches'] += 1
+        print(f"  Batch {totals['batches']}: archived {events} events, "
+              f"{rsvps} RSVPs, {reviews} reviews")
+
+        # Give the hot tables room between batches
+        time.sleep(pause)
+
+    cursor.close()
+    return totals
+
+
+def run_once(config, older_than_days, batch_size, pause):
+    cutoff = date.today() - timedelta(days=older_than_days)
+    print(f"Archiving events before {cutoff.isoformat()}...")
+
+    connection = connect(config)
+    try:
+        totals = archive_past_events(connection, cutoff, batch_size, pause)
+    finally:
+        connection.close()
+
+    print(f"{'=' * 60}")
+    print(f"Archive Summary:")
+    print(f"Events archived: {totals['events']}")
+    print(f"RSVPs archived: {totals['rsvps']}")
+    print(f"Reviews archived: {totals['reviews']}")
+    print(f"Batches: {totals['batches']}")
+    print(f"{'=' * 60}")
+    return totals
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Archive past events and their RSVPs/reviews')
+    parser.add_argument('--older-than-days', type=int, default=1,
+                        help='Archive events dated more than this many days ago')
+    parser.add_argument('--batch-size', type=int, default=200,
+                        help='Events moved per transaction')
+    parser.add_argument('--pause', type=float, default=0.2,
+                        help='Seconds to sleep between batches')
+    parser.add_argument('--every', type=int, metavar='MINUTES',
+                        help='Keep running and archive every MINUTES')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = load_config()
+
+    while True:
+        try:
+            run_once(config, args.older_than_days, args.batch_size, args.pause)
+        except mysql.connector.Error as e:
+            print(f"Archive failed: {e}")
+            if not args.every:
+                sys.exit(1)
+
+        if not args.every:
+            break
+        time.sleep(args.every * 60)
+
+
+if __name__ == "__main__":
+    main()
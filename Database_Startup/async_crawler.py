@@ -0,0 +1,298 @@
+'''
+async_crawler.py
+Crawls the Maine Public calendar on one asyncio event loop with aiohttp,
+as an alternative to the scraper's thread pool (pipeline.py --engine async).
+
+The thread engine sizes its pool from os.cpu_count(), which says nothing
+about how many requests a web server can take, and paces itself with fixed
+sleeps. Here every listing and detail request instead waits on an
+AdaptiveLimiter, whose limit on requests in flight follows the server:
+
+    slow start        +1 per success (doubling every round trip) until the
+                      first sign of congestion
+    additive increase +1/limit per success (+1 per round trip) after that,
+                      only while the limit is actually in use
+    multiplicative    x0.5 on a 429, or when more than 10% of recent
+    decrease          requests (smoothed) failed with a connection error,
+                      timeout or 5xx; x0.75 when the smoothed latency rises
+                      past twice its baseline (the lowest smoothed latency
+                      seen). At most once per round trip, so a burst
+                      counts as one signal.
+
+The odd failure is retried without slowing the crawl; the rate has to
+climb before the limit comes down.
+
+Listing pages are started one at a time through the same limiter, queued
+behind the detail requests of pages already open, so events come out
+steadily rather than after every listing has loaded. At most OPEN_PAGES
+pages are held at once; a consumer that stops reading stops the crawl.
+HTML is parsed on one worker thread so the event loop keeps servicing
+sockets meanwhile.
+
+A single core can keep hundreds of requests in flight this way, since a
+waiting request costs a coroutine rather than a thread.
+
+Usage:
+    python pipeline.py --engine async --max-concurrency 128
+    python scrape_benchmark.py --engines --pages 20
+'''
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from maine_public_scraper import (HEADERS, REQUEST_TIMEOUT, RETRIES, RETRY_BACKOFF, RETRY_STATUSES,
+                                  create_event_key, page_url, parse_event_details, parse_event_listing,
+                                  save_progress)
+
+INITIAL_CONCURRENCY = 8
+MAX_CONCURRENCY = 256
+# Pages whose events may be waiting for the consumer at once
+OPEN_PAGES = 32
+
+LATENCY_TOLERANCE = 2.0
+LATENCY_BACKOFF = 0.75
+ERROR_BACKOFF = 0.5
+LATENCY_SMOOTHING = 0.1
+ERROR_TOLERANCE = 0.1
+ERROR_SMOOTHING = 0.02
+# Lets the baseline follow a server that has become slower for good
+BASELINE_DRIFT = 0.001
+
+
+class AdaptiveLimiter:
+    """Limits requests in flight, adjusting the limit AIMD-style to latency and errors"""
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, maximum=MAX_CONCURRENCY, minimum=1):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+        self.errors = 0
+        self.decreases = 0
+        self.latency = None
+        self.baseline = None
+        self.error_rate = 0.0
+        self._slow_start = True
+        self._last_decrease = 0.0
+        self._waiters = deque()
+
+    async def acquire(self):
+        """Wait for a free slot and take it"""
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Hand on a wake-up this task will not use
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+
+    def release(self, latency=None, status=200):
+        """Free a slot, adjusting the limit from how the request went.
+
+        status is the HTTP status, or None for a connection error or
+        timeout. latency None (the request was cancelled) leaves the limit
+        as it is.
+        """
+        self.in_flight -= 1
+        if latency is not None:
+            self.requests += 1
+            self._adjust(latency, status)
+        self._wake()
+
+    def _adjust(self, latency, status):
+        failed = status is None or status >= 500
+        self.error_rate += ERROR_SMOOTHING * (failed - self.error_rate)
+        if failed or status == 429:
+            self.errors += 1
+            # A 429 is the server asking outright
+            if status == 429 or self.error_rate > ERROR_TOLERANCE:
+                self._decrease(ERROR_BACKOFF)
+            return
+
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+        if self.baseline is None or self.latency < self.baseline:
+            self.baseline = self.latency
+        else:
+            self.baseline += BASELINE_DRIFT * (self.latency - self.baseline)
+
+        if self.latency > self.baseline * LATENCY_TOLERANCE:
+            self._decrease(LATENCY_BACKOFF)
+        elif self.in_flight + 1 >= int(self.limit):
+            # Only grow a limit that is being used; an idle one says nothing about the server
+            step = 1 if self._slow_start else 1 / self.limit
+            self.limit = min(self.maximum, self.limit + step)
+
+    def _decrease(self, factor):
+        now = time.monotonic()
+        if now - self._last_decrease < (self.latency or 0):
+            return
+        self._last_decrease = now
+        self._slow_start = False
+        self.limit = max(self.minimum, self.limit * factor)
+        self.decreases += 1
+
+    def _wake(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def summary(self):
+        latency = f"{self.latency * 1000:.0f} ms" if self.latency is not None else "n/a"
+        return (f"{self.requests} requests, {self.errors} failed, peak {self.peak} in flight, "
+                f"limit {int(self.limit)} after {self.decreases} decreases, latency {latency}")
+
+
+async def fetch_text(session, limiter, url, held=False):
+    """The page's HTML, or None once the retries are used up.
+
+    held means the caller already took a limiter slot for the first attempt.
+    """
+    error = None
+    for attempt in range(RETRIES + 1):
+        if not held:
+            await limiter.acquire()
+        held = False
+        started = time.perf_counter()
+        try:
+            async with session.get(url) as response:
+                html = await response.text(errors='replace')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            limiter.release(time.perf_counter() - started, status=None)
+            error = str(e) or type(e).__name__
+        except BaseException:
+            limiter.release()
+            raise
+        else:
+            limiter.release(time.perf_counter() - started, response.status)
+            if response.status not in RETRY_STATUSES:
+                return html
+            error = f"HTTP {response.status}"
+
+        if attempt < RETRIES:
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+    print(f"    Error fetching {url}: {error}")
+    return None
+
+
+async def crawl(base_url, start_page, end_page, scrape_details=True, limiter=None):
+    """Yield each unique event of the pages as its page completes"""
+    limiter = limiter or AdaptiveLimiter()
+    loop = asyncio.get_running_loop()
+    parser = ThreadPoolExecutor(max_workers=1, thread_name_prefix='parse')
+    finished = asyncio.Queue()
+    open_pages = asyncio.Semaphore(OPEN_PAGES)
+    seen_event_keys = set()  # Track duplicates across all pages
+    tasks = set()
+
+    num_pages = end_page - start_page + 1
+    detail_status = "with location details" if scrape_details else "without location details"
+    print(f"\n Scraping Strategy:")
+    print(f"   Pages: {num_pages}")
+    print(f"   Engine: asyncio, {int(limiter.limit)} requests in flight to start, adapting up to {limiter.maximum}")
+    print(f"   Mode: {detail_status}\n")
+
+    async def add_details(event):
+        html = await fetch_text(session, limiter, event['url'])
+        if html:
+            location_data = await loop.run_in_executor(parser, parse_event_details, html)
+            if location_data:
+                event.update(location_data)
+
+    async def crawl_page(page_num):
+        # Called holding a limiter slot for the listing request
+        unique_events, duplicates = [], 0
+        try:
+            html = await fetch_text(session, limiter, page_url(base_url, page_num), held=True)
+            events = await loop.run_in_executor(parser, parse_event_listing, html) if html else []
+
+            # Duplicates are dropped before their detail pages are fetched
+            for event in events:
+                event_key = create_event_key(event)
+                if event_key not in seen_event_keys:
+                    seen_event_keys.add(event_key)
+                    unique_events.append(event)
+            duplicates = len(events) - len(unique_events)
+
+            if scrape_details:
+                await asyncio.gather(*(add_details(event) for event in unique_events if event['url']))
+        except Exception as e:
+            print(f"Error processing page {page_num}: {e}\n")
+        finished.put_nowait((page_num, unique_events, duplicates))
+
+    async def start_pages():
+        for page_num in range(start_page, end_page + 1):
+            await open_pages.acquire()
+            await limiter.acquire()
+            task = asyncio.create_task(crawl_page(page_num))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    # The limiter caps connections, so the connector does not
+    connector = aiohttp.TCPConnector(limit=0, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout, connector=connector) as session:
+        starter = asyncio.create_task(start_pages())
+        try:
+            for completed in range(1, num_pages + 1):
+                page_num, events, duplicates = await finished.get()
+                for event in events:
+                    yield event
+                open_pages.release()
+
+                print(f"✓ Page {page_num}: {len(events)} unique events" +
+                      (f" ({duplicates} duplicates filtered)" if duplicates > 0 else "") +
+                      f" [{completed}/{num_pages}, limit {int(limiter.limit)}, {limiter.in_flight} in flight]")
+                # Save progress periodically
+                if events:
+                    save_progress(page_num, events[-1]['url'])
+            print(f"\nCrawl complete: {limiter.summary()}")
+        finally:
+            starter.cancel()
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(starter, *tasks, return_exceptions=True)
+            parser.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pages_async(base_url, start_page, end_page, scrape_details=True, max_concurrency=MAX_CONCURRENCY,
+                     limiter=None):
+    """crawl() as a plain generator, for callers that are not async.
+
+    The event loop runs in its own thread, so the crawl keeps going while
+    the caller works on an event. Closing the generator early cancels the
+    pages in progress.
+    """
+    limiter = limiter or AdaptiveLimiter(maximum=max_concurrency)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name='crawl', daemon=True)
+    thread.start()
+    events = crawl(base_url, start_page, end_page, scrape_details, limiter)
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(events.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+    finally:
+        asyncio.run_coroutine_threadsafe(events.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -0,0 +1,216 @@
+'''
+build_similarity.py
+Precomputes each event's most similar upcoming events, read by
+/api/events/<id>/similar and /api/recommendations.
+
+Every event becomes a TF-IDF vector over its name and description, held
+in a SciPy sparse matrix with L2-normalized rows, so cosine similarity
+against all upcoming events is one sparse matrix product. Rows are
+multiplied in blocks to bound memory, the top-k neighbours of each event
+are kept, and the result is written to event_similarity_new and swapped
+in with one atomic RENAME.
+
+jsonTOsql.py runs this after every import; to run it by hand:
+    python build_similarity.py --top-k 10
+'''
+import argparse
+import re
+import time
+from datetime import date
+
+import mysql.connector
+import numpy as np
+from scipy import sparse
+
+from startup import load_config
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOP_WORDS = frozenset("""
+    a an and are as at be by for from has in is it its of on or the this to
+    was will with our your you we all new more not can us up out
+""".split())
+
+# Names are short and descriptions often empty, so name terms count double
+NAME_WEIGHT = 2
+
+# Neighbours below this cosine share only an incidental common word
+MIN_SCORE = 0.05
+
+# Bounds the rows x upcoming-events product computed at once
+BLOCK_CELLS = 20_000_000
+
+INSERT_BATCH = 5000
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or '').lower())
+            if len(t) > 1 and t not in STOP_WORDS]
+
+
+def tfidf_matrix(documents):
+    """Sparse TF-IDF matrix (one L2-normalized row per document)"""
+    vocabulary = {}
+    rows, cols = [], []
+    for i, tokens in enumerate(documents):
+        for token in tokens:
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+            rows.append(i)
+
+    n_docs = len(documents)
+    data = np.ones(len(rows), dtype=np.float32)
+    # COO -> CSR sums repeated (row, term) pairs into term counts
+    counts = sparse.coo_matrix((data, (rows, cols)), shape=(n_docs, len(vocabulary))).tocsr()
+    counts.sum_duplicates()
+
+    doc_freq = np.bincount(counts.indices, minlength=len(vocabulary))
+    idf = (np.log((1 + n_docs) / (1 + doc_freq)) + 1).astype(np.float32)
+
+    matrix = counts.copy()
+    matrix.data = (1 + np.log(matrix.data)) * idf[matrix.indices]
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms).dot(matrix).tocsr().astype(np.float32), len(vocabulary)
+
+
+def top_k_neighbours(matrix, names, candidates, k):
+    """Yield (row, [(neighbour row, score), ...]) for every row of matrix.
+
+    Only rows flagged in `candidates` (upcoming events) can be neighbours.
+    Events with the same name as the source, or as a neighbour already
+    taken, are skipped: other dates of one event are not useful
+    suggestions and would crowd out everything else.
+    """
+    candidate_rows = np.flatnonzero(candidates)
+    if len(candidate_rows) == 0:
+        return
+    candidate_t = matrix[candidate_rows].T.tocsc()
+
+    # Over-fetch so dropping same-name copies still leaves k
+    fetch = k * 3
+    block = max(1, BLOCK_CELLS // len(candidate_rows))
+
+    for start in range(0, matrix.shape[0], block):
+        stop = min(start + block, matrix.shape[0])
+        # Stays sparse: only events sharing a term with the row have a score
+        sims = matrix[start:stop].dot(candidate_t).tocsr()
+
+        for offset in range(stop - start):
+            row = start + offset
+            lo, hi = sims.indptr[offset], sims.indptr[offset + 1]
+            scores = sims.data[lo:hi]
+            cols = sims.indices[lo:hi]
+            if len(scores) > fetch:
+                best = np.argpartition(-scores, fetch - 1)[:fetch]
+                scores, cols = scores[best], cols[best]
+            order = np.argsort(-scores, kind='stable')
+
+            seen = {names[row]}
+            neighbours = []
+            for col, score in zip(cols[order], scores[order]):
+                if score < MIN_SCORE or len(neighbours) == k:
+                    break
+                other = candidate_rows[col]
+                if names[other] in seen:
+                    continue
+                seen.add(names[other])
+                neighbours.append((other, float(score)))
+            yield row, neighbours
+
+
+def load_events(cursor):
+    cursor.execute("SELECT event_id, event_name, description, event_date FROM Event ORDER BY event_id")
+    return cursor.fetchall()
+
+
+def write_similarity(connection, rows):
+    """Fill event_similarity_new with rows and swap it in atomically"""
+    cursor = connection.cursor()
+    cursor.execute("DROP TABLE IF EXISTS event_similarity_new")
+    cursor.execute("DROP TABLE IF EXISTS event_similarity_old")
+    cursor.execute("CREATE TABLE event_similarity_new LIKE event_similarity")
+
+    insert = ("INSERT INTO event_similarity_new (event_id, rank_no, similar_event_id, score) "
+              "VALUES (%s, %s, %s, %s)")
+    for i in range(0, len(rows), INSERT_BATCH):
+        cursor.executemany(insert, rows[i:i + INSERT_BATCH])
+    connection.commit()
+
+    cursor.execute("RENAME TABLE event_similarity TO event_similarity_old, "
+                   "event_similarity_new TO event_similarity")
+    cursor.execute("DROP TABLE event_similarity_old")
+    cursor.close()
+
+
+def build_similarity(connection, top_k=10):
+    """Recompute event_similarity for every event; returns summary counts"""
+    started = time.perf_counter()
+    cursor = connection.cursor()
+    events = load_events(cursor)
+    cursor.close()
+
+    event_ids = [event[0] for event in events]
+    names = [(event[1] or '').strip().lower() for event in events]
+    documents = [tokenize(event[1]) * NAME_WEIGHT + tokenize(event[2]) for event in events]
+    today = date.today()
+    candidates = np.array([event[3] is not None and event[3] >= today for event in events], dtype=bool)
+
+    matrix, vocabulary_size = tfidf_matrix(documents)
+    vectorized = time.perf_counter()
+
+    rows = []
+    for row, neighbours in top_k_neighbours(matrix, names, candidates, top_k):
+        for rank, (other, score) in enumerate(neighbours, 1):
+            rows.append((event_ids[row], rank, event_ids[other], score))
+    ranked = time.perf_counter()
+
+    write_similarity(connection, rows)
+    finished = time.perf_counter()
+
+    return {
+        'events': len(events),
+        'upcoming': int(candidates.sum()),
+        'vocabulary': vocabulary_size,
+        'pairs': len(rows),
+        'vectorize_seconds': vectorized - started,
+        'rank_seconds': ranked - vectorized,
+        'write_seconds': finished - ranked,
+    }
+
+
+def print_summary(totals):
+    print(f"{'=' * 60}")
+    print(f"Similarity Summary:")
+    print(f"Events vectorized: {totals['events']} ({totals['upcoming']} upcoming)")
+    print(f"Vocabulary size: {totals['vocabulary']}")
+    print(f"Neighbour pairs stored: {totals['pairs']}")
+    print(f"Load + vectorize: {totals['vectorize_seconds']:.2f}s, "
+          f"top-k: {totals['rank_seconds']:.2f}s, write: {totals['write_seconds']:.2f}s")
+    print(f"{'=' * 60}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Precompute similar events for recommendations')
+    parser.add_argument('--top-k', type=int, default=10,
+                        help='Neighbours stored per event')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = load_config()
+    connection = mysql.connector.connect(
+        host=config['host'],
+        user=config['user'],
+        password=config['password'],
+        database=config['database']
+    )
+    try:
+        print_summary(build_similarity(connection, args.top_k))
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
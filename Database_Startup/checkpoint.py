@@ -0,0 +1,67 @@
+'''
+checkpoint.py
+Lets jsonTOsql.py resume a long import after a crash.
+
+After every committed batch the importer records, in a small JSON file
+next to the input, how many leading events of the file are committed
+along with a fingerprint of the file (size and SHA-256). --resume skips
+that many events, provided the file is unchanged. The checkpoint is
+removed when an import finishes.
+'''
+import hashlib
+import json
+import os
+from pathlib import Path
+
+HASH_CHUNK = 1 << 20
+
+
+def file_fingerprint(path):
+    """Size and SHA-256 of a file, read in 1 MB chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return {'size': os.path.getsize(path), 'sha256': digest.hexdigest()}
+
+
+class Checkpoint:
+    """The committed prefix of one input file, saved after every batch"""
+
+    def __init__(self, path, input_path):
+        self.path = Path(path)
+        self.input_path = Path(input_path)
+        self.fingerprint = file_fingerprint(input_path)
+        self.offset = 0
+
+    def resume(self):
+        """Load the saved offset; returns it (0 if there is no checkpoint).
+
+        Raises ValueError if the checkpoint was written for different contents.
+        """
+        if not self.path.exists():
+            return 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('fingerprint') != self.fingerprint:
+            raise ValueError(f"{self.path} was written for a different version of {self.input_path}; "
+                             f"delete it or run without --resume")
+        self.offset = saved['offset']
+        return self.offset
+
+    def save(self, offset):
+        """Record that the first `offset` events are committed (atomic replace)"""
+        self.offset = offset
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'input': str(self.input_path), 'fingerprint': self.fingerprint,
+                       'offset': offset}, f)
+        os.replace(temp_path, self.path)
+
+    def advance(self, count):
+        """Record `count` more events committed in file order"""
+        self.save(self.offset + count)
+
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,434 @@
+'''
+dedupe_venues.py
+Finds near-duplicate venues in Location and merges them.
+
+Scrapers spell the same venue several ways ("Owlbear's Rest" vs
+"Owlbear’s Rest", "Suite 26A" in one listing only), and the importer
+only matches exact (venue_name, zip) pairs. Each venue name is folded
+(case, accents, apostrophes, suite/unit numbers) and cut into character
+3-grams. A 128-value MinHash signature is computed per venue with NumPy,
+and the signatures are split into 32 LSH bands of 4 values, so only
+venues sharing a band are ever compared. That makes the job near-linear
+in the number of venues instead of quadratic. A candidate pair is merged
+when its signatures agree on at least --threshold of their values
+(estimated Jaccard similarity) and its ZIP codes, cities and street
+numbers do not disagree.
+
+Each group of duplicates is merged into the venue with the most events
+(the oldest on ties). Events and archived events are moved to it, and
+the merged spellings are recorded in location_alias, so the next import
+resolves them to the canonical venue instead of recreating them.
+
+    python dedupe_venues.py --dry-run         # list the groups only
+    python dedupe_venues.py                   # merge them
+    python dedupe_venues.py --benchmark 100000
+'''
+import argparse
+import random
+import re
+import sys
+import time
+import unicodedata
+
+import mysql.connector
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from startup import load_config
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+# Mersenne prime for the (a * x + b) mod p permutations; 3-grams are < 2^24,
+# so a * x stays below 2^55
+PRIME = (1 << 31) - 1
+SEED = 1
+
+DEFAULT_THRESHOLD = 0.8
+
+SUITE_RE = re.compile(r'\b(?:suite|ste|unit|apt|room|rm|floor|fl|bldg|building)\b\.?\s*#?\s*[0-9a-z-]+'
+                      r'|#\s*[0-9a-z-]+')
+NON_WORD_RE = re.compile(r'[^0-9a-z]+')
+STREET_NUMBER_RE = re.compile(r'^\s*(\d+)')
+
+
+def fold(text):
+    """Lowercase ASCII text without accents, apostrophes or suite/unit numbers"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = text.encode('ascii', 'ignore').decode('ascii').lower().replace("'", '')
+    text = SUITE_RE.sub(' ', text)
+    return ' '.join(NON_WORD_RE.sub(' ', text).split())
+
+
+def shingles(texts):
+    """Character 3-grams of every text as 24-bit ints.
+
+    Returns (grams, starts): grams of text k are grams[starts[k]:starts[k + 1]].
+    Texts are padded with a space on each side, so word boundaries count and
+    every non-empty text has at least one 3-gram. An empty text has none,
+    and its start equals the next text's.
+    """
+    encoded = [f" {text} ".encode('ascii') for text in texts]
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint32)
+    grams = (data[:-2] << 16) | (data[1:-1] << 8) | data[2:]
+    # Drop the 3-grams that straddle two texts
+    ends = np.cumsum(lengths)
+    owner = np.repeat(np.arange(len(encoded)), lengths)[:-2]
+    keep = np.arange(len(grams)) + 2 < ends[owner]
+    counts = lengths - 2
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return grams[keep], starts
+
+
+def distinct(values):
+    """(sorted distinct values, inverse) like np.unique(values, return_inverse=True).
+
+    A sort and an adjacent-difference mask; np.unique's hash-based path
+    is many times slower on the millions of values a large table produces.
+    """
+    if len(values) == 0:
+        return values[:0], np.empty(0, dtype=np.int64)
+    order = np.argsort(values, kind='stable')
+    ordered = values[order]
+    first = np.concatenate(([True], ordered[1:] != ordered[:-1]))
+    inverse = np.empty(len(values), dtype=np.int64)
+    inverse[order] = np.cumsum(first) - 1
+    return ordered[first], inverse
+
+
+def minhash_signatures(texts, num_perm=NUM_PERM, seed=SEED):
+    """(len(texts), num_perm) uint32 MinHash signatures of the texts' 3-gram sets.
+
+    An empty text (a name that folds to nothing, like "Suite 5" or "#12")
+    has no 3-grams, so it gets PRIME + its index in every position: hashes
+    are below PRIME, so it matches no other venue, not even another empty one.
+    """
+    grams, starts = shingles(texts)
+    empty = np.diff(np.append(starts, len(grams))) == 0
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, PRIME, size=num_perm).astype(np.uint64)
+    b = rng.randint(0, PRIME, size=num_perm).astype(np.uint64)
+    # Hash each distinct 3-gram once; feeds share most of them
+    values, inverse = distinct(grams)
+    values = values.astype(np.uint64)
+
+    # One permutation at a time keeps every array 1-D and the size of grams
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    signatures[empty] = (PRIME + np.flatnonzero(empty)).astype(np.uint32)[:, None]
+    # reduceat would read the next text's first 3-gram for an empty text, or
+    # past the end for the last one
+    filled = ~empty
+    if filled.any():
+        for k in range(num_perm):
+            hashed = ((values * a[k] + b[k]) % PRIME).astype(np.uint32)
+            signatures[filled, k] = np.minimum.reduceat(hashed[inverse], starts[filled])
+    return signatures
+
+
+def band_candidates(signatures, bands=BANDS):
+    """(i, j) index pairs of venues sharing at least one LSH band, i < j, without repeats.
+
+    Each band's ROWS values are hashed into one uint64. Members of a bucket
+    are paired with the bucket's first member only, which keeps the pair
+    count linear; the rest of a group is joined through other bands and
+    the connected components.
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    positions = np.arange(n, dtype=np.int64)
+    pairs = []
+    with np.errstate(over='ignore'):
+        for band in range(bands):
+            block = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+            keys = np.zeros(n, dtype=np.uint64)
+            for column in block.T:
+                keys = keys * np.uint64(0x9E3779B97F4A7C15) + column
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            new_bucket = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+            leader = order[np.maximum.accumulate(np.where(new_bucket, positions, 0))]
+            follower = ~new_bucket
+            pairs.append(np.stack((leader[follower], order[follower]), axis=1))
+    pairs = np.sort(np.concatenate(pairs), axis=1)
+    if not len(pairs):
+        return pairs
+    # One int64 per pair makes the de-duplication a flat sort
+    unique, _ = distinct(pairs[:, 0] * n + pairs[:, 1])
+    return np.stack((unique // n, unique % n), axis=1)
+
+
+def compatible(values, i, j):
+    """Pairs whose values are equal or missing on either side (values: int array, -1 = missing)"""
+    left, right = values[i], values[j]
+    return (left < 0) | (right < 0) | (left == right)
+
+
+def street_number(address):
+    match = STREET_NUMBER_RE.match(address or '')
+    return match[1] if match else None
+
+
+def codes(strings):
+    """Each string as an int code (-1 for empty) so columns compare as arrays"""
+    table = {}
+    return np.array([table.setdefault(s, len(table)) if s else -1 for s in strings], dtype=np.int64)
+
+
+def find_duplicates(venues, threshold=DEFAULT_THRESHOLD):
+    """Groups of near-duplicate venues.
+
+    venues is a list of (location_id, venue_name, address, city, zip_code).
+    Returns lists of indices into venues, one per group of two or more.
+    """
+    if len(venues) < 2:
+        return []
+    names = [fold(venue[1]) for venue in venues]
+    signatures = minhash_signatures(names)
+    pairs = band_candidates(signatures)
+    if not len(pairs):
+        return []
+    i, j = pairs[:, 0], pairs[:, 1]
+
+    # Estimated Jaccard similarity is the fraction of agreeing MinHash values
+    agree = np.empty(len(pairs), dtype=np.float32)
+    for first in range(0, len(pairs), 1 << 16):
+        chunk = slice(first, first + (1 << 16))
+        agree[chunk] = (signatures[i[chunk]] == signatures[j[chunk]]).mean(axis=1)
+
+    zips = codes((venue[4] or '').strip() for venue in venues)
+    cities = codes(fold(venue[3]) for venue in venues)
+    numbers = codes(street_number(venue[2]) for venue in venues)
+    same = ((agree >= threshold) & compatible(zips, i, j) & compatible(cities, i, j)
+            & compatible(numbers, i, j))
+
+    n = len(venues)
+    graph = sparse.coo_matrix((np.ones(same.sum(), dtype=np.int8), (i[same], j[same])), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    sizes = np.bincount(labels)
+    order = np.argsort(labels, kind='stable')
+    groups = np.split(order, np.cumsum(sizes)[:-1])
+    return [group.tolist() for group in groups if len(group) > 1]
+
+
+def canonical_mapping(venues, groups, event_counts):
+    """{duplicate location_id: canonical location_id}; the venue with the most events is kept"""
+    mapping = {}
+    for group in groups:
+        ids = [venues[index][0] for index in group]
+        keep = min(ids, key=lambda location_id: (-event_counts.get(location_id, 0), location_id))
+        for location_id in ids:
+            if location_id != keep:
+                mapping[location_id] = keep
+    return mapping
+
+
+def load_venues(cursor):
+    """Every Location row and its event count"""
+    cursor.execute("""
+        SELECT l.location_id, l.venue_name, l.address, l.city, l.zip_code, COUNT(e.event_id)
+        FROM Location l
+        LEFT JOIN Event e ON e.location_id = l.location_id
+        GROUP BY l.location_id
+        ORDER BY l.location_id
+    """)
+    venues = []
+    event_counts = {}
+    for location_id, venue_name, address, city, zip_code, events in cursor.fetchall():
+        venues.append((location_id, venue_name, address, city, zip_code))
+        event_counts[location_id] = events
+    return venues, event_counts
+
+
+def merge_venues(connection, mapping):
+    """Point events and aliases at the canonical venues and delete the duplicates (one transaction)"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS location_merge")
+        cursor.execute("""
+            CREATE TEMPORARY TABLE location_merge (
+                location_id INT PRIMARY KEY,
+                canonical_id INT NOT NULL
+            )
+        """)
+        cursor.executemany("INSERT INTO location_merge (location_id, canonical_id) VALUES (%s, %s)",
+                           list(mapping.items()))
+        # Aliases of a venue that is itself merged away follow it
+        cursor.execute("""
+            UPDATE location_alias a
+            JOIN location_merge m ON a.location_id = m.location_id
+            SET a.location_id = m.canonical_id
+        """)
+        cursor.execute("""
+            INSERT INTO location_alias (venue_name, zip_code, location_id)
+            SELECT l.venue_name, l.zip_code, m.canonical_id
+            FROM Location l
+            JOIN location_merge m ON l.location_id = m.location_id
+        """)
+        cursor.execute("""
+            UPDATE Event e
+            JOIN location_merge m ON e.location_id = m.location_id
+            SET e.location_id = m.canonical_id
+        """)
+        events = cursor.rowcount
+        cursor.execute("""
+            UPDATE Event_archive e
+            JOIN location_merge m ON e.location_id = m.location_id
+            SET e.location_id = m.canonical_id
+        """)
+        archived = cursor.rowcount
+        cursor.execute("DELETE l FROM Location l JOIN location_merge m ON l.location_id = m.location_id")
+        deleted = cursor.rowcount
+        cursor.execute("DROP TEMPORARY TABLE location_merge")
+        connection.commit()
+    except mysql.connector.Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return {'events': events, 'archived': archived, 'deleted': deleted}
+
+
+def synthetic_venues(count, duplicate_rate=0.1, seed=SEED):
+    """count venues where about duplicate_rate of them are respellings of another.
+
+    Returns (venues, truth) where truth maps each respelling's index to the
+    index of the venue it copies. A few names fold to nothing ("Suite 5",
+    "#12", non-ASCII only), the last venue among them, and must never be
+    grouped.
+    """
+    rng = random.Random(seed)
+    words = ['Owlbear', 'Harbor', 'Granite', 'Pine', 'Lobster', 'Lighthouse', 'Moose', 'Brewing', 'Coffee',
+             'Gallery', 'Library', 'Theater', 'Tavern', 'Grange', 'Hall', 'Books', 'Kitchen', 'Farm',
+             'Maritime', 'Museum', 'Center', 'Studio', 'Arts', 'Gardens', 'Market', 'Chapel', 'Inn']
+    venues = []
+    truth = {}
+    empty_names = ['Suite 5', '#12', '!!', '東京']
+    for index in range(count):
+        if index == count - 1 or rng.random() < 0.001:
+            venues.append((index + 1, rng.choice(empty_names), f"{rng.randint(1, 999)} Main Street",
+                           f"Town {rng.randint(1, 400)}", f"04{rng.randint(0, 999):03d}"))
+            continue
+        if venues and rng.random() < duplicate_rate:
+            original = rng.randrange(len(venues))
+            _, name, address, city, zip_code = venues[original]
+            variant = rng.choice([
+                name.replace("'", '’'),
+                name.upper(),
+                f"{name} Suite {rng.randint(1, 40)}{rng.choice('AB')}",
+                name.replace(' ', '  '),
+            ])
+            truth[index] = original
+            venues.append((index + 1, variant, address, city, zip_code))
+            continue
+        name = f"{rng.choice(words)}'s {rng.choice(words)} {rng.choice(words)} {rng.randint(1, 999)}"
+        venues.append((index + 1, name, f"{rng.randint(1, 999)} Main Street", f"Town {rng.randint(1, 400)}",
+                       f"04{rng.randint(0, 999):03d}"))
+    return venues, truth
+
+
+def run_benchmark(count, threshold):
+    venues, truth = synthetic_venues(count)
+    started = time.perf_counter()
+    groups = find_duplicates(venues, threshold)
+    elapsed = time.perf_counter() - started
+
+    label = {}
+    for number, group in enumerate(groups):
+        for index in group:
+            label[index] = number
+    found = sum(1 for copy, original in truth.items()
+                if copy in label and label.get(original) == label[copy])
+    merged = sum(len(group) - 1 for group in groups)
+    empty_grouped = sum(1 for group in groups for index in group if not fold(venues[index][1]))
+    # Inputs with no candidate pairs at all, or no 3-grams at all
+    edge_cases = [
+        [(1, 'Owlbear Rest', None, None, None), (2, 'Lobster Pound Kitchen', None, None, None)],
+        [(1, 'Suite 5', None, None, None), (2, '#12', None, None, None)],
+    ]
+    edge_grouped = sum(len(find_duplicates(case, threshold)) for case in edge_cases)
+    print(f"{'=' * 60}")
+    print(f"Venue Dedupe Benchmark:")
+    print(f"Venues: {count} ({len(truth)} respellings)")
+    print(f"Groups: {len(groups)} ({merged} venues would be merged)")
+    print(f"Respellings found: {found}/{len(truth)} ({found / len(truth) if truth else 1:.1%})")
+    print(f"Empty names grouped: {empty_grouped} (should be 0)")
+    print(f"Unrelated or empty-name pairs grouped: {edge_grouped} (should be 0)")
+    print(f"Time: {elapsed:.2f}s ({count / elapsed:.0f} venues/sec)")
+    print(f"{'=' * 60}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Merge near-duplicate venues in Location')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Estimated Jaccard similarity of venue names needed to merge (0-1)')
+    parser.add_argument('--dry-run', action='store_true', help='List the duplicate groups without merging')
+    parser.add_argument('--benchmark', type=int, metavar='N',
+                        help='Time duplicate detection on N synthetic venues (no database)')
+    args = parser.parse_args()
+    if not 0 < args.threshold <= 1:
+        parser.error("--threshold must be between 0 and 1")
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.benchmark:
+        run_benchmark(args.benchmark, args.threshold)
+        return
+
+    config = load_config()
+    try:
+        connection = mysql.connector.connect(**config)
+    except mysql.connector.Error as e:
+        print(f"Error connecting to database: {e}")
+        sys.exit(1)
+
+    cursor = connection.cursor()
+    venues, event_counts = load_venues(cursor)
+    cursor.close()
+
+    started = time.perf_counter()
+    groups = find_duplicates(venues, args.threshold)
+    mapping = canonical_mapping(venues, groups, event_counts)
+    elapsed = time.perf_counter() - started
+
+    by_id = {venue[0]: venue for venue in venues}
+    for group in groups[:20]:
+        keep = mapping.get(venues[group[0]][0], venues[group[0]][0])
+        print(f"  {by_id[keep][1]!r} ({keep}) <- "
+              + ', '.join(f"{venues[index][1]!r} ({venues[index][0]})" for index in group
+                          if venues[index][0] != keep))
+    if len(groups) > 20:
+        print(f"  ... and {len(groups) - 20} more groups")
+
+    merged = None
+    if mapping and not args.dry_run:
+        try:
+            merged = merge_venues(connection, mapping)
+            cursor = connection.cursor()
+            cursor.callproc('refresh_upcoming_event_listing')
+            connection.commit()
+            cursor.close()
+        except mysql.connector.Error as e:
+            print(f"Error: merge failed and was rolled back: {e}")
+            connection.close()
+            sys.exit(1)
+    connection.close()
+
+    print(f"{'=' * 60}")
+    print(f"Venue Dedupe Summary:")
+    print(f"Venues scanned: {len(venues)}")
+    print(f"Duplicate groups: {len(groups)} ({len(mapping)} venues to merge)")
+    if merged:
+        print(f"Merged: {merged['deleted']} venues removed, {merged['events']} events and "
+              f"{merged['archived']} archived events moved")
+    elif args.dry_run:
+        print(f"Dry run: nothing changed")
+    print(f"Detection time: {elapsed:.2f}s")
+    print(f"{'=' * 60}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+'''
+event_stream.py
+Reads event feeds one event at a time, in constant memory.
+
+Accepts NDJSON (one JSON object per line) or a JSON array of objects,
+told apart by the first non-blank character. Arrays are decoded
+incrementally with json.JSONDecoder.raw_decode over a small rolling
+buffer, so memory is bounded by the largest single event rather than
+the size of the file.
+'''
+import json
+from itertools import chain, islice
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_events(path):
+    """Yield each event dict in a JSON array or NDJSON file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(CHUNK_SIZE).lstrip(_WHITESPACE + '\ufeff')
+        if not buffer:
+            return
+        if buffer[0] == '[':
+            yield from _iter_array(f, buffer[1:])
+        elif buffer[0] == '{':
+            yield from _iter_lines(f, buffer)
+        else:
+            raise ValueError(f"{path}: expected a JSON array or NDJSON objects, found {buffer[0]!r}")
+
+
+def _iter_lines(f, buffer):
+    # The peeked chunk may end mid-line; finish that line from the file
+    head = (buffer + f.readline()).splitlines()
+    for line_no, line in enumerate(chain(head, f), 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise json.JSONDecodeError(f"line {line_no}: {e.msg}", e.doc, e.pos) from None
+
+
+def _iter_array(f, buffer):
+    pos = 0
+    eof = False
+    first = True
+    while True:
+        # Skip whitespace (and one comma between elements), refilling as needed
+        seen_comma = False
+        while True:
+            while pos < len(buffer) and (buffer[pos] in _WHITESPACE
+                                         or (buffer[pos] == ',' and not seen_comma and not first)):
+                seen_comma = seen_comma or buffer[pos] == ','
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            buffer, pos = f.read(CHUNK_SIZE), 0
+            eof = not buffer
+
+        if pos >= len(buffer):
+            raise json.JSONDecodeError("Unterminated array", buffer, pos)
+        if buffer[pos] == ']' and not seen_comma:
+            return
+        if not first and not seen_comma:
+            raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+
+        try:
+            event, end = _decoder.raw_decode(buffer, pos)
+            # A value running to the end of the buffer may continue in the next chunk
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+
+        if not complete:
+            more = f.read(CHUNK_SIZE)
+            eof = not more
+            # Keep the comma we already consumed
+            buffer, pos = (',' if seen_comma else '') + buffer[pos:] + more, 0
+            continue
+
+        yield event
+        first = False
+        pos = end
+        if pos > CHUNK_SIZE:
+            buffer, pos = buffer[pos:], 0
+
+
+def batched(iterable, size):
+    """Yield lists of up to size items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_json_array(events, path):
+    """Write events as a JSON array one element at a time; returns the count.
+
+    The output matches json.dump(events, indent=2, ensure_ascii=False).
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for event in events:
+            text = json.dumps(event, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+            f.write(('\n  ' if count == 0 else ',\n  ') + text)
+            count += 1
+        f.write('\n]' if count else ']')
+    return count
+
+
+def append_ndjson(events, path):
+    """Append events to an NDJSON file; returns the count"""
+    count = 0
+    with open(path, 'a', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False) + '\n')
+            count += 1
+    return count
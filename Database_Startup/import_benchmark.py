@@ -0,0 +1,159 @@
+'''
+import_benchmark.py
+Times jsonTOsql.py at several --workers settings against the configured
+database.
+
+A synthetic NDJSON feed is generated (or --file is used) and imported
+once per worker count, then imported again to time a re-import where
+every event is unchanged. Each run's events and venues are deleted
+afterwards, so every run starts from the same tables. One worker is the
+ordinary serial import; more go through import_parallel, including its
+up-front venue pass. Derived tables are not refreshed.
+
+    python import_benchmark.py --events 100000 --workers 1,2,4,8
+    python import_benchmark.py --events 100000 --workers 1,2,4,8 --bulk
+'''
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import mysql.connector
+
+from event_stream import append_ndjson, iter_events
+from jsonTOsql import import_bulk, import_parallel, import_rows
+from startup import load_config
+
+CITIES = ['Portland', 'Bangor', 'Lewiston', 'Augusta', 'Biddeford', 'Brunswick', 'Bar Harbor']
+
+DELETE_BATCH = 10000
+
+
+def synthetic_events(count, venues):
+    """Yield `count` distinct upcoming events spread over `venues` venues"""
+    today = date.today()
+    for n in range(count):
+        venue = n % venues
+        day = today + timedelta(days=1 + n % 365)
+        yield {
+            'title': f"Benchmark event {n}",
+            'date': day.strftime('%m-%d-%Y'),
+            'start_time': f"{1 + n % 11:02d}:00 PM",
+            'end_time': '11:30 PM',
+            'venue_name': f"Benchmark Venue {venue}",
+            'street': f"{venue} Main St",
+            'city': CITIES[venue % len(CITIES)],
+            'zip_code': f"04{venue % 1000:03d}",
+        }
+
+
+def high_water_marks(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT COALESCE(MAX(event_id), 0) FROM Event")
+    event_mark = cursor.fetchone()[0]
+    cursor.execute("SELECT COALESCE(MAX(location_id), 0) FROM Location")
+    location_mark = cursor.fetchone()[0]
+    connection.commit()
+    cursor.close()
+    return event_mark, location_mark
+
+
+def delete_above(connection, table, key, mark):
+    """Delete rows created after `mark` in small transactions"""
+    cursor = connection.cursor()
+    while True:
+        cursor.execute(f"DELETE FROM {table} WHERE {key} > %s LIMIT {DELETE_BATCH}", (mark,))
+        connection.commit()
+        if cursor.rowcount < DELETE_BATCH:
+            break
+    cursor.close()
+
+
+def run_once(db_config, path, workers, bulk, batch_size):
+    """Import the feed once; returns (totals, seconds)"""
+    started = time.perf_counter()
+    if workers > 1:
+        totals = import_parallel(db_config, path, workers, bulk, batch_size)
+    else:
+        connection = mysql.connector.connect(**db_config)
+        try:
+            if bulk:
+                totals = import_bulk(connection, iter_events(path), batch_size)
+            else:
+                totals = import_rows(connection, iter_events(path), batch_size)
+        finally:
+            connection.close()
+    return totals, time.perf_counter() - started
+
+
+def run_benchmark(db_config, path, worker_counts, bulk, batch_size):
+    connection = mysql.connector.connect(**db_config)
+    results = []
+    try:
+        for workers in worker_counts:
+            event_mark, location_mark = high_water_marks(connection)
+            try:
+                totals, seconds = run_once(db_config, path, workers, bulk, batch_size)
+                again, reimport_seconds = run_once(db_config, path, workers, bulk, batch_size)
+            finally:
+                delete_above(connection, 'Event', 'event_id', event_mark)
+                delete_above(connection, 'Location', 'location_id', location_mark)
+            results.append((workers, totals, seconds, again, reimport_seconds))
+            print(f"  {workers} worker(s): {seconds:.2f}s, re-import {reimport_seconds:.2f}s")
+    finally:
+        connection.close()
+    return results
+
+
+def print_results(results, bulk):
+    baseline = results[0][2] if results else 0
+    print(f"{'=' * 60}")
+    print(f"Import Benchmark ({'bulk' if bulk else 'row'} mode):")
+    print(f"{'Workers':>7}  {'Seconds':>8}  {'Rows/sec':>9}  {'Speedup':>7}  {'Imported':>9}  "
+          f"{'Re-import':>9}  {'Unchanged':>9}")
+    for workers, totals, seconds, again, reimport_seconds in results:
+        print(f"{workers:>7}  {seconds:>8.2f}  {totals['total'] / seconds if seconds else 0:>9.0f}  "
+              f"{baseline / seconds if seconds else 0:>6.2f}x  {totals['inserted']:>9}  "
+              f"{reimport_seconds:>8.2f}s  {again['unchanged']:>9}")
+    imported = {result[1]['inserted'] for result in results}
+    if len(imported) > 1:
+        print("Warning: runs imported different numbers of events")
+    if any(again['inserted'] or again['updated'] for _, _, _, again, _ in results):
+        print("Warning: a re-import of the same feed wrote rows")
+    print(f"{'=' * 60}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark jsonTOsql.py at several worker counts')
+    parser.add_argument('--file', help='Feed to import (default: generate one)')
+    parser.add_argument('--events', type=int, default=100000, help='Events to generate')
+    parser.add_argument('--venues', type=int, default=500, help='Distinct venues to generate')
+    parser.add_argument('--workers', default='1,2,4,8', help='Comma-separated worker counts')
+    parser.add_argument('--bulk', action='store_true', help='Benchmark --bulk mode')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Events per committed batch')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = load_config()
+    db_config = {key: config[key] for key in ('host', 'user', 'password', 'database')}
+    worker_counts = [int(n) for n in args.workers.split(',')]
+
+    path = args.file
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix='.ndjson')
+        os.close(handle)
+        append_ndjson(synthetic_events(args.events, args.venues), path)
+        print(f"Generated {args.events} events over {args.venues} venues")
+    try:
+        results = run_benchmark(db_config, path, worker_counts, args.bulk, args.batch_size)
+    finally:
+        if args.file is None:
+            os.remove(path)
+    print_results(results, args.bulk)
+
+
+if __name__ == "__main__":
+    main()
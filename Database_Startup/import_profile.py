@@ -0,0 +1,181 @@
+'''
+import_profile.py
+Stage timing and round-trip counting for jsonTOsql.py --profile and
+--dry-run.
+
+The importer marks its stages with `with stage('insert'):` and so on.
+The marks cost nothing unless a Profile is active. With one active, each
+stage's exclusive time (time in a nested stage is charged to that stage
+only) is summed per name across all threads. Connections passed through
+wrap() count every statement and commit as one round trip of the
+current stage. In a dry run the wrapped connection's commit() does
+nothing, so the caller's final rollback discards the whole import.
+'''
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Reported in this order; anything else follows alphabetically
+STAGES = ('load', 'parse', 'validate', 'locations', 'duplicate_check', 'insert', 'commit',
+          'derived_tables')
+
+_active = None
+_local = threading.local()
+
+
+class Profile:
+    """Seconds and round trips per stage for one import"""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.seconds = Counter()
+        self.round_trips = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds=0.0, round_trips=0):
+        with self._lock:
+            self.seconds[name] += seconds
+            self.round_trips[name] += round_trips
+
+    def report(self, totals, elapsed, **info):
+        """The profile as a JSON-ready dict, with counts from the import totals"""
+        events = totals.get('total', 0)
+        names = [name for name in STAGES if name in self.seconds or name in self.round_trips]
+        names += sorted(set(self.seconds) | set(self.round_trips) - set(names))
+        round_trips = sum(self.round_trips.values())
+        return {
+            **info,
+            'dry_run': self.dry_run,
+            'events': events,
+            'elapsed_seconds': round(elapsed, 4),
+            'rows_per_second': round(events / elapsed, 1) if elapsed else None,
+            'round_trips': round_trips,
+            'round_trips_per_event': round(round_trips / events, 3) if events else None,
+            'stages': {
+                name: {'seconds': round(self.seconds[name], 4), 'round_trips': self.round_trips[name]}
+                for name in names
+            },
+            'totals': {key: value for key, value in totals.items()
+                       if isinstance(value, int) and not isinstance(value, bool)},
+        }
+
+
+def activate(profile):
+    """Start recording into profile (None stops recording)"""
+    global _active
+    _active = profile
+
+
+def active():
+    return _active
+
+
+@contextmanager
+def stage(name):
+    """Charge the enclosed time, minus any nested stages, to `name`"""
+    if _active is None:
+        yield
+        return
+    stack = _local.__dict__.setdefault('stack', [])
+    frame = [name, 0.0]
+    stack.append(frame)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        spent = time.perf_counter() - started
+        stack.pop()
+        if stack:
+            stack[-1][1] += spent
+        _active.add(name, seconds=spent - frame[1])
+
+
+def timed(iterable, name):
+    """Iterate, charging the time spent producing each item to stage `name`"""
+    if _active is None:
+        return iter(iterable)
+    return _timed(iter(iterable), name)
+
+
+def _timed(iterator, name):
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def current_stage():
+    stack = getattr(_local, 'stack', None)
+    return stack[-1][0] if stack else 'other'
+
+
+def count_round_trip():
+    if _active is not None:
+        _active.add(current_stage(), round_trips=1)
+
+
+class ProfiledCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        count_round_trip()
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        # mysql.connector sends an INSERT ... VALUES executemany as one statement
+        count_round_trip()
+        return self._cursor.executemany(*args, **kwargs)
+
+    def callproc(self, *args, **kwargs):
+        count_round_trip()
+        return self._cursor.callproc(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ProfiledConnection:
+    def __init__(self, connection, dry_run=False):
+        self._connection = connection
+        self.dry_run = dry_run
+
+    def cursor(self, *args, **kwargs):
+        return ProfiledCursor(self._connection.cursor(*args, **kwargs))
+
+    def commit(self):
+        if self.dry_run:
+            return
+        with stage('commit'):
+            count_round_trip()
+            self._connection.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def wrap(connection):
+    """Profile a connection's round trips (and honour dry runs) while a Profile is active"""
+    if _active is None:
+        return connection
+    return ProfiledConnection(connection, dry_run=_active.dry_run)
+
+
+def write_report(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+def print_report(report):
+    print(f"{'Stage':<16} {'Seconds':>9} {'Share':>7} {'Round trips':>12}")
+    total = sum(values['seconds'] for values in report['stages'].values()) or 1
+    for name, values in report['stages'].items():
+        print(f"{name:<16} {values['seconds']:>9.3f} {values['seconds'] / total:>7.1%} "
+              f"{values['round_trips']:>12}")
+    if report['round_trips_per_event'] is not None:
+        print(f"Round trips per event: {report['round_trips_per_event']:.3f}")
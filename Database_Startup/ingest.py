@@ -0,0 +1,375 @@
+'''
+ingest.py
+Imports every scraped source through one pipeline.
+
+Each scraper writes its own shape: Maine Public (maine_events.json),
+Meetup (meetup_events.json), Maine Tourism (mainetourism_events_data.json)
+and the cleaned Eventbrite venues of clean.data.py (locations.json). An
+adapter per source maps records to the Maine Public event shape that
+jsonTOsql.py imports. The same event listed on several sites is merged
+in a single pass: each event is hashed on its normalized (date, city,
+title tokens) into a block, and events sharing a block are one event.
+There are no pairwise title comparisons, so the pass is linear in the
+number of events. Venue-only sources are added to Location, then the
+merged feed is written as NDJSON and imported by jsonTOsql.import_events.
+
+    python ingest.py ../All_Webscraping/maine_events.json \\
+        ../All_Webscraping/meetup_events.json \\
+        ../All_Webscraping/mainetourism_events_data.json --bulk
+
+A path may be prefixed with its source (meetup=events.json) when the
+source cannot be told from its fields.
+'''
+import argparse
+import hashlib
+import re
+import sys
+import time
+import unicodedata
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import mysql.connector
+
+from address_parser import parse_address
+from event_stream import append_ndjson, iter_events
+from jsonTOsql import LocationCache, import_events
+from normalize import MAX_VENUE, ZIP_RE
+from startup import load_config
+
+# Fields of the common event record, as written by the Maine Public scraper
+EVENT_FIELDS = ('title', 'desc', 'date', 'start_time', 'end_time', 'venue_name', 'street', 'city', 'state',
+                'zip_code', 'url')
+
+# Words that do not tell two event titles apart
+STOPWORDS = frozenset('a an and at by for from in of on or the to with'.split())
+
+TOKEN_RE = re.compile(r'[0-9a-z]+')
+# "Portland, ME 04101" / "Bar Harbor, Maine"
+CITY_LINE_RE = re.compile(r'^(?P<city>[^,]+),\s*(?:ME|Maine)\.?(?:\s+(?P<zip>\d{5})(?:-\d{4})?)?$', re.IGNORECASE)
+MONTH_DAY_RE = re.compile(r'^([A-Za-z]{3})\s+(\d{1,2})$')
+
+# Meetup lists upcoming events without a year; dates further back than
+# this from the reference day belong to next year
+MEETUP_LOOKBACK = timedelta(days=60)
+
+
+def blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def clean(value):
+    """Stripped string, or None for empty/missing values"""
+    if blank(value):
+        return None
+    return str(value).strip()
+
+
+def reformat_date(text, fmt):
+    """text in fmt as MM-DD-YYYY, the importer's date format (None if it does not parse)"""
+    try:
+        return datetime.strptime(text.strip(), fmt).strftime('%m-%d-%Y')
+    except (AttributeError, ValueError):
+        return None
+
+
+def maine_public_event(record):
+    """Maine Public events are already in the common shape.
+
+    Feeds scraped before address_parser put whatever followed the street
+    (often a suite number) in city, so the address fields are re-parsed.
+    """
+    event = {field: clean(record.get(field)) for field in EVENT_FIELDS}
+    if event['street'] or event['city']:
+        state_zip = ' '.join(part for part in (event['state'], event['zip_code']) if part)
+        address = ', '.join(part for part in (event['street'], event['city'], state_zip) if part)
+        street, city, state, zip_code = parse_address(address)
+        event.update(street=street, city=city, state=state or event['state'], zip_code=zip_code)
+    return event
+
+
+def split_location(text):
+    """(venue_name, street, city, zip) from a Maine Tourism location block.
+
+    The block is 'Venue\\nStreet\\nCity, ME 04101', sometimes without the
+    venue line. When there is no venue line the street is used as the
+    venue name. Blocks without a 'City, ME' line (the site puts times and
+    prices there too) give no location at all.
+    """
+    lines = [line.strip() for line in (text or '').splitlines() if line.strip()]
+    for i, line in enumerate(lines):
+        match = CITY_LINE_RE.match(line)
+        if not match:
+            continue
+        before = lines[:i]
+        if not before:
+            return None, None, match['city'].strip(), match['zip']
+        street = ', '.join(before[1:]) if len(before) > 1 else before[0]
+        return before[0], street, match['city'].strip(), match['zip']
+    return None, None, None, None
+
+
+def maine_tourism_event(record):
+    venue_name, street, city, zip_code = split_location(record.get('location'))
+    return {
+        'title': clean(record.get('title')),
+        'desc': clean(record.get('descriptionTab')),
+        'date': reformat_date(record.get('date'), '%B %d, %Y'),
+        'start_time': clean(record.get('start_time')),
+        'end_time': clean(record.get('end_time')),
+        'venue_name': venue_name,
+        'street': street,
+        'city': city,
+        'state': 'ME' if city else None,
+        'zip_code': zip_code,
+        'url': clean(record.get('url')),
+    }
+
+
+def meetup_date(text, today):
+    """'Nov 12' as MM-DD-YYYY, in the year that puts it closest ahead of today"""
+    match = MONTH_DAY_RE.match((text or '').strip())
+    if not match:
+        return None
+    try:
+        month = datetime.strptime(match[1].title(), '%b').month
+        day = int(match[2])
+        candidate = date(today.year, month, day)
+        if candidate < today - MEETUP_LOOKBACK:
+            candidate = date(today.year + 1, month, day)
+    except ValueError:
+        return None
+    return candidate.strftime('%m-%d-%Y')
+
+
+def meetup_event(record, today=None):
+    """Meetup cards have a title, date and start time; the venue is not scraped"""
+    desc = clean(record.get('desc'))
+    url = None
+    if desc and ' https://' in desc:
+        desc, url = desc.rsplit(' https://', 1)
+        url = 'https://' + url
+    return {
+        'title': clean(record.get('title')),
+        'desc': desc,
+        'date': meetup_date(record.get('date'), today or date.today()),
+        'start_time': clean(record.get('start_time')),
+        'end_time': clean(record.get('end_time')),
+        'venue_name': None,
+        'street': None,
+        'city': None,
+        'state': None,
+        'zip_code': None,
+        'url': url,
+    }
+
+
+def location_venue(record):
+    """(venue_name, street, city, zip) from a locations.json record, or None if unusable"""
+    venue_name = clean(record.get('venue_name'))
+    zip_code = record.get('zip_code')
+    # pandas reads ZIPs as integers, dropping the leading zero of 04101
+    if isinstance(zip_code, (int, float)) and zip_code == zip_code:
+        zip_code = f"{int(zip_code):05d}"
+    zip_code = clean(zip_code)
+    if not venue_name or len(venue_name) > MAX_VENUE:
+        return None
+    if zip_code is not None and not ZIP_RE.match(zip_code):
+        zip_code = None
+    return venue_name, clean(record.get('address')), clean(record.get('city')), zip_code
+
+
+# Source name -> adapter to the common event record (None for venue-only sources)
+ADAPTERS = {
+    'maine_public': maine_public_event,
+    'maine_tourism': maine_tourism_event,
+    'meetup': meetup_event,
+    'locations': None,
+}
+
+
+def detect_source(record):
+    """Source name for a feed, from the fields of its first record"""
+    if 'descriptionTab' in record or 'location' in record:
+        return 'maine_tourism'
+    if 'attendees' in record or 'max_capacity' in record:
+        return 'meetup'
+    if 'venue_name' in record and 'date' not in record:
+        return 'locations'
+    if 'venue_name' in record:
+        return 'maine_public'
+    raise ValueError(f"unrecognized record fields: {', '.join(sorted(record))}")
+
+
+def parse_source(spec):
+    """(source, path) from 'path' or 'source=path'"""
+    name, sep, path = spec.partition('=')
+    if sep and name in ADAPTERS:
+        return name, Path(path)
+    path = Path(spec)
+    first = next(iter_events(path), None)
+    if first is None:
+        return None, path
+    return detect_source(first), path
+
+
+def fold(text):
+    """Casefolded ASCII text with accents and apostrophes removed"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return text.casefold().replace("'", '').replace('’', '')
+
+
+def title_tokens(title):
+    """The distinct, sorted words of a title, without stopwords"""
+    return sorted({token for token in TOKEN_RE.findall(fold(title)) if token not in STOPWORDS})
+
+
+def block_key(event_date, city, tokens):
+    """64-bit hash of a normalized (date, city, title tokens)"""
+    text = '\x1f'.join((event_date or '', ' '.join(TOKEN_RE.findall(fold(city))), ' '.join(tokens)))
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+
+
+def merge(records):
+    """One event from the copies of it in several sources.
+
+    records are in source priority order; each field comes from the first
+    record that has it, so a Meetup listing can pick up its venue from a
+    Maine Public listing of the same event.
+    """
+    merged = {field: next((r[field] for r in records if not blank(r.get(field))), None)
+              for field in EVENT_FIELDS}
+    merged['sources'] = sorted({r['source'] for r in records})
+    return merged
+
+
+def dedupe(events):
+    """Merge events listed more than once; returns (merged events, duplicates dropped).
+
+    Events without a title or date cannot be blocked and pass through
+    as they are (the importer rejects them). Events without a city, such
+    as Meetup's, join the single event with the same date and title
+    tokens that has one; if several cities have it they stay separate.
+    """
+    blocks = {}
+    loose = {}
+    passed = []
+    for event in events:
+        if blank(event.get('title')) or blank(event.get('date')):
+            passed.append([event])
+            continue
+        tokens = title_tokens(event['title'])
+        key = block_key(event['date'], event.get('city'), tokens)
+        if key not in blocks:
+            blocks[key] = []
+            if event.get('city'):
+                loose.setdefault(block_key(event['date'], None, tokens), []).append(key)
+        blocks[key].append(event)
+
+    # City-less blocks fold into the one city block they could belong to
+    duplicates = 0
+    for key, cities in loose.items():
+        if key in blocks and len(cities) == 1:
+            blocks[cities[0]].extend(blocks.pop(key))
+
+    merged = []
+    for records in list(blocks.values()) + passed:
+        duplicates += len(records) - 1
+        merged.append(merge(records))
+    return merged, duplicates
+
+
+def read_sources(specs):
+    """Adapted events (in source order) and venues from every feed, with per-source counts"""
+    events = []
+    venues = []
+    counts = {}
+    for spec in specs:
+        source, path = parse_source(spec)
+        if source is None:
+            counts[f"{path.name} (empty)"] = 0
+            continue
+        adapter = ADAPTERS[source]
+        read = 0
+        for record in iter_events(path):
+            read += 1
+            if adapter is None:
+                venue = location_venue(record)
+                if venue:
+                    venues.append(venue)
+            else:
+                events.append(dict(adapter(record), source=source))
+        counts[f"{path.name} ({source})"] = read
+    return events, venues, counts
+
+
+def add_venues(db_config, venues):
+    """Insert the venue-only records that are not in Location yet; returns how many were new"""
+    connection = mysql.connector.connect(**db_config)
+    cursor = connection.cursor()
+    locations = LocationCache(cursor)
+    locations.add(cursor, venues)
+    connection.commit()
+    cursor.close()
+    connection.close()
+    return locations.misses
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Merge every scraped source into one feed and import it')
+    parser.add_argument('sources', nargs='+', metavar='[SOURCE=]FILE',
+                        help=f"Scraped feeds in priority order; SOURCE is one of {', '.join(ADAPTERS)} "
+                             f"(detected from the fields when omitted)")
+    parser.add_argument('--out', default='merged_events.ndjson', help='Merged NDJSON feed to write')
+    parser.add_argument('--no-import', action='store_true', help='Only write the merged feed')
+    parser.add_argument('--bulk', action='store_true', help='Import through the staging table (see jsonTOsql.py)')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Events per committed batch')
+    parser.add_argument('--workers', type=int, default=1, help='Parallel import connections')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    try:
+        events, venues, counts = read_sources(args.sources)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    merged, duplicates = dedupe(events)
+    cross_source = sum(1 for event in merged if len(event['sources']) > 1)
+
+    out = Path(args.out)
+    if out.exists():
+        out.unlink()
+    append_ndjson(merged, out)
+    elapsed = time.perf_counter() - started
+
+    print(f"{'=' * 60}")
+    print(f"Ingest Summary:")
+    for name, read in counts.items():
+        print(f"  {name}: {read} records")
+    print(f"Events: {len(events)} read, {duplicates} duplicates merged, {len(merged)} written to {out}")
+    print(f"Listed on more than one source: {cross_source}")
+    if venues:
+        print(f"Venue records: {len(venues)}")
+    print(f"Merge time: {elapsed:.2f}s")
+    print(f"{'=' * 60}")
+
+    if args.no_import:
+        return
+
+    config = load_config()
+    if venues:
+        try:
+            print(f"New venues from venue-only sources: {add_venues(config, venues)}")
+        except mysql.connector.Error as e:
+            print(f"Error: could not add venues: {e}")
+            sys.exit(1)
+    import_events(str(out.resolve()), host=config['host'], user=config['user'], password=config['password'],
+                  database=config['database'], bulk=args.bulk, batch_size=args.batch_size, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
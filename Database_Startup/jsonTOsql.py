@@ -6,13 +6,30 @@ Author: Philip Lane and Claude Sonnet 4.5
 Date: 11/15/2025
 """
 
+import configparser
+import hashlib
 import json
 import mysql.connector
+from mysql.connector import errorcode, pooling
+from collections import Counter, deque
 from datetime import datetime
+from functools import partial
+from itertools import islice
+import queue
 import sys
+import threading
+import time
+import zlib
 from pathlib import Path
 import argparse
 
+from build_similarity import build_similarity
+from checkpoint import Checkpoint
+import import_profile
+from import_profile import Profile, stage, timed
+from event_stream import batched, iter_events
+from normalize import RejectLog, normalize_batch
+
 def load_config(config_file='config.ini'):
     config = configparser.ConfigParser()
     base_dir = Path(__file__).parent
@@ -56,13 +73,42 @@ def load_config(config_file='config.ini'):
 config = load_config()
 
 def parse_args():
-    """Parse command-line arguments for database connection"""
+    """Parse command-line arguments; connection settings default to config.ini"""
     parser = argparse.ArgumentParser(description='Import JSON events to SQL database')
-    parser.add_argument('--host', default='localhost', help='Database host')
-    parser.add_argument('--user', default='root', help='Database user')
-    parser.add_argument('--password', required=True, help='Database password')
-    parser.add_argument('--database', default='mmmdb', help='Database name')
-    return parser.parse_args()
+    parser.add_argument('--host', default=config['host'], help='Database host')
+    parser.add_argument('--user', default=config['user'], help='Database user')
+    parser.add_argument('--password', default=config['password'], help='Database password')
+    parser.add_argument('--database', default=config['database'], help='Database name')
+    parser.add_argument('--file', default='./maine_events.json',
+                        help='JSON array or NDJSON file to import (read incrementally)')
+    parser.add_argument('--bulk', action='store_true',
+                        help='Load through a staging table with set-based SQL (much faster for large feeds)')
+    parser.add_argument('--batch-size', type=int, default=5000,
+                        help='Events per batch; each batch is committed and checkpointed before the next is read')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip the events an interrupted import of the same file already committed')
+    parser.add_argument('--checkpoint',
+                        help='Checkpoint file (default: <file>.checkpoint next to the input)')
+    parser.add_argument('--rejects',
+                        help='NDJSON file for events that fail validation, with reasons '
+                             '(default: <file>.rejected.ndjson next to the input)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f'Parallel connections to insert through (1-{pooling.CNX_POOL_MAXSIZE})')
+    parser.add_argument('--profile', nargs='?', const='', metavar='REPORT',
+                        help='Time each import stage and count round trips; writes a JSON report '
+                             '(default: <file>.profile.json next to the input)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Run the whole import in one transaction and roll it back at the end '
+                             '(implies --profile)')
+    args = parser.parse_args()
+    if not 1 <= args.workers <= pooling.CNX_POOL_MAXSIZE:
+        parser.error(f"--workers must be between 1 and {pooling.CNX_POOL_MAXSIZE}")
+    if args.dry_run and args.workers > 1:
+        # Workers need the venue pass committed before they can see it
+        parser.error("--dry-run cannot be combined with --workers")
+    if args.dry_run and args.resume:
+        parser.error("--dry-run commits nothing, so there is nothing to --resume")
+    return args
 
 
 def connect_to_db(host, user, password, database):
@@ -95,198 +141,733 @@ def parse_date(date_string):
         return None
 
 
-def parse_time(time_string):
-    """Convert time string to MySQL time format HH:MM:SS"""
-    if not time_string:
-        return None
-    try:
-        # Parse "02:30 PM" format
-        time_obj = datetime.strptime(time_string, '%I:%M %p')
-        # Return in HH:MM:SS format
-        return time_obj.strftime('%H:%M:%S')
-    except Exception as e:
-        # print(f"  Warning: Could not parse time '{time_string}': {e}")
-        return None
+# Deadlocks and lock wait timeouts roll a batch back and rerun it
+MAX_RETRIES = 3
+RETRY_ERRORS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+# Batches buffered per worker in --workers mode
+QUEUE_DEPTH = 2
+
+
+def location_key(venue_name, zip_code):
+    """Normalized (venue_name, zip) used to match venues in memory.
+
+    Case and whitespace are ignored, as the column's case-insensitive
+    collation already did for the old per-event query.
+    """
+    return ' '.join(venue_name.split()).casefold(), (zip_code or '').strip() or None
+
+
+class LocationCache:
+    """Maps (normalized venue_name, zip) to location_id for one import.
+
+    Every existing location, and every spelling dedupe_venues.py merged
+    into one (location_alias), is loaded up front. New venues are
+    batch-inserted once per batch of normalized rows (prepare) and
+    everything else is resolved from memory, replacing a SELECT, and
+    sometimes an INSERT, per event.
+    """
+
+    def __init__(self, cursor):
+        self.ids = {}
+        self.hits = 0
+        self.misses = 0
+        with stage('locations'):
+            cursor.execute("SELECT location_id, venue_name, zip_code FROM Location ORDER BY location_id")
+            for location_id, venue_name, zip_code in cursor.fetchall():
+                self.ids.setdefault(location_key(venue_name, zip_code), location_id)
+            cursor.execute("SELECT location_id, venue_name, zip_code FROM location_alias ORDER BY alias_id")
+            for location_id, venue_name, zip_code in cursor.fetchall():
+                self.ids.setdefault(location_key(venue_name, zip_code), location_id)
+
+    def prepare(self, cursor, rows):
+        """Insert the venues of normalized rows that are not cached yet, in one batch"""
+        self.add(cursor, (row[5:9] for row in rows))
+
+    def add(self, cursor, venues):
+        """Insert the (venue_name, street, city, zip) venues that are not cached yet, in one batch"""
+        with stage('locations'):
+            self._insert_new(cursor, venues)
+
+    def _insert_new(self, cursor, venues):
+        new = {}
+        for venue_name, street, city, zip_code in venues:
+            key = location_key(venue_name, zip_code)
+            if key in self.ids or key in new:
+                self.hits += 1
+                continue
+            self.misses += 1
+            new[key] = (venue_name, street, city, zip_code)
+
+        if not new:
+            return
+        cursor.executemany(
+            "INSERT INTO Location (venue_name, address, city, zip_code) VALUES (%s, %s, %s, %s)",
+            list(new.values())
+        )
+        names = list({row[0] for row in new.values()})
+        placeholders = ', '.join(['%s'] * len(names))
+        cursor.execute(
+            f"SELECT location_id, venue_name, zip_code FROM Location WHERE venue_name IN ({placeholders})",
+            names
+        )
+        for location_id, venue_name, zip_code in cursor.fetchall():
+            self.ids.setdefault(location_key(venue_name, zip_code), location_id)
 
+    def get(self, venue_name, zip_code):
+        if not venue_name:
+            return None
+        return self.ids.get(location_key(venue_name, zip_code or None))
 
-def get_or_create_location(cursor, venue_name, street, city, zip_code):
-    """Get existing location_id or create new location, return location_id"""
-    if not venue_name:
-        return None
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
 
-    try:
-        # Check if location exists (match by venue_name and zip_code)
-        query = """
-                SELECT location_id \
-                FROM location
-                WHERE venue_name = %s \
-                  AND COALESCE(zip_code, '') = COALESCE(%s, '') \
-                """
-        cursor.execute(query, (venue_name, zip_code))
-        result = cursor.fetchone()
-
-        if result:
-            # print(f"Using existing location_id: {result[0]}")
-            return result[0]
-
-        # Location doesn't exist, create it
-        insert_query = """
-                       INSERT INTO location (venue_name, address, city, zip_code)
-                       VALUES (%s, %s, %s, %s) \
-                       """
-        cursor.execute(insert_query, (venue_name, street, city, zip_code))
-        location_id = cursor.lastrowid
-        # print(f"Created new location_id: {location_id} for '{venue_name}'")
-        return location_id
 
-    except mysql.connector.Error as e:
-        # print(f"  Warning: Error handling location '{venue_name}': {e}")
-        return None
+def natural_key(event_name, event_date):
+    """(name, date) as the uq_event_natural_key index compares them.
+
+    Case and whitespace are folded to approximate the column's collation;
+    this is only used to find an event's stored hash and to route it to a
+    worker, never to decide on its own that two events are the same.
+    """
+    return ' '.join(event_name.split()).casefold(), str(event_date)
+
+
+def content_hash(event_name, event_date, start_time, end_time, venue_name, street, city, zip_code):
+    """MD5 of the fields an import writes, stored in Event.content_hash.
+
+    A re-import compares it with the stored hash and leaves the event alone
+    when nothing it would write has changed upstream.
+    """
+    fields = (event_name, event_date, start_time, end_time, venue_name, street, city, zip_code)
+    text = '\x1f'.join('' if field is None else str(field) for field in fields)
+    return hashlib.md5(text.encode('utf-8')).digest()
 
 
-def event_exists(cursor, event_name, event_date):
-    """Check if event already exists in database"""
-    query = """
-            SELECT event_id \
-            FROM event
-            WHERE event_name = %s \
-              AND event_date = %s \
-            """
-    cursor.execute(query, (event_name, event_date))
-    return cursor.fetchone() is not None
+# Columns an import may change on an existing event. MySQL applies these
+# assignments left to right, so content_hash must come last for the other
+# comparisons to see the stored hash.
+UPSERT_COLUMNS = ('start_time', 'end_time', 'location_id', 'content_hash')
 
 
-def import_events(json_file, host, user, password, database, skip_duplicates=True):
+def upsert_clause(source):
+    """ON DUPLICATE KEY UPDATE that only rewrites an event whose hash differs"""
+    return 'ON DUPLICATE KEY UPDATE ' + ', '.join(
+        f"{column} = IF(Event.content_hash <=> {source}.content_hash, Event.{column}, {source}.{column})"
+        for column in UPSERT_COLUMNS
+    )
+
+
+UPSERT_EVENT = f"""
+    INSERT INTO Event (event_name, event_date, start_time, end_time, organizer_id, location_id, content_hash)
+    VALUES (%s, %s, %s, %s, NULL, %s, %s) AS new
+    {upsert_clause('new')}
+"""
+
 
-    # Resolve JSON file path - search multiple locations
-    json_path = None
+def stored_hashes(cursor, rows):
+    """{natural_key: content_hash} for the normalized rows already in Event (one query)"""
+    keys = list({(row[1], row[2]) for row in rows})
+    if not keys:
+        return {}
+    placeholders = ', '.join(['(%s, %s)'] * len(keys))
+    with stage('duplicate_check'):
+        cursor.execute(
+            f"SELECT event_name, event_date, content_hash FROM Event "
+            f"WHERE (event_name, event_date) IN ({placeholders})",
+            [value for key in keys for value in key]
+        )
+        return {natural_key(name, date): digest for name, date, digest in cursor.fetchall()}
+
+
+def find_json_file(json_file):
+    """Resolve the JSON file path - search multiple locations"""
     search_paths = [
         Path(json_file),                           # exact path provided
         Path(__file__).parent / json_file,         # same directory as script
         Path(__file__).parent.parent / json_file,  # parent directory (repo root)
         Path.cwd() / json_file,                    # current working directory
     ]
-    
+
     for path in search_paths:
         if path.exists():
-            json_path = path
-            # print(f"Found JSON file at: {json_path}")
-            break
-    
-    if not json_path:
-        print(f"Error: File '{json_file}' not found in any of:")
-        for path in search_paths:
-            print(f"   - {path}")
-        sys.exit(1)
+            return path
 
-    # Load JSON data
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            events = json.load(f)
-        # print(f"Loaded {len(events)} events from {json_path}")
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON file: {e}")
-        sys.exit(1)
+    print(f"Error: File '{json_file}' not found in any of:")
+    for path in search_paths:
+        print(f"   - {path}")
+    sys.exit(1)
 
-    # Connect to database
-    connection = connect_to_db(host, user, password, database)
+
+def commit_batch(connection, work):
+    """Run work(cursor, totals) for one batch and commit it; returns the batch's totals.
+
+    A deadlock or lock wait timeout rolls the batch back, so it is rerun
+    from scratch with fresh counts.
+    """
+    for attempt in range(MAX_RETRIES):
+        totals = Counter()
+        cursor = connection.cursor()
+        try:
+            work(cursor, totals)
+            connection.commit()
+            return totals
+        except mysql.connector.Error as e:
+            connection.rollback()
+            if e.errno not in RETRY_ERRORS or attempt == MAX_RETRIES - 1:
+                raise
+            time.sleep(0.05 * 2 ** attempt)
+        finally:
+            cursor.close()
+
+
+def normalize_rows(batch, row_numbers, totals, rejects=None):
+    """Validate a batch with normalize_batch; counts and logs the rejects.
+
+    Returns the accepted rows: (row_no, name, date, start, end, venue,
+    street, city, zip), ready to hash and insert.
+    """
+    started = time.perf_counter()
+    rows, rejected = normalize_batch(batch, row_numbers)
+    totals['total'] += len(batch)
+    for _, category, _, _ in rejected:
+        totals[category] += 1
+    if rejects:
+        with stage('validate'):
+            rejects.write(rejected)
+    totals['normalize_seconds'] += time.perf_counter() - started
+    return rows
+
+
+def import_rows(connection, events, batch_size=5000, checkpoint=None, rejects=None):
+    """Import events one at a time, committing every batch_size events.
+
+    Each batch is validated by normalize_rows first. Venues are resolved
+    through a LocationCache, and the stored content hashes of each batch's
+    events are read with one query, so unchanged events cost no round
+    trips at all.
+    """
     cursor = connection.cursor()
+    locations = LocationCache(cursor)
 
     # Statistics
-    inserted = 0
-    skipped = 0
-    errors = 0
+    totals = Counter()
+
+    row_no = checkpoint.offset if checkpoint else 0
+    for batch in timed(batched(events, batch_size), 'load'):
+        rows = normalize_rows(batch, range(row_no + 1, row_no + len(batch) + 1), totals, rejects)
+        # New venues are committed first, so a retried batch finds them cached
+        locations.prepare(cursor, rows)
+        connection.commit()
+        # Commit each batch so memory and undo stay bounded by batch_size
+        totals.update(commit_batch(connection, partial(import_row_batch, rows=rows, locations=locations)))
+        row_no += len(batch)
+        if checkpoint:
+            checkpoint.advance(len(batch))
+
+    cursor.close()
+    totals['location_hits'] = locations.hits
+    totals['location_misses'] = locations.misses
+    totals['location_hit_rate'] = locations.hit_rate()
+    return totals
 
-    print(f"Starting import...")
 
-    for i, event in enumerate(events, 1):
-        try:
-            # Extract and parse data
-            event_name = event.get('title')
-            event_date = parse_date(event.get('date'))
-            start_time = parse_time(event.get('start_time'))
-            end_time = parse_time(event.get('end_time'))
-
-            # Get venue information
-            venue_name = event.get('venue_name')
-            street = event.get('street')
-            city = event.get('city')
-            zip_code = event.get('zip_code')
-
-            # Validation
-            if not event_name or not event_date:
-                # print(f"  [{i}/{len(events)}] Skipping event - missing name or date")
-                skipped += 1
-                continue
+def import_row_batch(cursor, totals, rows, locations):
+    """Upsert a batch of normalized rows one by one; the caller commits"""
+    stored = stored_hashes(cursor, rows)
 
-            # Check for duplicates
-            if skip_duplicates and event_exists(cursor, event_name, event_date):
-                # print(f"  [{i}/{len(events)}] Skipping duplicate: {event_name}")
-                skipped += 1
+    for row in rows:
+        row_no, event_name, event_date, start_time, end_time, venue_name, street, city, zip_code = row
+        try:
+            # Unchanged since the last import: nothing to write
+            key = natural_key(event_name, event_date)
+            digest = content_hash(*row[1:])
+            if stored.get(key) == digest:
+                totals['unchanged'] += 1
                 continue
 
-            # Get or create location (this adds to location table if new)
-            location_id = get_or_create_location(cursor, venue_name, street, city, zip_code)
-
-            # Insert event
-            insert_query = """
-                           INSERT INTO event (event_name, event_date, start_time, end_time, organizer_id, location_id)
-                           VALUES (%s, %s, %s, %s, null, %s) \
-                           """
+            # New venues were inserted by locations.prepare()
+            location_id = locations.get(venue_name, zip_code)
 
-            cursor.execute(insert_query, (
-                event_name,
-                event_date,
-                start_time,
-                end_time,
-                location_id
-            ))
+            # Insert the event, or update it in place if its content changed
+            with stage('insert'):
+                cursor.execute(UPSERT_EVENT, (
+                    event_name,
+                    event_date,
+                    start_time,
+                    end_time,
+                    location_id,
+                    digest
+                ))
+            stored[key] = digest
 
-            inserted += 1
-            if inserted % 10 == 0:
-                # print(f"  [{i}/{len(events)}]  Imported {inserted} events...")
-                pass
+            # Affected rows: 1 for an insert, 2 for an update, 0 if the hash already matched
+            totals[{1: 'inserted', 2: 'updated'}.get(cursor.rowcount, 'unchanged')] += 1
 
         except mysql.connector.Error as e:
-            # print(f"  [{i}/{len(events)}]  Error importing event '{event.get('title', 'Unknown')}': {e}")
-            errors += 1
+            # The transaction is gone; commit_batch reruns the whole batch
+            if e.errno in RETRY_ERRORS:
+                raise
+            # print(f"  [{row_no}]  Error importing event '{event_name}': {e}")
+            totals['errors'] += 1
             continue
-        except Exception as e:
-            print(f"  [{i}/{len(events)}]  Unexpected error: {e}")
-            errors += 1
+
+
+# Staging table for --bulk; TEMPORARY, so it is private to this connection
+STAGE_TABLE = """
+    CREATE TEMPORARY TABLE import_event_stage (
+        row_no INT PRIMARY KEY,
+        event_name VARCHAR(150) NOT NULL,
+        event_date DATE NOT NULL,
+        start_time TIME NOT NULL,
+        end_time TIME,
+        venue_name VARCHAR(255) NOT NULL,
+        address VARCHAR(255),
+        city VARCHAR(100),
+        zip_code VARCHAR(10),
+        content_hash BINARY(16) NOT NULL,
+        location_id INT,
+        INDEX idx_stage_venue (venue_name, zip_code),
+        INDEX idx_stage_event (event_name, event_date)
+    )
+"""
+
+
+def create_stage_table(connection):
+    cursor = connection.cursor()
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS import_event_stage")
+    cursor.execute(STAGE_TABLE)
+    cursor.close()
+
+
+def drop_stage_table(connection):
+    cursor = connection.cursor()
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS import_event_stage")
+    cursor.close()
+
+
+def import_bulk(connection, events, batch_size=5000, checkpoint=None, rejects=None):
+    """Import events through a staging table with set-based SQL.
+
+    Each batch is validated by normalize_rows, so one bad row cannot fail
+    a whole set-based INSERT, and the rows are inserted into a temporary
+    staging table. New venues, location ids, unchanged events and the
+    upsert of the rest are then each handled by one statement and the
+    batch is committed, so round trips scale with the number of batches
+    rather than events.
+    """
+    totals = Counter()
+    create_stage_table(connection)
+
+    row_no = checkpoint.offset if checkpoint else 0
+    for batch in timed(batched(events, batch_size), 'load'):
+        rows = normalize_rows(batch, range(row_no + 1, row_no + len(batch) + 1), totals, rejects)
+        totals.update(commit_batch(connection, partial(stage_batch, rows=rows)))
+        row_no += len(batch)
+        if checkpoint:
+            checkpoint.advance(len(batch))
+
+    drop_stage_table(connection)
+    return totals
+
+
+def stage_batch(cursor, totals, rows, locations=None):
+    """Load a batch of normalized rows through the staging table; the caller commits.
+
+    With a LocationCache whose venues were all inserted beforehand, location
+    ids are filled in from memory and no Location rows are written.
+    """
+    staged = []
+    seen = set()
+    for row in rows:
+        # Repeats within the batch would upsert the same row twice in one statement
+        key = natural_key(row[1], row[2])
+        if key in seen:
+            totals['skipped'] += 1
             continue
+        seen.add(key)
+        row += (content_hash(*row[1:]),)
+        if locations is not None:
+            row += (locations.get(row[5], row[8]),)
+        staged.append(row)
+
+    if staged:
+        load_stage_batch(cursor, staged, totals, resolved=locations is not None)
+
+
+def load_stage_batch(cursor, rows, totals, resolved=False):
+    """Stage one batch and move it into Location and Event with set-based statements"""
+    insert_stage = f"""
+        INSERT INTO import_event_stage
+            (row_no, event_name, event_date, start_time, end_time, venue_name, address, city, zip_code,
+             content_hash{', location_id' if resolved else ''})
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s{', %s' if resolved else ''})
+    """
+    with stage('insert'):
+        cursor.executemany(insert_stage, rows)
+
+    with stage('locations'):
+        if not resolved:
+            # New venues, one row per (venue_name, zip_code); ZIPs are never '' (see
+            # chk_zip_format), so <=> matches what COALESCE(zip_code, '') did
+            cursor.execute("""
+                INSERT INTO Location (venue_name, address, city, zip_code)
+                SELECT s.venue_name, MIN(s.address), MIN(s.city), s.zip_code
+                FROM import_event_stage s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM Location l
+                    WHERE l.venue_name = s.venue_name AND l.zip_code <=> s.zip_code
+                ) AND NOT EXISTS (
+                    SELECT 1 FROM location_alias a
+                    WHERE a.venue_name = s.venue_name AND a.zip_code <=> s.zip_code
+                )
+                GROUP BY s.venue_name, s.zip_code
+            """)
+            totals['locations_created'] += cursor.rowcount
+
+            cursor.execute("""
+                UPDATE import_event_stage s
+                JOIN Location l ON l.venue_name = s.venue_name AND l.zip_code <=> s.zip_code
+                SET s.location_id = l.location_id
+            """)
+            # Spellings merged into another venue by dedupe_venues.py
+            cursor.execute("""
+                UPDATE import_event_stage s
+                JOIN location_alias a ON a.venue_name = s.venue_name AND a.zip_code <=> s.zip_code
+                SET s.location_id = a.location_id
+                WHERE s.location_id IS NULL
+            """)
+
+        cursor.execute("SELECT COUNT(*) FROM import_event_stage WHERE location_id IS NULL")
+        unresolved = cursor.fetchone()[0]
+        totals['errors'] += unresolved
+
+    # Events whose stored hash matches are left untouched
+    with stage('duplicate_check'):
+        cursor.execute("""
+            DELETE s FROM import_event_stage s
+            JOIN Event e ON e.event_name = s.event_name AND e.event_date = s.event_date
+            WHERE e.content_hash = s.content_hash
+        """)
+        unchanged = cursor.rowcount
+        totals['unchanged'] += unchanged
+
+    with stage('insert'):
+        cursor.execute(f"""
+            INSERT INTO Event (event_name, event_date, start_time, end_time, organizer_id, location_id, content_hash)
+            SELECT s.event_name, s.event_date, s.start_time, s.end_time, NULL, s.location_id, s.content_hash
+            FROM import_event_stage s
+            WHERE s.location_id IS NOT NULL
+            ORDER BY s.row_no
+            {upsert_clause('s')}
+        """)
+        # Affected rows count 1 per insert and 2 per update
+        upserted = len(rows) - unresolved - unchanged
+        updated = cursor.rowcount - upserted
+        totals['updated'] += updated
+        totals['inserted'] += upserted - updated
+
+        cursor.execute("DELETE FROM import_event_stage")
+
+
+def partition(event, workers):
+    """Worker index for an event, from a stable hash of its natural key.
+
+    Every copy of an event lands on the same worker, so upserts of one key
+    never race across connections. crc32 (unlike hash()) gives the same
+    split on every run.
+    """
+    title = event.get('title')
+    # Coerced like normalize.text_column, so a numeric title routes instead of crashing
+    name, event_date = natural_key('' if title is None else str(title), parse_date(event.get('date')))
+    return zlib.crc32(f"{name}\x1f{event_date}".encode('utf-8')) % workers
+
+
+def import_parallel(db_config, json_path, workers, bulk=False, batch_size=5000, checkpoint=None, skip=0,
+                    rejects=None):
+    """Import events through `workers` pooled connections, one thread each.
+
+    Venues are resolved once up front: a first pass over the file inserts
+    every new venue from a single connection, so workers only read the
+    LocationCache and never race to create the same venue. The second pass
+    partitions events by partition() into one bounded queue per worker;
+    each worker commits its own batches, retrying them on deadlock.
+
+    Every worker counts into its own totals, merged in worker order once
+    all have finished, so the summary does not depend on thread timing.
+
+    Workers commit out of file order, so the checkpoint records the longest
+    prefix of the file whose events are all committed: everything before
+    the first event of the oldest batch still in flight on any worker.
+    After a resume, events past that prefix that had already committed are
+    counted as unchanged.
+    """
+    connection = import_profile.wrap(mysql.connector.connect(**db_config))
+    cursor = connection.cursor()
+    locations = LocationCache(cursor)
+    for batch in timed(batched(islice(iter_events(json_path), skip, None), batch_size), 'load'):
+        rows, _ = normalize_batch(batch, range(len(batch)))
+        locations.prepare(cursor, rows)
+        connection.commit()
+    cursor.close()
+    connection.close()
+
+    pool = pooling.MySQLConnectionPool(pool_name='jsonTOsql', pool_size=workers, **db_config)
+    queues = [queue.Queue(maxsize=QUEUE_DEPTH) for _ in range(workers)]
+    results = [Counter() for _ in range(workers)]
+    failures = [None] * workers
+
+    # File offset of the first event of each uncommitted batch, per worker
+    in_flight = [deque() for _ in range(workers)]
+    positions = [[] for _ in range(workers)]
+    read = skip
+    lock = threading.Lock()
+
+    def committed(index):
+        with lock:
+            in_flight[index].popleft()
+            if checkpoint:
+                checkpoint.save(min((starts[0] for starts in in_flight if starts), default=read))
+
+    def work(index):
+        connection = None
+        try:
+            connection = import_profile.wrap(pool.get_connection())
+            cursor = connection.cursor()
+            # Hash lookups are plain reads; no gap locks between workers
+            cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+            cursor.close()
+            if bulk:
+                create_stage_table(connection)
+        except mysql.connector.Error as e:
+            failures[index] = e
 
-    # Commit changes
-    connection.commit()
+        while True:
+            item = queues[index].get()
+            if item is None:
+                break
+            # After a failure keep draining the queue so the reader never blocks
+            if failures[index] is None:
+                batch, row_numbers = item
+                try:
+                    rows = normalize_rows(batch, row_numbers, results[index], rejects)
+                    if bulk:
+                        run = partial(stage_batch, rows=rows, locations=locations)
+                    else:
+                        run = partial(import_row_batch, rows=rows, locations=locations)
+                    results[index].update(commit_batch(connection, run))
+                    committed(index)
+                except Exception as e:
+                    failures[index] = e
+
+        if connection is not None:
+            if bulk and failures[index] is None:
+                drop_stage_table(connection)
+            connection.close()
+
+    threads = [threading.Thread(target=work, args=(i,), name=f"import-{i}") for i in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    pending = [[] for _ in range(workers)]
+    try:
+        for event in timed(islice(iter_events(json_path), skip, None), 'load'):
+            index = partition(event, workers)
+            with lock:
+                if not pending[index]:
+                    in_flight[index].append(read)
+                read += 1
+            pending[index].append(event)
+            # Row numbers are 1-based file positions, as in the serial import
+            positions[index].append(read)
+            if len(pending[index]) == batch_size:
+                queues[index].put((pending[index], positions[index]))
+                pending[index] = []
+                positions[index] = []
+        for index, batch in enumerate(pending):
+            if batch:
+                queues[index].put((batch, positions[index]))
+    finally:
+        for q in queues:
+            q.put(None)
+        for thread in threads:
+            thread.join()
+
+    for error in failures:
+        if error is not None:
+            raise error
+
+    totals = Counter()
+    for worker_totals in results:
+        totals.update(worker_totals)
+    totals['location_hits'] = locations.hits
+    totals['location_misses'] = locations.misses
+    totals['location_hit_rate'] = locations.hit_rate()
+    totals['workers'] = [dict(worker_totals) for worker_totals in results]
+    return totals
+
+
+def refresh_derived_tables(connection):
+    """Rebuild the listing and similarity tables after new events land"""
+    cursor = connection.cursor()
+
+    # Rebuild the materialized listing read by /api/events (swapped in atomically)
+    try:
+        cursor.callproc('refresh_upcoming_event_listing')
+    except mysql.connector.Error as e:
+        print(f"Warning: could not refresh upcoming_event_listing: {e}")
+    cursor.close()
+
+    # Recompute "similar events" so the new rows can be recommended
+    try:
+        similarity = build_similarity(connection)
+        print(f"Similar events: {similarity['pairs']} pairs for {similarity['events']} events")
+    except mysql.connector.Error as e:
+        print(f"Warning: could not rebuild event_similarity: {e}")
+
+
+def print_import_summary(totals, elapsed, rejects, skip=0):
+    """Print the counts of an import (the lines between the summary banners)"""
+    if skip:
+        print(f"Events committed before resuming: {skip}")
+    print(f"Total events {'imported this run' if skip else 'in file'}: {totals['total']}")
+    print(f"Successfully imported: {totals['inserted']}")
+    print(f"Updated (changed upstream): {totals['updated']}")
+    print(f"Unchanged: {totals['unchanged']}")
+    print(f"Skipped (missing name/date or repeated): {totals['skipped']}")
+    print(f"Errors: {totals['errors']}")
+    if rejects.count:
+        print(f"Rejected rows and reasons: {rejects.path} ({rejects.count} written)")
+    if totals['normalize_seconds']:
+        print(f"Validation: {totals['normalize_seconds']:.2f}s "
+              f"({totals['total'] / totals['normalize_seconds']:.0f} rows/sec)")
+    if 'locations_created' in totals:
+        print(f"New locations: {totals['locations_created']}")
+    if 'location_hit_rate' in totals:
+        print(f"Location cache hit rate: {totals['location_hit_rate']:.1%} "
+              f"({totals['location_hits']} hits, {totals['location_misses']} new venues)")
+    for i, worker_totals in enumerate(totals.get('workers', [])):
+        print(f"  Worker {i}: {worker_totals.get('total', 0)} events, "
+              f"{worker_totals.get('inserted', 0)} imported, {worker_totals.get('updated', 0)} updated, "
+              f"{worker_totals.get('unchanged', 0)} unchanged, {worker_totals.get('skipped', 0)} skipped, "
+              f"{worker_totals.get('errors', 0)} errors")
+    print(f"Import time: {elapsed:.2f}s ({totals['total'] / elapsed if elapsed else 0:.0f} rows/sec)")
+
+
+def import_events(json_file, host, user, password, database, bulk=False, batch_size=5000, workers=1,
+                  resume=False, checkpoint_file=None, rejects_file=None, profile_file=None, dry_run=False):
+    """Import a feed and print a summary.
+
+    With profile_file (or dry_run) each stage is timed and its round trips
+    counted, and the report is written as JSON. A dry run keeps the whole
+    import in one transaction and rolls it back instead of committing, so
+    nothing is checkpointed and the derived tables are not rebuilt.
+    """
+    json_path = find_json_file(json_file)
+
+    profile = None
+    if profile_file is not None or dry_run:
+        profile = Profile(dry_run=dry_run)
+        profile_file = profile_file or f"{json_path}.profile.json"
+        import_profile.activate(profile)
+
+    # Progress is checkpointed after every committed batch
+    checkpoint = Checkpoint(checkpoint_file or f"{json_path}.checkpoint", json_path)
+    skip = 0
+    if resume:
+        try:
+            skip = checkpoint.resume()
+        except (ValueError, KeyError, json.JSONDecodeError) as e:
+            print(f"Error: Cannot resume: {e}")
+            sys.exit(1)
+        if skip:
+            print(f"Resuming after {skip} committed events ({checkpoint.path})")
+        else:
+            print(f"No checkpoint at {checkpoint.path}; starting from the beginning")
+
+    # A resumed import adds to the rejects of the interrupted one
+    rejects = RejectLog(rejects_file or f"{json_path}.rejected.ndjson", append=skip > 0)
+
+    # Connect to database
+    connection = import_profile.wrap(connect_to_db(host, user, password, database))
+
+    mode = 'bulk ' if bulk else ''
+    print(f"Starting {'dry run of ' if dry_run else ''}{mode}import"
+          f"{f' with {workers} workers' if workers > 1 else ''}...")
+    started = time.perf_counter()
+    if dry_run:
+        # Nothing is committed, so there is no progress to record
+        checkpoint = None
+    else:
+        checkpoint.save(skip)
+    try:
+        if workers > 1:
+            db_config = {'host': host, 'user': user, 'password': password, 'database': database}
+            totals = import_parallel(db_config, json_path, workers, bulk, batch_size, checkpoint, skip, rejects)
+        else:
+            events = islice(iter_events(json_path), skip, None)
+            if bulk:
+                totals = import_bulk(connection, events, batch_size, checkpoint, rejects)
+            else:
+                totals = import_rows(connection, events, batch_size, checkpoint, rejects)
+    except (json.JSONDecodeError, ValueError) as e:
+        # Batches before the bad record are already committed
+        print(f"Error: Invalid JSON file: {e}")
+        connection.close()
+        sys.exit(1)
+    except mysql.connector.Error as e:
+        print(f"Error: Import failed: {e}")
+        if checkpoint:
+            print(f"Committed progress is saved in {checkpoint.path}; rerun with --resume to continue")
+        connection.close()
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+
+    if dry_run:
+        connection.rollback()
+    else:
+        checkpoint.clear()
+        with stage('derived_tables'):
+            refresh_derived_tables(connection)
 
     # Print summary
     print(f"{'=' * 60}")
     print(f"Import Summary:")
-    print(f"Total events in file: {len(events)}")
-    print(f"Successfully imported: {inserted}")
-    print(f"Skipped (duplicates): {skipped}")
-    print(f"Errors: {errors}")
+    print_import_summary(totals, elapsed, rejects, skip)
+    if profile:
+        report = profile.report(totals, elapsed, file=str(json_path), mode='bulk' if bulk else 'rows',
+                                workers=workers, batch_size=batch_size)
+        import_profile.activate(None)
+        import_profile.write_report(report, profile_file)
+        print(f"{'-' * 60}")
+        import_profile.print_report(report)
+        print(f"Profile report: {profile_file}")
+    if dry_run:
+        print(f"Dry run: all changes rolled back")
     print(f"{'=' * 60}")
 
     # Close connection
-    cursor.close()
     connection.close()
-    # print(" Database connection closed")
+    return totals
 
 
 if __name__ == "__main__":
     # Parse command-line arguments
     args = parse_args()
-    
-    # Configuration
-    JSON_FILE = './maine_events.json'  # Your JSON file name
-    SKIP_DUPLICATES = True  # Set to False to allow duplicate events
 
     import_events(
-        JSON_FILE,
-        host= config["host"],
-        user= config["user"],
-        password= config["password"],
-        database= config["database"],
-        skip_duplicates=SKIP_DUPLICATES
+        args.file,
+        host=args.host,
+        user=args.user,
+        password=args.password,
+        database=args.database,
+        bulk=args.bulk,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        resume=args.resume,
+        checkpoint_file=args.checkpoint,
+        rejects_file=args.rejects,
+        profile_file=args.profile,
+        dry_run=args.dry_run
     )
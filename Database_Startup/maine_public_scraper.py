@@ -8,13 +8,68 @@ Date: 11/15/2025
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 import json
+import threading
 import time
 import re
 from datetime import datetime
 import os
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
+
+from address_parser import parse_address
+from event_stream import append_ndjson, iter_events, write_json_array
+
+CALENDAR_URL = "https://www.mainepublic.org/community-calendar?f0=&from=&to=&q="
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml',
+    'Accept-Encoding': 'gzip, deflate',
+}
+REQUEST_TIMEOUT = 10
+# Retried with backoff, and treated as overload by the async engine
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRIES = 2
+RETRY_BACKOFF = 0.5
+
+# Keep-alive connections a session holds per host; set to the worker count by configure_http()
+_pool_size = 12
+_local = threading.local()
+
+
+def configure_http(workers):
+    """Size the connection pools of sessions created from now on to the worker count"""
+    global _pool_size
+    _pool_size = max(1, workers)
+
+
+def get_session():
+    """This thread's requests.Session.
+
+    Its connections to mainepublic.org are kept alive and reused for every
+    listing and detail page the thread fetches, instead of paying a new TCP
+    and TLS handshake per request. Connection errors, 429s and 5xx
+    responses are retried with backoff.
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        retries = Retry(total=RETRIES, backoff_factor=RETRY_BACKOFF, status_forcelist=RETRY_STATUSES,
+                        allowed_methods=('GET',))
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=_pool_size, max_retries=retries)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _local.session = session
+    return session
+
+
+def fetch(url):
+    return get_session().get(url, timeout=REQUEST_TIMEOUT)
 
 
 def parse_date_from_time_element(time_elem):
@@ -210,171 +265,99 @@ def parse_time_info(time_elem):
     return start_time, end_time, event_type, frequency_notes
 
 
-def parse_address(address_string):
-    """Parse address string into components"""
-    if not address_string:
-        return None, None, None, None
-
-    try:
-        # Clean the address - replace newlines with commas
-        address = address_string.strip().replace('\n', ', ')
-
-        # Try to parse: "123 Main St, Portland, ME 04101"
-        # Split by comma
-        parts = [p.strip() for p in address.split(',') if p.strip()]
-
-        street = None
-        city = None
-        state = None
-        zip_code = None
-
-        if len(parts) >= 1:
-            street = parts[0]
-
-        if len(parts) >= 2:
-            # Check if second part contains state and zip
-            second_part = parts[1].strip()
-            # Look for state/zip pattern in second part
-            state_zip_match = re.search(r'([A-Z]{2})\s*(\d{5}(?:-\d{4})?)', second_part)
-            if state_zip_match:
-                # Second part has state and zip, so no separate city
-                state = state_zip_match.group(1)
-                zip_code = state_zip_match.group(2)
-                # Try to extract city from before the state
-                city_part = re.sub(r'[A-Z]{2}\s*\d{5}(?:-\d{4})?', '', second_part).strip()
-                if city_part:
-                    city = city_part
-            else:
-                # Second part is likely city
-                city = second_part
-
-        if len(parts) >= 3:
-            # Third part usually contains state and/or zip
-            last_part = parts[2].strip()
-
-            # Try to extract state (2 letters) and zip (5 digits or 5+4)
-            match = re.search(r'([A-Z]{2})\s*(\d{5}(?:-\d{4})?)', last_part)
-            if match:
-                if not state:  # Only set if not already set
-                    state = match.group(1)
-                if not zip_code:  # Only set if not already set
-                    zip_code = match.group(2)
-            else:
-                # Try just zip code
-                zip_match = re.search(r'(\d{5}(?:-\d{4})?)', last_part)
-                if zip_match and not zip_code:
-                    zip_code = zip_match.group(1)
-
-                # Try just state
-                state_match = re.search(r'\b([A-Z]{2})\b', last_part)
-                if state_match and not state:
-                    state = state_match.group(1)
-
-        # If we still don't have state but have a part that looks like a state name
-        if not state:
-            for part in parts:
-                if part.strip() in ['Maine', 'ME']:
-                    state = 'ME'
-                    break
+def parse_event_details(html):
+    """Location details from an event page's HTML"""
+    soup = BeautifulSoup(html, 'html.parser')
+    location_data = {
+        'venue_name': None,
+        'street': None,
+        'city': None,
+        'state': None,
+        'zip_code': None,
+        'phone': None,
+        'email': None,
+        'website': None
+    }
 
-        return street, city, state, zip_code
+    # Find venue information section
+    venue_info = soup.find('div', class_='VenueInformation')
 
-    except Exception as e:
-        print(f"Error parsing address '{address_string}': {e}")
-        return None, None, None, None
+    if venue_info:
+        # Extract venue name - try multiple possible locations
+        venue_name_elem = venue_info.find('span', class_='VenueInformation-text-name')
+        if not venue_name_elem:
+            # Try alternate location
+            venue_name_elem = venue_info.find('div', class_='VenueInformation-text')
+            if venue_name_elem:
+                name_span = venue_name_elem.find('span')
+                if name_span:
+                    venue_name_elem = name_span
+
+        if venue_name_elem:
+            location_data['venue_name'] = venue_name_elem.text.strip()
+
+        # Extract address components directly from specific elements
+        street_elem = venue_info.find('span', class_='VenueInformation-address-street')
+        city_elem = venue_info.find('span', class_='VenueInformation-address-city')
+        state_elem = venue_info.find('span', class_='VenueInformation-address-state')
+        zip_elem = venue_info.find('span', class_='VenueInformation-address-zip')
+
+        # The spans are not reliable field by field (the site puts "Suite 26A" in
+        # the city span), so they are joined and parsed as one address
+        lines = [elem.text.strip() for elem in (street_elem, city_elem) if elem]
+        lines.append(' '.join(elem.text.strip() for elem in (state_elem, zip_elem) if elem))
+        if street_elem or city_elem:
+            street, city, state, zip_code = parse_address(', '.join(lines))
+            location_data['street'] = street
+            location_data['city'] = city
+            location_data['state'] = state or (state_elem.text.strip() if state_elem else None)
+            location_data['zip_code'] = zip_code
+
+        # Fallback: if we didn't get address from spans, try the full address div
+        if not location_data['street']:
+            address_elem = venue_info.find('div', class_='VenueInformation-address')
+            if address_elem:
+                address_text = address_elem.text.strip()
+                street, city, state, zip_code = parse_address(address_text)
+                location_data['street'] = street or location_data['street']
+                location_data['city'] = city or location_data['city']
+                location_data['state'] = state or location_data['state']
+                location_data['zip_code'] = zip_code or location_data['zip_code']
+
+        # Extract phone
+        phone_elem = venue_info.find('div', class_='VenueInformation-phone')
+        if phone_elem:
+            location_data['phone'] = phone_elem.text.strip()
+
+        # Extract email
+        email_elem = venue_info.find('div', class_='VenueInformation-email')
+        if email_elem:
+            location_data['email'] = email_elem.text.strip()
+
+        # Extract website
+        website_elem = venue_info.find('div', class_='VenueInformation-website')
+        if website_elem:
+            link = website_elem.find('a')
+            if link and link.get('href'):
+                location_data['website'] = link['href']
+
+    # If venue_name is still None, try to get from the event page content
+    if not location_data['venue_name']:
+        # Try EventPage-venueInformation
+        venue_section = soup.find('div', class_='EventPage-venueInformation')
+        if venue_section:
+            venue_text = venue_section.find('div', class_='VenueInformation-text')
+            if venue_text:
+                location_data['venue_name'] = venue_text.text.strip().split('\n')[0].strip()
+
+    return location_data
 
 
 def scrape_event_details(event_url):
     """Scrape individual event page for location details"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-
-        response = requests.get(event_url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        location_data = {
-            'venue_name': None,
-            'street': None,
-            'city': None,
-            'state': None,
-            'zip_code': None,
-            'phone': None,
-            'email': None,
-            'website': None
-        }
-
-        # Find venue information section
-        venue_info = soup.find('div', class_='VenueInformation')
-
-        if venue_info:
-            # Extract venue name - try multiple possible locations
-            venue_name_elem = venue_info.find('span', class_='VenueInformation-text-name')
-            if not venue_name_elem:
-                # Try alternate location
-                venue_name_elem = venue_info.find('div', class_='VenueInformation-text')
-                if venue_name_elem:
-                    name_span = venue_name_elem.find('span')
-                    if name_span:
-                        venue_name_elem = name_span
-
-            if venue_name_elem:
-                location_data['venue_name'] = venue_name_elem.text.strip()
-
-            # Extract address components directly from specific elements
-            street_elem = venue_info.find('span', class_='VenueInformation-address-street')
-            city_elem = venue_info.find('span', class_='VenueInformation-address-city')
-            state_elem = venue_info.find('span', class_='VenueInformation-address-state')
-            zip_elem = venue_info.find('span', class_='VenueInformation-address-zip')
-
-            if street_elem:
-                location_data['street'] = street_elem.text.strip()
-            if city_elem:
-                location_data['city'] = city_elem.text.strip()
-            if state_elem:
-                location_data['state'] = state_elem.text.strip()
-            if zip_elem:
-                location_data['zip_code'] = zip_elem.text.strip()
-
-            # Fallback: if we didn't get address from spans, try the full address div
-            if not location_data['street']:
-                address_elem = venue_info.find('div', class_='VenueInformation-address')
-                if address_elem:
-                    address_text = address_elem.text.strip()
-                    street, city, state, zip_code = parse_address(address_text)
-                    location_data['street'] = street or location_data['street']
-                    location_data['city'] = city or location_data['city']
-                    location_data['state'] = state or location_data['state']
-                    location_data['zip_code'] = zip_code or location_data['zip_code']
-
-            # Extract phone
-            phone_elem = venue_info.find('div', class_='VenueInformation-phone')
-            if phone_elem:
-                location_data['phone'] = phone_elem.text.strip()
-
-            # Extract email
-            email_elem = venue_info.find('div', class_='VenueInformation-email')
-            if email_elem:
-                location_data['email'] = email_elem.text.strip()
-
-            # Extract website
-            website_elem = venue_info.find('div', class_='VenueInformation-website')
-            if website_elem:
-                link = website_elem.find('a')
-                if link and link.get('href'):
-                    location_data['website'] = link['href']
-
-        # If venue_name is still None, try to get from the event page content
-        if not location_data['venue_name']:
-            # Try EventPage-venueInformation
-            venue_section = soup.find('div', class_='EventPage-venueInformation')
-            if venue_section:
-                venue_text = venue_section.find('div', class_='VenueInformation-text')
-                if venue_text:
-                    location_data['venue_name'] = venue_text.text.strip().split('\n')[0].strip()
-
-        return location_data
-
+        response = fetch(event_url)
+        return parse_event_details(response.text)
     except Exception as e:
         print(f"Error scraping event details from {event_url}: {e}")
         return None
@@ -451,100 +434,107 @@ def create_event_key(event):
     return f"{title}|{date}|{start_time}"
 
 
-def scrape_event_listing(url, scrape_details=True):
-    """Scrape the main calendar listing page"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
+def parse_event_listing(html):
+    """Events on a calendar listing page's HTML, without venue details, past events skipped"""
+    soup = BeautifulSoup(html, 'html.parser')
+    events = []
 
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
+    # Find all event items
+    event_items = soup.find_all('li', class_='EventSearchResultsModule-results-item')
 
-        events = []
-        seen_keys = set()  # Track duplicates within the same page
+    print(f"    Found {len(event_items)} items on page")
 
-        # Find all event items
-        event_items = soup.find_all('li', class_='EventSearchResultsModule-results-item')
+    for item in event_items:
+        try:
+            # Find the PromoEvent element within the li
+            promo_event = item.find('ps-promo', class_='PromoEvent')
+            if not promo_event:
+                continue
 
-        print(f"    Found {len(event_items)} items on page")
+            # Extract title
+            title_elem = promo_event.find('h3', class_='PromoEvent-title')
+            if title_elem:
+                title_link = title_elem.find('a')
+                title = title_link.text.strip() if title_link else title_elem.text.strip()
+            else:
+                title = None
 
-        for item in event_items:
-            try:
-                # Find the PromoEvent element within the li
-                promo_event = item.find('ps-promo', class_='PromoEvent')
-                if not promo_event:
-                    continue
-
-                # Extract title
-                title_elem = promo_event.find('h3', class_='PromoEvent-title')
-                if title_elem:
-                    title_link = title_elem.find('a')
-                    title = title_link.text.strip() if title_link else title_elem.text.strip()
-                else:
-                    title = None
-
-                # Get event link
-                link_elem = promo_event.find('a', class_='PromoEvent-link-link')
-                event_url = link_elem['href'] if link_elem else None
-                if event_url and not event_url.startswith('http'):
-                    event_url = 'https://www.mainepublic.org' + event_url
-
-                # Extract description
-                desc_elem = promo_event.find('div', class_='PromoEvent-description')
-                desc = desc_elem.text.strip() if desc_elem else None
-
-                # Extract time info from listing
-                time_elem = promo_event.find('div', class_='PromoEvent-time')
-                start_time, end_time, event_type, frequency_notes = parse_time_info(time_elem)
-
-                # Extract date - first try from listing page, then from time element
-                date = parse_date_from_listing(promo_event)
-                if not date and time_elem:
-                    date = parse_date_from_time_element(time_elem)
-
-                # Skip past events
-                if date and is_past_event(date):
-                    continue
-
-                event_data = {
-                    'title': title,
-                    'desc': desc,
-                    'date': date,
-                    'start_time': start_time,
-                    'end_time': end_time,
-                    'event_type': event_type,
-                    'frequency_notes': frequency_notes,
-                    'url': event_url,
-                    'venue_name': None,
-                    'street': None,
-                    'city': None,
-                    'state': None,
-                    'zip_code': None,
-                    'phone': None,
-                    'email': None,
-                    'website': None,
-                }
+            # Get event link
+            link_elem = promo_event.find('a', class_='PromoEvent-link-link')
+            event_url = link_elem['href'] if link_elem else None
+            if event_url and not event_url.startswith('http'):
+                event_url = 'https://www.mainepublic.org' + event_url
 
-                # Scrape location details from event page (always enabled now)
-                if event_url:
-                    try:
-                        location_data = scrape_event_details(event_url)
-                        if location_data:
-                            event_data.update(location_data)
-                        time.sleep(0.2)  # Small delay after scraping event page
-                    except Exception as e:
-                        print(f"    Error getting location for {title}: {e}")
-
-                # Check for duplicates using unique key
-                event_key = create_event_key(event_data)
-                if event_key not in seen_keys:
-                    seen_keys.add(event_key)
-                    events.append(event_data)
+            # Extract description
+            desc_elem = promo_event.find('div', class_='PromoEvent-description')
+            desc = desc_elem.text.strip() if desc_elem else None
 
-            except Exception as e:
-                print(f"    Error parsing event: {e}")
+            # Extract time info from listing
+            time_elem = promo_event.find('div', class_='PromoEvent-time')
+            start_time, end_time, event_type, frequency_notes = parse_time_info(time_elem)
+
+            # Extract date - first try from listing page, then from time element
+            date = parse_date_from_listing(promo_event)
+            if not date and time_elem:
+                date = parse_date_from_time_element(time_elem)
+
+            # Skip past events
+            if date and is_past_event(date):
+                continue
+
+            event_data = {
+                'title': title,
+                'desc': desc,
+                'date': date,
+                'start_time': start_time,
+                'end_time': end_time,
+                'event_type': event_type,
+                'frequency_notes': frequency_notes,
+                'url': event_url,
+                'venue_name': None,
+                'street': None,
+                'city': None,
+                'state': None,
+                'zip_code': None,
+                'phone': None,
+                'email': None,
+                'website': None,
+            }
+
+            events.append(event_data)
+
+        except Exception as e:
+            print(f"    Error parsing event: {e}")
+            continue
+
+    return events
+
+
+def scrape_event_listing(url, scrape_details=True):
+    """Scrape the main calendar listing page"""
+    try:
+        response = fetch(url)
+        events = []
+        seen_keys = set()  # Track duplicates within the same page
+
+        for event_data in parse_event_listing(response.text):
+            # Check for duplicates using unique key
+            event_key = create_event_key(event_data)
+            if event_key in seen_keys:
                 continue
+            seen_keys.add(event_key)
+
+            # Scrape location details from event page
+            if scrape_details and event_data['url']:
+                try:
+                    location_data = scrape_event_details(event_data['url'])
+                    if location_data:
+                        event_data.update(location_data)
+                    time.sleep(0.2)  # Small delay after scraping event page
+                except Exception as e:
+                    print(f"    Error getting location for {event_data['title']}: {e}")
+
+            events.append(event_data)
 
         return events
     except Exception as e:
@@ -552,22 +542,23 @@ def scrape_event_listing(url, scrape_details=True):
         return []
 
 
+def page_url(base_url, page_num):
+    """URL of a calendar listing page"""
+    # Correct URL format: ?f0=&from=&to=&q=&p=2
+    if page_num == 1:
+        return base_url
+    # Replace or add the p parameter
+    if '?' in base_url:
+        return f"{base_url}&p={page_num}"
+    return f"{base_url}?p={page_num}"
+
+
 def scrape_page_batch(base_url, page_numbers, scrape_details=True):
     """Scrape a batch of pages and return results"""
     results = {}
     for page_num in page_numbers:
         print(f"  Worker processing page {page_num}...")
-        # Correct URL format: ?f0=&from=&to=&q=&p=2
-        if page_num == 1:
-            url = base_url
-        else:
-            # Replace or add the p parameter
-            if '?' in base_url:
-                url = f"{base_url}&p={page_num}"
-            else:
-                url = f"{base_url}?p={page_num}"
-
-        events = scrape_event_listing(url, scrape_details=scrape_details)
+        events = scrape_event_listing(page_url(base_url, page_num), scrape_details=scrape_details)
         results[page_num] = events
         print(f"  Page {page_num} complete: {len(events)} events")
         time.sleep(0.05)  # Tiny delay between pages in same worker
@@ -620,21 +611,27 @@ def save_progress(page, last_event_url):
         json.dump(progress, f, indent=2)
 
 
-def load_existing_events():
-    """Load existing events from main file"""
-    if os.path.exists('./maine_events.json'):
-        with open('./maine_events.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+def iter_existing_events(filename='./maine_events.json'):
+    """Yield existing events from the main file one at a time"""
+    if os.path.exists(filename):
+        yield from iter_events(filename)
 
 
-def scrape_pages_concurrent(base_url, start_page, end_page, scrape_details=True):
-    """Scrape pages concurrently with dynamic worker allocation"""
-    all_events = []
+def load_existing_urls(filename='./maine_events.json'):
+    """URLs of the events already saved (only the URLs are kept in memory)"""
+    return {event['url'] for event in iter_existing_events(filename) if event.get('url')}
+
+
+def iter_pages_concurrent(base_url, start_page, end_page, scrape_details=True, max_workers=None):
+    """Scrape pages concurrently, yielding each unique event as its batch of pages completes.
+
+    Closing the generator early cancels the batches that have not started.
+    """
     seen_event_keys = set()  # Track duplicates across all pages
 
     num_pages = end_page - start_page + 1
-    batch_size, max_workers = calculate_optimal_workers(num_pages)
+    batch_size, optimal_workers = calculate_optimal_workers(num_pages)
+    max_workers = max_workers or optimal_workers
 
     # Create batches of pages
     page_batches = []
@@ -650,7 +647,9 @@ def scrape_pages_concurrent(base_url, start_page, end_page, scrape_details=True)
     print(f"   Total batches: {len(page_batches)}")
     print(f"   Mode: {detail_status}\n")
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    configure_http(max_workers)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
         # Submit all batches
         future_to_batch = {
             executor.submit(scrape_page_batch, base_url, batch, scrape_details): batch
@@ -677,7 +676,7 @@ def scrape_pages_concurrent(base_url, start_page, end_page, scrape_details=True)
                             seen_event_keys.add(event_key)
                             unique_events.append(event)
 
-                    all_events.extend(unique_events)
+                    yield from unique_events
                     duplicates = len(events) - len(unique_events)
                     print(f"✓ Page {page_num}: {len(unique_events)} unique events" +
                           (f" ({duplicates} duplicates filtered)" if duplicates > 0 else ""))
@@ -690,14 +689,18 @@ def scrape_pages_concurrent(base_url, start_page, end_page, scrape_details=True)
 
             except Exception as e:
                 print(f"Error processing batch {batch}: {e}\n")
+    finally:
+        executor.shutdown(cancel_futures=True)
 
-    return all_events
+
+def scrape_pages_concurrent(base_url, start_page, end_page, scrape_details=True, max_workers=None):
+    """Scrape pages concurrently with dynamic worker allocation"""
+    return list(iter_pages_concurrent(base_url, start_page, end_page, scrape_details, max_workers))
 
 
 def scrape_with_update_mode(base_url, max_workers=5):
     """Scrape pages until we hit existing content"""
-    existing_events = load_existing_events()
-    existing_urls = {event['url'] for event in existing_events if event.get('url')}
+    existing_urls = load_existing_urls()
     print(f"Update mode: Found {len(existing_urls)} existing events")
 
     all_new_events = []
@@ -709,7 +712,7 @@ def scrape_with_update_mode(base_url, max_workers=5):
         print(f"\nChecking pages {page} to {page + 9}...")
 
         # Scrape 10 pages at a time
-        events_batch = scrape_pages_concurrent(base_url, page, page + 9, batch_size=2, max_workers=max_workers)
+        events_batch = scrape_pages_concurrent(base_url, page, page + 9, max_workers=max_workers)
 
         if not events_batch:
             print("No more events found.")
@@ -740,25 +743,36 @@ def scrape_with_update_mode(base_url, max_workers=5):
 
 
 def save_to_json(events, filename='./maine_events.json', append_mode=False):
-    """Save events to JSON file"""
-    if append_mode and os.path.exists(filename):
-        existing_events = load_existing_events()
-        existing_urls = {event['url'] for event in existing_events}
+    """Save events to a JSON array file, or NDJSON if filename ends in .ndjson/.jsonl.
 
+    Existing events are streamed rather than loaded, so appending to a large
+    file only holds its URLs in memory.
+    """
+    ndjson = filename.endswith(('.ndjson', '.jsonl'))
+    if append_mode and os.path.exists(filename):
         # Add only new events
-        for event in events:
-            if event['url'] not in existing_urls:
-                existing_events.append(event)
+        existing_urls = load_existing_urls(filename)
+        new_events = [event for event in events if event.get('url') not in existing_urls]
 
-        events = existing_events
+        if ndjson:
+            append_ndjson(new_events, filename)
+            total = len(existing_urls) + len(new_events)
+        else:
+            # Rewrite the array next to the original, then swap it in
+            temp_file = filename + '.tmp'
+            total = write_json_array(chain(iter_existing_events(filename), new_events), temp_file)
+            os.replace(temp_file, filename)
+    elif ndjson:
+        open(filename, 'w').close()
+        total = append_ndjson(events, filename)
+    else:
+        total = write_json_array(events, filename)
 
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(events, f, indent=2, ensure_ascii=False)
-    print(f"\nSaved {len(events)} total events to {filename}")
+    print(f"\nSaved {total} total events to {filename}")
 
 
 if __name__ == "__main__":
-    base_url = "https://www.mainepublic.org/community-calendar?f0=&from=&to=&q="
+    base_url = CALENDAR_URL
 
     progress = load_progress()
 
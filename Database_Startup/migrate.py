@@ -0,0 +1,547 @@
+'''
+migrate.py
+Brings the database schema up to date by applying only what changed,
+instead of dropping and rebuilding the database on every startup.
+
+The schema is a numbered series of migrations. Version 1 is the baseline,
+the table files in tables_/ run in BASELINE_TABLES order; they are the
+schema the old drop-and-rebuild startup created. Every later change
+is a file in migrations_/ named NNNN_description.sql (0002_add_analytics_columns.sql)
+and runs once, in version order. Applied versions are recorded with the
+file's SHA-256 in schema_version. Do not edit a file once it has been
+applied anywhere; add a new migration instead.
+
+Stored procedures (procedures_/) are code, not schema state, so they are
+not numbered. A procedure file is re-run whenever its checksum differs from
+the one recorded in schema_procedures, after dropping the routines it
+creates.
+
+A database built by the old drop-and-rebuild startup has tables but no
+schema_version rows. It is adopted at version 1 and the later migrations
+then run on it, so they only add what is missing (see 0002). Adoption is
+refused when the database lacks part of version 1 or differs from it;
+--force-adopt adopts it anyway once the differences are understood.
+
+MySQL commits DDL implicitly, so a migration that fails part-way leaves its
+earlier statements applied and is not recorded. Fix the file and rerun it.
+Write migrations that can be rerun (IF NOT EXISTS, IF EXISTS) where possible.
+
+Usage:
+    python migrate.py            # apply pending migrations and changed procedures
+    python migrate.py --check    # report pending migrations and live schema drift
+    python migrate.py --force-adopt  # adopt an old database even if it differs from version 1
+'''
+import argparse
+import hashlib
+import re
+import sys
+import time
+from pathlib import Path
+
+import mysql.connector
+
+from startup import load_config
+
+BASE_DIR = Path(__file__).parent
+TABLE_DIR = BASE_DIR / 'tables_'
+MIGRATION_DIR = BASE_DIR / 'migrations_'
+PROCEDURE_DIR = BASE_DIR / 'procedures_'
+
+BASELINE_TABLES = [
+    'location_table.sql',
+    'User_Table.sql',
+    'event_table.sql',
+    'User_fav_table.sql',
+    'Category_Table.sql',
+    'review_table.sql',
+    'RSVP_table.sql',
+]
+
+SCHEMA_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    execution_ms INT NOT NULL,
+    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+SCHEMA_PROCEDURES_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_procedures (
+    file VARCHAR(255) PRIMARY KEY,
+    checksum CHAR(64) NOT NULL,
+    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# Bookkeeping tables and the scratch tables of the rebuild-and-swap jobs are not part of the schema
+IGNORED_TABLES = re.compile(r'^(schema_version|schema_procedures|.*_new|.*_old)$', re.IGNORECASE)
+
+MIGRATION_FILE_RE = re.compile(r'^(\d+)_(\w+)\.sql$')
+LOCK_NAME = 'mmm_schema_migrate'
+
+SCRIPT_TOKEN_RE = re.compile(r"""
+    (?P<delimiter>^[ \t]*DELIMITER[ \t]+(?P<new>\S+)[ \t]*(?:\n|$))
+  | (?P<comment>--(?:[ \t][^\n]*)?(?=\n|$)|\#[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*"|`[^`]*`)
+  | (?P<word>\w+)
+""", re.VERBOSE | re.IGNORECASE | re.MULTILINE | re.DOTALL)
+
+# END IF / END LOOP / ... close blocks that are not counted (only BEGIN and CASE are)
+UNCOUNTED_END_RE = re.compile(r'\s+(IF|LOOP|WHILE|REPEAT)\b', re.IGNORECASE)
+END_CASE_RE = re.compile(r'\s+CASE\b', re.IGNORECASE)
+
+ROUTINE_RE = re.compile(
+    r'CREATE\s+(?:DEFINER\s*=\s*\S+\s+)?(PROCEDURE|FUNCTION|TRIGGER)\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?',
+    re.IGNORECASE
+)
+
+
+def split_statements(script):
+    """The statements of a SQL script, honouring DELIMITER lines like the mysql client.
+
+    Without a DELIMITER line a routine body (BEGIN ... END;) is kept whole,
+    so a file holding a single CREATE PROCEDURE works either way.
+    """
+    statements = []
+    delimiter = ';'
+    depth = 0
+    current = []
+    pos = 0
+    while pos < len(script):
+        if script.startswith(delimiter, pos) and (delimiter != ';' or depth <= 0):
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            depth = 0
+            pos += len(delimiter)
+            continue
+        match = SCRIPT_TOKEN_RE.match(script, pos)
+        if match is None:
+            current.append(script[pos])
+            pos += 1
+            continue
+        kind = 'delimiter' if match['delimiter'] else match.lastgroup
+        if kind == 'delimiter':
+            # Only a directive at the start of a statement
+            if ''.join(current).strip():
+                current.append(match.group())
+            else:
+                delimiter = match['new']
+                current = []
+        elif kind == 'comment':
+            current.append(' ')
+        else:
+            word = match.group().upper()
+            if kind == 'word' and word in ('BEGIN', 'CASE'):
+                depth += 1
+            elif kind == 'word' and word == 'END' and not UNCOUNTED_END_RE.match(script, match.end()):
+                depth -= 1
+                # END CASE closes the CASE counted above; skip its CASE word
+                end_case = END_CASE_RE.match(script, match.end())
+                if end_case:
+                    current.append(match.group())
+                    current.append(end_case.group())
+                    pos = end_case.end()
+                    continue
+            current.append(match.group())
+        pos = match.end()
+    statement = ''.join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def run_script(cursor, path):
+    with open(path, 'r', encoding='utf-8') as f:
+        statements = split_statements(f.read())
+    for number, statement in enumerate(statements, 1):
+        try:
+            cursor.execute(statement)
+            if cursor.with_rows:
+                cursor.fetchall()
+        except mysql.connector.Error as err:
+            raise RuntimeError(f"Error in {path.name}, statement {number}: {err}") from err
+
+
+def file_checksum(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.name.encode('utf-8'))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def load_migrations():
+    """[(version, name, [paths], checksum)] in version order, starting with the baseline"""
+    baseline = [TABLE_DIR / name for name in BASELINE_TABLES]
+    missing = [path for path in baseline if not path.exists()]
+    if missing:
+        raise FileNotFoundError(f"Table SQL file not found: {missing[0]}")
+    migrations = [(1, 'baseline', baseline, file_checksum(*baseline))]
+
+    seen = {1: 'baseline'}
+    for path in sorted(MIGRATION_DIR.glob('*.sql')) if MIGRATION_DIR.exists() else []:
+        match = MIGRATION_FILE_RE.match(path.name)
+        if not match:
+            raise ValueError(f"Migration file name must look like 0002_description.sql: {path.name}")
+        version = int(match.group(1))
+        if version in seen:
+            raise ValueError(f"Migration version {version} is used by both {seen[version]} and {path.name}")
+        seen[version] = path.name
+        migrations.append((version, path.stem, [path], file_checksum(path)))
+    migrations.sort()
+    return migrations
+
+
+def load_procedures():
+    """{relative path: (path, checksum)} for every procedure file"""
+    return {
+        path.relative_to(PROCEDURE_DIR).as_posix(): (path, file_checksum(path))
+        for path in sorted(PROCEDURE_DIR.rglob('*.sql'))
+    }
+
+
+def connect(config, database=None):
+    return mysql.connector.connect(
+        host=config['host'],
+        user=config['user'],
+        password=config['password'],
+        database=database
+    )
+
+
+def ensure_database(config, database):
+    connection = connect(config)
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def applied_versions(cursor):
+    """{version: (name, checksum)} from schema_version"""
+    cursor.execute("SELECT version, name, checksum FROM schema_version")
+    return {version: (name, checksum) for version, name, checksum in cursor.fetchall()}
+
+
+def applied_procedures(cursor):
+    cursor.execute("SELECT file, checksum FROM schema_procedures")
+    return dict(cursor.fetchall())
+
+
+def has_tables(cursor):
+    """True when the database already holds the application's tables"""
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND LOWER(TABLE_NAME) = 'event'"
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def apply_procedure(cursor, path):
+    with open(path, 'r', encoding='utf-8') as f:
+        routines = ROUTINE_RE.findall(f.read())
+    for kind, name in routines:
+        cursor.execute(f"DROP {kind.upper()} IF EXISTS `{name}`")
+    run_script(cursor, path)
+
+
+def apply(connection, adopt=True, target=None):
+    """Apply pending migrations (up to version target, if given) and changed procedure files.
+
+    Returns a summary dict.
+    """
+    started = time.perf_counter()
+    summary = {'adopted': False, 'migrations': [], 'procedures': []}
+    cursor = connection.cursor()
+    cursor.execute("SELECT GET_LOCK(%s, 60)", (LOCK_NAME,))
+    if cursor.fetchone()[0] != 1:
+        raise RuntimeError("Another process is migrating this database")
+    try:
+        cursor.execute(SCHEMA_VERSION_TABLE)
+        cursor.execute(SCHEMA_PROCEDURES_TABLE)
+        migrations = load_migrations()
+        applied = applied_versions(cursor)
+
+        if not applied and adopt and has_tables(cursor):
+            # Built by the old drop-and-rebuild startup: its tables are the baseline
+            version, name, _, checksum = migrations[0]
+            cursor.execute(
+                "INSERT INTO schema_version (version, name, checksum, execution_ms) VALUES (%s, %s, %s, 0)",
+                (version, f'{name} (adopted)', checksum)
+            )
+            connection.commit()
+            applied[version] = (name, checksum)
+            summary['adopted'] = True
+
+        for version, name, paths, checksum in migrations:
+            if version in applied or (target is not None and version > target):
+                continue
+            migration_started = time.perf_counter()
+            for path in paths:
+                run_script(cursor, path)
+            execution_ms = round((time.perf_counter() - migration_started) * 1000)
+            cursor.execute(
+                "INSERT INTO schema_version (version, name, checksum, execution_ms) VALUES (%s, %s, %s, %s)",
+                (version, name, checksum, execution_ms)
+            )
+            connection.commit()
+            summary['migrations'].append((version, name, execution_ms))
+
+        recorded = applied_procedures(cursor)
+        for file, (path, checksum) in load_procedures().items():
+            if recorded.get(file) == checksum:
+                continue
+            apply_procedure(cursor, path)
+            cursor.execute(
+                "INSERT INTO schema_procedures (file, checksum) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE checksum = VALUES(checksum), applied_at = CURRENT_TIMESTAMP",
+                (file, checksum)
+            )
+            connection.commit()
+            summary['procedures'].append(file)
+
+        summary['version'] = max(applied_versions(cursor))
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        cursor.fetchall()
+        cursor.close()
+    summary['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return summary
+
+
+def is_tracked(cursor):
+    """True when schema_version exists and has rows"""
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'schema_version'"
+    )
+    return cursor.fetchone()[0] > 0 and bool(applied_versions(cursor))
+
+
+def baseline_gaps(config, connection):
+    """How an untracked database falls short of version 1; [] when there is nothing to adopt or it matches.
+
+    Objects beyond version 1 are not gaps: a later startup.py created some of
+    them, and the migrations only add what is missing.
+    """
+    cursor = connection.cursor()
+    try:
+        if is_tracked(cursor) or not has_tables(cursor):
+            return []
+        live = describe(cursor, config['database'])
+    finally:
+        cursor.close()
+    expected = expected_schema(config, target=1)
+    # Routines come from procedures_/, which apply() re-runs regardless
+    expected.pop('routine')
+    live.pop('routine')
+    return [line for line in compare(expected, live) if not line.startswith('unexpected ')]
+
+
+def migrate(config, force_adopt=False):
+    """Create the configured database if needed and bring it up to date"""
+    ensure_database(config, config['database'])
+    connection = connect(config, config['database'])
+    try:
+        gaps = baseline_gaps(config, connection)
+        if gaps and not force_adopt:
+            raise RuntimeError(
+                "The existing database does not match schema version 1, so it was not adopted:\n  "
+                + "\n  ".join(gaps)
+                + "\nBring it in line by hand, or rerun with --force-adopt to adopt it as it is"
+            )
+        summary = apply(connection)
+    finally:
+        connection.close()
+    if summary['adopted']:
+        print("Existing database adopted at version 1 (run `python migrate.py --check` to compare it)")
+    for version, name, execution_ms in summary['migrations']:
+        print(f"Applied migration {version:04d} {name} ({execution_ms} ms)")
+    if summary['procedures']:
+        print(f"Applied {len(summary['procedures'])} procedure files")
+    print(f"Schema at version {summary['version']} ({summary['elapsed_ms']} ms)")
+    return summary
+
+
+def describe(cursor, database):
+    """{kind: {key: attributes}} for the tables, columns, indexes, foreign keys and routines of database"""
+    schema = {}
+
+    cursor.execute(
+        "SELECT TABLE_NAME FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_TYPE = 'BASE TABLE'",
+        (database,)
+    )
+    schema['table'] = {(table,): None for (table,) in cursor.fetchall()}
+
+    cursor.execute(
+        """
+        SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT, EXTRA
+        FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s
+        """,
+        (database,)
+    )
+    schema['column'] = {(table, column): tuple(rest) for table, column, *rest in cursor.fetchall()}
+
+    cursor.execute(
+        """
+        SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX)
+        FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = %s
+        GROUP BY TABLE_NAME, INDEX_NAME, NON_UNIQUE
+        """,
+        (database,)
+    )
+    schema['index'] = {(table, index): (non_unique, columns) for table, index, non_unique, columns in cursor.fetchall()}
+
+    # Keyed on columns rather than the constraint name, which MySQL numbers automatically
+    cursor.execute(
+        """
+        SELECT k.TABLE_NAME, GROUP_CONCAT(k.COLUMN_NAME ORDER BY k.ORDINAL_POSITION), k.REFERENCED_TABLE_NAME,
+               GROUP_CONCAT(k.REFERENCED_COLUMN_NAME ORDER BY k.ORDINAL_POSITION), r.DELETE_RULE, r.UPDATE_RULE
+        FROM information_schema.KEY_COLUMN_USAGE k
+        JOIN information_schema.REFERENTIAL_CONSTRAINTS r
+          ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME
+         AND r.TABLE_NAME = k.TABLE_NAME
+        WHERE k.TABLE_SCHEMA = %s AND k.REFERENCED_TABLE_NAME IS NOT NULL
+        GROUP BY k.TABLE_NAME, k.CONSTRAINT_NAME, k.REFERENCED_TABLE_NAME, r.DELETE_RULE, r.UPDATE_RULE
+        """,
+        (database,)
+    )
+    schema['foreign key'] = {(table, columns, '->', ref_table, ref_columns): (on_delete, on_update)
+                             for table, columns, ref_table, ref_columns, on_delete, on_update in cursor.fetchall()}
+
+    cursor.execute(
+        "SELECT ROUTINE_TYPE, ROUTINE_NAME, MD5(ROUTINE_DEFINITION) FROM information_schema.ROUTINES "
+        "WHERE ROUTINE_SCHEMA = %s",
+        (database,)
+    )
+    schema['routine'] = {(kind.lower(), name): definition for kind, name, definition in cursor.fetchall()}
+
+    for kind, entries in schema.items():
+        if kind == 'routine':
+            continue
+        schema[kind] = {key: value for key, value in entries.items() if not IGNORED_TABLES.match(key[0])}
+    return schema
+
+
+def compare(expected, live):
+    """Lines describing how live differs from expected"""
+    lines = []
+    for kind, wanted in expected.items():
+        found = live.get(kind, {})
+        for key in sorted(wanted.keys() - found.keys(), key=str):
+            lines.append(f"missing {kind} {' '.join(map(str, key))}")
+        for key in sorted(found.keys() - wanted.keys(), key=str):
+            lines.append(f"unexpected {kind} {' '.join(map(str, key))}")
+        for key in sorted(wanted.keys() & found.keys(), key=str):
+            if wanted[key] != found[key]:
+                if kind == 'routine':
+                    lines.append(f"{kind} {' '.join(key)} has a different definition")
+                else:
+                    lines.append(f"{kind} {' '.join(map(str, key))} differs: live {found[key]}, "
+                                 f"expected {wanted[key]}")
+    return lines
+
+
+def expected_schema(config, target=None):
+    """Apply the migrations (up to version target, if given) and procedures to a scratch database and describe it"""
+    scratch = f"{config['database']}_schema_check"
+    server = connect(config)
+    cursor = server.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{scratch}`")
+    cursor.execute(f"CREATE DATABASE `{scratch}`")
+    try:
+        connection = connect(config, scratch)
+        try:
+            apply(connection, adopt=False, target=target)
+            scratch_cursor = connection.cursor()
+            schema = describe(scratch_cursor, scratch)
+            scratch_cursor.close()
+        finally:
+            connection.close()
+    finally:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{scratch}`")
+        cursor.close()
+        server.close()
+    return schema
+
+
+def check(config):
+    """Print pending migrations, edited migrations and schema drift; returns the problem lines"""
+    problems = []
+    migrations = load_migrations()
+    procedures = load_procedures()
+
+    connection = connect(config, config['database'])
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ('schema_version', 'schema_procedures')"
+        )
+        tracked = cursor.fetchone()[0] == 2
+        applied = applied_versions(cursor) if tracked else {}
+        recorded = applied_procedures(cursor) if tracked else {}
+        live = describe(cursor, config['database'])
+        cursor.close()
+    finally:
+        connection.close()
+
+    if not tracked:
+        problems.append("schema_version is missing (run `python migrate.py` to create or adopt the schema)")
+    known = {version: checksum for version, _, _, checksum in migrations}
+    for version, name, _, checksum in migrations:
+        if version not in applied:
+            problems.append(f"pending migration {version:04d} {name}")
+        elif applied[version][1] != checksum:
+            problems.append(f"migration {version:04d} {name} was edited after it was applied")
+    for version, (name, _) in sorted(applied.items()):
+        if version not in known:
+            problems.append(f"applied migration {version:04d} {name} has no file")
+    for file, (_, checksum) in procedures.items():
+        if recorded.get(file) != checksum:
+            problems.append(f"procedure file {file} is not applied in its current form")
+
+    drift = compare(expected_schema(config), live)
+
+    print(f"{'=' * 60}")
+    print(f"Schema Check: {config['database']}")
+    print(f"Migrations: {len(migrations)} known, {len(applied)} applied"
+          f" (latest {max(applied) if applied else 'none'})")
+    for line in problems:
+        print(f"  {line}")
+    print(f"Drift from the expected schema: {len(drift)} differences")
+    for line in drift:
+        print(f"  {line}")
+    print(f"{'=' * 60}")
+    return problems + drift
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Apply schema migrations to the configured database')
+    parser.add_argument('--check', action='store_true',
+                        help='Report pending migrations and drift between the live and expected schema')
+    parser.add_argument('--force-adopt', action='store_true',
+                        help='Adopt an untracked database at version 1 even if it differs from version 1')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = load_config()
+    try:
+        if args.check:
+            sys.exit(1 if check(config) else 0)
+        migrate(config, force_adopt=args.force_adopt)
+    except (mysql.connector.Error, RuntimeError, ValueError, FileNotFoundError) as err:
+        print(f"Migration error: {err}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
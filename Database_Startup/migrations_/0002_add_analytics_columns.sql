@@ -0,0 +1,26 @@
+/*
+0002_add_analytics_columns.sql
+Adds the analytics attributes read and written by procedures_/analytics.sql
+(User.last_login, Event.view_count). Older copies of analytics.sql added
+them with plain ALTERs, so a database may already have them; each column is
+only added when it is missing.
+*/
+SET @sql = IF(
+    (SELECT COUNT(*) FROM information_schema.COLUMNS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'User' AND COLUMN_NAME = 'last_login') = 0,
+    'ALTER TABLE User ADD COLUMN last_login DATETIME',
+    'DO 0'
+);
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @sql = IF(
+    (SELECT COUNT(*) FROM information_schema.COLUMNS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Event' AND COLUMN_NAME = 'view_count') = 0,
+    'ALTER TABLE Event ADD COLUMN view_count INT DEFAULT 0',
+    'DO 0'
+);
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -0,0 +1,16 @@
+/*
+0003_add_event_date_index.sql
+Composite index for date-range listings (ORDER BY event_date, start_time).
+event_id is included so the listing can page through ties without a filesort.
+partition_events.py --index-only creates the same index, so it is only
+created when missing.
+*/
+SET @sql = IF(
+    (SELECT COUNT(*) FROM information_schema.STATISTICS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Event' AND INDEX_NAME = 'idx_event_date_time') = 0,
+    'CREATE INDEX idx_event_date_time ON Event(event_date, start_time, event_id)',
+    'DO 0'
+);
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -0,0 +1,42 @@
+/*
+0004_add_archive_tables.sql
+Creates the archive tables for past events and their RSVPs and reviews.
+Rows are moved here by archive_events.py and are only read when a listing
+asks for ?include_past=true, so the tables carry no foreign keys.
+*/
+CREATE TABLE IF NOT EXISTS Event_archive (
+    event_id INT PRIMARY KEY,
+    event_name VARCHAR(150) NOT NULL,
+    event_date DATE NOT NULL,
+    start_time TIME NOT NULL,
+    end_time TIME,
+    max_capacity INT,
+    organizer_id INT,
+    location_id INT NOT NULL,
+    description VARCHAR(750),
+    view_count INT DEFAULT 0,
+    archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_event_archive_date_time (event_date, start_time, event_id),
+    INDEX idx_event_archive_location_id (location_id)
+);
+
+CREATE TABLE IF NOT EXISTS RSVP_archive (
+    RSVP_id INT PRIMARY KEY,
+    RSVP_status ENUM('Going', 'Interested', 'Not Going') NOT NULL,
+    user_id INT NOT NULL,
+    event_id INT NOT NULL,
+    archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_rsvp_archive_event_id (event_id),
+    INDEX idx_rsvp_archive_user_id (user_id)
+);
+
+CREATE TABLE IF NOT EXISTS review_archive (
+    review_id INT PRIMARY KEY,
+    rating INT NOT NULL,
+    comments VARCHAR(300),
+    user_id INT NOT NULL,
+    event_id INT NOT NULL,
+    archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_review_archive_event_id (event_id),
+    INDEX idx_review_archive_user_id (user_id)
+);
@@ -0,0 +1,32 @@
+/*
+0005_add_upcoming_event_listing.sql
+Creates the denormalized listing of upcoming events read by /api/events.
+Each row has everything the list view shows (venue, organizer, RSVP and
+review aggregates), with one index per sort_by mode so every listing is an
+index range scan. Rebuilt by refresh_upcoming_event_listing() after imports
+and patched per event by refresh_upcoming_event().
+*/
+CREATE TABLE IF NOT EXISTS upcoming_event_listing (
+    event_id INT PRIMARY KEY,
+    event_name VARCHAR(150) NOT NULL,
+    description VARCHAR(750),
+    event_date DATE NOT NULL,
+    start_time TIME NOT NULL,
+    end_time TIME,
+    max_capacity INT,
+    venue_name VARCHAR(255),
+    address VARCHAR(255),
+    city VARCHAR(100),
+    zip_code VARCHAR(10),
+    organizer_first_name VARCHAR(50),
+    organizer_last_name VARCHAR(50),
+    organizer_email VARCHAR(100),
+    rsvp_count INT NOT NULL DEFAULT 0,
+    avg_rating DECIMAL(6,4),
+    review_count INT NOT NULL DEFAULT 0,
+    INDEX idx_listing_date (event_date, start_time, event_id),
+    INDEX idx_listing_name (event_name, event_id),
+    INDEX idx_listing_rating (avg_rating DESC, event_id),
+    INDEX idx_listing_popular (rsvp_count DESC, event_id),
+    INDEX idx_listing_city_date (city, event_date, start_time, event_id)
+);
@@ -0,0 +1,16 @@
+/*
+0006_add_event_similarity.sql
+Creates the precomputed "similar events" table.
+For every event, build_similarity.py stores its top-k most similar
+upcoming events (TF-IDF cosine over name and description) ranked 1..k,
+so /api/events/<id>/similar is one primary-key range read and
+/api/recommendations is a small grouped join from a user's favorites.
+*/
+CREATE TABLE IF NOT EXISTS event_similarity (
+    event_id INT NOT NULL,
+    rank_no TINYINT NOT NULL,
+    similar_event_id INT NOT NULL,
+    score FLOAT NOT NULL,
+    PRIMARY KEY (event_id, rank_no),
+    INDEX idx_similar_event (similar_event_id)
+);
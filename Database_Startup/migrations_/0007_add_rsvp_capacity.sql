@@ -0,0 +1,64 @@
+/*
+0007_add_rsvp_capacity.sql
+Creates the tables behind the RSVP API (backend/rsvp.py).
+event_capacity holds one seat counter per event; a seat is taken with a
+single conditional UPDATE (seats_taken < capacity), so concurrent RSVPs
+never overbook and never count RSVP rows. Rows are created on an event's
+first RSVP. A NULL capacity means unlimited.
+rsvp_idempotency stores the response to each (user, Idempotency-Key) so a
+retried request replays its first answer instead of acting twice.
+RSVP gains the 'Waitlisted' status, status_changed_at for waitlist order and
+a unique (user_id, event_id) index. The unique index cannot be built while
+a user has two RSVPs for one event; remove the extra rows and rerun.
+*/
+CREATE TABLE IF NOT EXISTS event_capacity (
+    event_id INT PRIMARY KEY,
+    capacity INT,
+    seats_taken INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS rsvp_idempotency (
+    user_id INT NOT NULL,
+    idempotency_key VARCHAR(64) NOT NULL,
+    status_code SMALLINT,
+    response_body JSON,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, idempotency_key),
+    INDEX idx_rsvp_idempotency_created (created_at)
+);
+
+ALTER TABLE RSVP MODIFY RSVP_status ENUM('Going', 'Interested', 'Not Going', 'Waitlisted') NOT NULL;
+ALTER TABLE RSVP_archive MODIFY RSVP_status ENUM('Going', 'Interested', 'Not Going', 'Waitlisted') NOT NULL;
+
+SET @sql = IF(
+    (SELECT COUNT(*) FROM information_schema.COLUMNS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'RSVP' AND COLUMN_NAME = 'status_changed_at') = 0,
+    'ALTER TABLE RSVP ADD COLUMN status_changed_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)',
+    'DO 0'
+);
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- One RSVP per user per event; also lets retried creates fail fast on the duplicate
+SET @sql = IF(
+    (SELECT COUNT(*) FROM information_schema.STATISTICS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'RSVP' AND INDEX_NAME = 'idx_rsvp_user_event'
+       AND NON_UNIQUE = 0) = 0,
+    'ALTER TABLE RSVP DROP INDEX idx_rsvp_user_event, ADD UNIQUE INDEX idx_rsvp_user_event (user_id, event_id)',
+    'DO 0'
+);
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Oldest waitlisted RSVP first when a seat is released
+SET @sql = IF(
+    (SELECT COUNT(*) FROM information_schema.STATISTICS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'RSVP' AND INDEX_NAME = 'idx_rsvp_waitlist') = 0,
+    'CREATE INDEX idx_rsvp_waitlist ON RSVP(event_id, RSVP_status, status_changed_at, RSVP_id)',
+    'DO 0'
+);
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -0,0 +1,27 @@
+/*
+0008_add_event_natural_key.sql
+(event_name, event_date) is the natural key imports upsert on; content_hash
+is the MD5 of the feed fields last imported for the event (see jsonTOsql.py),
+so a re-import only rewrites events that changed upstream.
+The key cannot be built while two events share a name and date; merge or
+remove the duplicates and rerun.
+*/
+SET @sql = IF(
+    (SELECT COUNT(*) FROM information_schema.COLUMNS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Event' AND COLUMN_NAME = 'content_hash') = 0,
+    'ALTER TABLE Event ADD COLUMN content_hash BINARY(16)',
+    'DO 0'
+);
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @sql = IF(
+    (SELECT COUNT(*) FROM information_schema.STATISTICS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Event' AND INDEX_NAME = 'uq_event_natural_key') = 0,
+    'ALTER TABLE Event ADD CONSTRAINT uq_event_natural_key UNIQUE (event_name, event_date)',
+    'DO 0'
+);
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -0,0 +1,15 @@
+/*
+0009_add_location_alias.sql
+Other spellings of a venue, recorded when dedupe_venues.py merges
+near-duplicate Location rows into one canonical location_id.
+The importer resolves (venue_name, zip_code) against this table as well
+as Location, so a merged spelling is not recreated by the next import.
+*/
+CREATE TABLE IF NOT EXISTS location_alias (
+    alias_id INT PRIMARY KEY AUTO_INCREMENT,
+    venue_name VARCHAR(255) NOT NULL,
+    zip_code VARCHAR(10),
+    location_id INT NOT NULL,
+    INDEX idx_location_alias_venue (venue_name, zip_code),
+    FOREIGN KEY (location_id) REFERENCES Location(location_id) ON DELETE CASCADE
+);
@@ -0,0 +1,14 @@
+/*
+0010_add_rsvp_archive_status_changed_at.sql
+Keeps RSVP.status_changed_at when archive_events.py moves an RSVP to
+RSVP_archive. RSVPs archived before this migration have NULL.
+*/
+SET @sql = IF(
+    (SELECT COUNT(*) FROM information_schema.COLUMNS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'RSVP_archive' AND COLUMN_NAME = 'status_changed_at') = 0,
+    'ALTER TABLE RSVP_archive ADD COLUMN status_changed_at TIMESTAMP(6) NULL AFTER event_id',
+    'DO 0'
+);
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -0,0 +1,330 @@
+'''
+normalize.py
+Parses and validates a batch of scraped events column by column before
+it reaches the database.
+
+Each field of the batch becomes a NumPy array. Dates and times are parsed
+a format at a time over the whole column: the strings become a matrix of
+code points and each row walks its own way through the format (strptime's
+directives and ranges), so the cost does not grow with the number of
+distinct values and no parser state is shared between import workers.
+The Event/Location constraints (non-null start_time, end_time after
+start_time, 5-digit ZIP, column widths) are checked with whole-array
+comparisons. Rejected events are returned with a reason
+instead of being dropped silently.
+
+To validate a feed without a database:
+    python normalize.py maine_events.json --rejects rejected.ndjson
+'''
+import argparse
+import re
+import threading
+import time
+
+import numpy as np
+
+from event_stream import append_ndjson, batched, iter_events
+from import_profile import stage
+
+DATE_FORMATS = ('%m-%d-%Y',)
+# The scraper's time regex allows "7:00PM" as well as "7:00 PM"
+TIME_FORMATS = ('%I:%M %p', '%I:%M%p')
+
+ZIP_RE = re.compile(r'^[0-9]{5}$')
+
+MAX_NAME = 150
+MAX_VENUE = 255
+
+# Checked in order; a row is rejected for the first one it fails. Rows
+# without a name or date are 'skipped' (not events), the rest 'errors'.
+CHECKS = (
+    ('missing_name', 'skipped', 'missing title'),
+    ('bad_date', 'skipped', 'missing or unparseable date'),
+    ('bad_start', 'errors', 'missing or unparseable start_time'),
+    ('bad_end', 'errors', 'unparseable end_time'),
+    ('end_before_start', 'errors', 'end_time is not after start_time'),
+    ('missing_venue', 'errors', 'missing venue_name'),
+    ('long_name', 'errors', f'title longer than {MAX_NAME} characters'),
+    ('long_venue', 'errors', f'venue_name longer than {MAX_VENUE} characters'),
+    ('bad_zip', 'errors', 'zip_code is not 5 digits'),
+)
+
+# strptime's digits per numeric directive (at most; %Y takes exactly 4) and accepted range
+FIELDS = {
+    'Y': (4, 1, 9999),
+    'm': (2, 1, 12),
+    'd': (2, 1, 31),
+    'H': (2, 0, 23),
+    'I': (2, 1, 12),
+    'M': (2, 0, 59),
+    'S': (2, 0, 59),
+}
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+FORMAT_TOKEN_RE = re.compile(r'%(.)|(\s+)|([^%\s])')
+
+
+def code_points(column):
+    """A str array as an (n, width) uint32 array of code points, 0-padded with at least one 0 per row"""
+    width = column.dtype.itemsize // 4 + 1
+    return np.ascontiguousarray(column.astype(f'U{width}')).view(np.uint32).reshape(len(column), width)
+
+
+def upper(points):
+    return np.where((points >= ord('a')) & (points <= ord('z')), points - 32, points)
+
+
+def match_format(points, lengths, fmt):
+    """datetime.strptime(text, fmt) on every row at once, for the FIELDS directives, %p and literals.
+
+    Every row advances its own position through the format, so each step
+    is a few whole-array operations however many rows there are. Returns
+    (ok, {directive: int array}) with %I and %p folded into H; the values
+    are meaningless where ok is False.
+    """
+    rows = np.arange(len(points))
+    last = points.shape[1] - 1
+    pos = np.zeros(len(points), dtype=np.int64)
+    ok = np.ones(len(points), dtype=bool)
+    fields = {}
+
+    def at(offset=0):
+        return points[rows, np.minimum(pos + offset, last)]
+
+    for directive, space, literal in FORMAT_TOKEN_RE.findall(fmt):
+        if directive in FIELDS:
+            width, low, high = FIELDS[directive]
+            value = np.zeros(len(points), dtype=np.int64)
+            taken = np.zeros(len(points), dtype=np.int64)
+            going = ok.copy()
+            for _ in range(width):
+                point = at(taken)
+                going &= (point >= ord('0')) & (point <= ord('9'))
+                value = np.where(going, value * 10 + point.astype(np.int64) - ord('0'), value)
+                taken += going
+            ok &= (taken >= (width if directive == 'Y' else 1)) & (value >= low) & (value <= high)
+            pos += taken
+            fields[directive] = value
+        elif directive == 'p':
+            first, second = upper(at(0)), upper(at(1))
+            ok &= ((first == ord('A')) | (first == ord('P'))) & (second == ord('M'))
+            fields['p'] = (first == ord('P')).astype(np.int64)
+            pos += 2
+        elif directive and directive != '%':
+            raise ValueError(f"Unsupported format directive %{directive} in {fmt!r}")
+        elif space:
+            # Like strptime, whitespace in the format matches one or more whitespace characters
+            taken = np.zeros(len(points), dtype=np.int64)
+            going = ok.copy()
+            while going.any():
+                point = at(taken)
+                going &= (point == ord(' ')) | ((point >= ord('\t')) & (point <= ord('\r')))
+                taken += going
+            ok &= taken > 0
+            pos += taken
+        else:
+            ok &= upper(at(0)) == ord((literal or '%').upper())
+            pos += 1
+    ok &= pos == lengths
+
+    if 'I' in fields:
+        fields['H'] = fields.pop('I') % 12 + 12 * fields.pop('p', 0)
+    return ok, fields
+
+
+def text_column(events, field):
+    """One field of every event as a str array ('' where missing).
+
+    Other types are converted with str(), so a ZIP read from JSON as the
+    number 4101 is checked (and rejected) as '4101' rather than skipped.
+    """
+    values = [event.get(field) for event in events]
+    return np.array(['' if value is None else value if isinstance(value, str) else str(value)
+                     for value in values], dtype=str)
+
+
+def parse_column(column, formats, defaults):
+    """Parse column with the first of formats each row matches, one format at a time over the whole column.
+
+    Returns (fields, ok): {directive: int array} for the directives in
+    defaults (a row whose format lacks one gets the default, as strptime
+    does), and whether the row matched a format.
+    """
+    column = np.char.strip(column)
+    points = code_points(column)
+    lengths = np.char.str_len(column)
+    ok = np.zeros(len(column), dtype=bool)
+    fields = {directive: np.full(len(column), default, dtype=np.int64) for directive, default in defaults.items()}
+    for fmt in formats:
+        # Each format only sees the rows no earlier format matched
+        rest = np.flatnonzero(~ok)
+        if not len(rest):
+            break
+        if len(rest) == len(column):
+            matched, values = match_format(points, lengths, fmt)
+        else:
+            matched, values = match_format(points[rest], lengths[rest], fmt)
+        rows = rest[matched]
+        for directive, value in values.items():
+            if directive in fields:
+                fields[directive][rows] = value[matched]
+        ok[rows] = True
+    return fields, ok
+
+
+def digit_text(parts, separator):
+    """Zero-padded text per row from (int array, width) parts joined by separator, as a str array"""
+    columns = []
+    for value, width in parts:
+        if columns:
+            columns.append(np.full(len(value), ord(separator), dtype=np.uint32))
+        for power in reversed(range(width)):
+            columns.append((value // 10 ** power % 10 + ord('0')).astype(np.uint32))
+    return np.ascontiguousarray(np.stack(columns, axis=1)).view(f'U{len(columns)}').ravel()
+
+
+def date_column(column):
+    """'YYYY-MM-DD' per row ('' where empty or unparseable), and whether the row parsed"""
+    fields, ok = parse_column(column, DATE_FORMATS, {'Y': 1970, 'm': 1, 'd': 1})
+    year, month, day = fields['Y'], fields['m'], fields['d']
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    # strptime rejects a day past the end of its month (02-30)
+    ok &= day <= DAYS_IN_MONTH[month - 1] + (leap & (month == 2))
+    return np.where(ok, digit_text([(year, 4), (month, 2), (day, 2)], '-'), ''), ok
+
+
+def time_column(column):
+    """'HH:MM:SS' per row ('' where empty or unparseable), and whether the row parsed"""
+    fields, ok = parse_column(column, TIME_FORMATS, {'H': 0, 'M': 0, 'S': 0})
+    return np.where(ok, digit_text([(fields['H'], 2), (fields['M'], 2), (fields['S'], 2)], ':'), ''), ok
+
+
+def match_column(column, pattern):
+    """pattern.match on each distinct string of column once, as a bool array"""
+    uniques, inverse = np.unique(column, return_inverse=True)
+    matched = np.array([pattern.match(text) is not None for text in uniques], dtype=bool)
+    return matched[inverse]
+
+
+def normalize_batch(events, row_numbers):
+    """Split a batch into accepted rows and rejects.
+
+    Accepted rows are (row_no, name, date, start, end, venue, street, city,
+    zip) with dates as 'YYYY-MM-DD', times as 'HH:MM:SS' and a missing ZIP
+    as None. Rejects are (row_no, category, reason, event) where category
+    is 'skipped' or 'errors'. Name and venue are str even where the feed
+    had another type (a numeric title), as validated.
+    """
+    if not events:
+        return [], []
+    row_numbers = np.asarray(row_numbers)
+    with stage('parse'):
+        names = text_column(events, 'title')
+        dates = text_column(events, 'date')
+        starts = text_column(events, 'start_time')
+        ends = text_column(events, 'end_time')
+        venues = text_column(events, 'venue_name')
+        zips = text_column(events, 'zip_code')
+
+        date_values, date_ok = date_column(dates)
+        start_values, start_ok = time_column(starts)
+        end_values, end_ok = time_column(ends)
+
+    with stage('validate'):
+        # 'HH:MM:SS' strings order the same way as the times they hold
+        both = start_ok & end_ok
+        end_before_start = np.zeros(len(events), dtype=bool)
+        end_before_start[both] = end_values[both] <= start_values[both]
+
+        failed = {
+            'missing_name': np.char.strip(names) == '',
+            'bad_date': ~date_ok,
+            'bad_start': ~start_ok,
+            'bad_end': (np.char.strip(ends) != '') & ~end_ok,
+            'end_before_start': end_before_start,
+            'missing_venue': venues == '',
+            'long_name': np.char.str_len(names) > MAX_NAME,
+            'long_venue': np.char.str_len(venues) > MAX_VENUE,
+            'bad_zip': (zips != '') & ~match_column(zips, ZIP_RE),
+        }
+
+        # Index into CHECKS of the first failed check per row (len(CHECKS) if none)
+        stacked = np.vstack([failed[key] for key, _, _ in CHECKS] + [np.ones(len(events), dtype=bool)])
+        first_failure = stacked.argmax(axis=0)
+
+        accepted = []
+        for i in np.flatnonzero(first_failure == len(CHECKS)):
+            event = events[i]
+            accepted.append((int(row_numbers[i]), str(names[i]), str(date_values[i]), str(start_values[i]),
+                             str(end_values[i]) or None, str(venues[i]), event.get('street'), event.get('city'),
+                             str(zips[i]) or None))
+        rejected = [(int(row_numbers[i]), CHECKS[first_failure[i]][1], CHECKS[first_failure[i]][2], events[i])
+                    for i in np.flatnonzero(first_failure < len(CHECKS))]
+    return accepted, rejected
+
+
+class RejectLog:
+    """Appends rejected events, with their row number and reason, to an NDJSON file.
+
+    Safe to share between import workers. The file is only created once
+    something is rejected.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._started = append
+
+    def write(self, rejected):
+        if not rejected:
+            return
+        records = ({'row': row_no, 'category': category, 'reason': reason, 'event': event}
+                   for row_no, category, reason, event in rejected)
+        with self._lock:
+            if not self._started:
+                open(self.path, 'w').close()
+                self._started = True
+            self.count += append_ndjson(records, self.path)
+
+
+def validate_file(path, rejects_path=None, batch_size=5000):
+    """Normalize every event of a feed; returns (accepted, rejected by reason, seconds)"""
+    log = RejectLog(rejects_path) if rejects_path else None
+    reasons = {}
+    accepted = 0
+    row_no = 0
+    started = time.perf_counter()
+    for batch in batched(iter_events(path), batch_size):
+        rows, rejected = normalize_batch(batch, range(row_no + 1, row_no + len(batch) + 1))
+        row_no += len(batch)
+        accepted += len(rows)
+        for _, _, reason, _ in rejected:
+            reasons[reason] = reasons.get(reason, 0) + 1
+        if log:
+            log.write(rejected)
+    return accepted, reasons, time.perf_counter() - started
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Validate a scraped event feed without importing it')
+    parser.add_argument('file', help='JSON array or NDJSON feed')
+    parser.add_argument('--rejects', help='Write rejected events and reasons to this NDJSON file')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Events normalized at once')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    accepted, reasons, seconds = validate_file(args.file, args.rejects, args.batch_size)
+    total = accepted + sum(reasons.values())
+    print(f"{'=' * 60}")
+    print(f"Validation Summary:")
+    print(f"Events: {total} ({accepted} valid, {total - accepted} rejected)")
+    for reason, count in sorted(reasons.items(), key=lambda item: -item[1]):
+        print(f"  {reason}: {count}")
+    print(f"Time: {seconds:.2f}s ({total / seconds if seconds else 0:.0f} rows/sec)")
+    print(f"{'=' * 60}")
+
+
+if __name__ == "__main__":
+    main()
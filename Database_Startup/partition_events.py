@@ -0,0 +1,231 @@
+'''
+partition_events.py
+Migrates an existing Event table to a layout built for date-range listings:
+a composite (event_date, start_time, event_id) index and monthly
+RANGE COLUMNS partitions on event_date.
+
+MySQL does not allow foreign keys on partitioned tables (in either
+direction), so partitioning drops the foreign keys declared on Event and the
+ones in RSVP, review and UserFavoriteEvent that point at it. The indexes on
+those columns are kept. Use --index-only to keep the foreign keys and only
+add the composite index.
+
+Usage:
+    python partition_events.py                       # index + monthly partitions
+    python partition_events.py --index-only          # index only
+    python partition_events.py --extend 6            # add partitions for 6 more months
+    python partition_events.py --explain 2025-11-01 2025-11-30
+'''
+import argparse
+import sys
+from datetime import date
+
+import mysql.connector
+
+from startup import load_config
+
+DATE_INDEX = 'idx_event_date_time'
+MAX_PARTITION = 'pmax'
+
+
+def index_exists(cursor, database, table, index_name):
+    cursor.execute(
+        """
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = %s AND LOWER(TABLE_NAME) = LOWER(%s) AND INDEX_NAME = %s
+        LIMIT 1
+        """,
+        (database, table, index_name)
+    )
+    return cursor.fetchone() is not None
+
+
+def add_date_index(cursor, database):
+    """Create the (event_date, start_time, event_id) index if it is missing"""
+    if index_exists(cursor, database, 'Event', DATE_INDEX):
+        print(f"{DATE_INDEX} already exists")
+        return False
+    cursor.execute(f"CREATE INDEX {DATE_INDEX} ON Event(event_date, start_time, event_id)")
+    print(f"Created {DATE_INDEX}")
+    return True
+
+
+def get_partitions(cursor, database):
+    """Return the partition names of Event in order (empty if not partitioned)"""
+    cursor.execute(
+        """
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = %s AND LOWER(TABLE_NAME) = 'event'
+          AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+        """,
+        (database,)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def add_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def month_partitions(first_month, last_month):
+    """Build (name, less_than) pairs, one per month from first_month to last_month"""
+    partitions = []
+    month = date(first_month.year, first_month.month, 1)
+    while month <= last_month:
+        upper = add_months(month, 1)
+        partitions.append((f"p{month:%Y%m}", upper.isoformat()))
+        month = upper
+    return partitions
+
+
+def partition_clause(partitions):
+    parts = [f"PARTITION {name} VALUES LESS THAN ('{upper}')" for name, upper in partitions]
+    parts.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    return ",\n    ".join(parts)
+
+
+def drop_event_foreign_keys(cursor, database):
+    """Drop foreign keys on Event and the ones referencing Event"""
+    cursor.execute(
+        """
+        SELECT TABLE_NAME, CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+        WHERE CONSTRAINT_SCHEMA = %s
+          AND (LOWER(TABLE_NAME) = 'event' OR LOWER(REFERENCED_TABLE_NAME) = 'event')
+        """,
+        (database,)
+    )
+    constraints = cursor.fetchall()
+    for table, constraint in constraints:
+        cursor.execute(f"ALTER TABLE `{table}` DROP FOREIGN KEY `{constraint}`")
+        print(f"Dropped foreign key {table}.{constraint}")
+    return len(constraints)
+
+
+def partition_event_table(cursor, database, months_ahead=12):
+    """Rebuild Event with monthly RANGE COLUMNS partitions on event_date"""
+    if get_partitions(cursor, database):
+        print("Event is already partitioned")
+        return False
+
+    cursor.execute("SELECT MIN(event_date) FROM Event")
+    first = cursor.fetchone()[0] or date.today()
+    last = add_months(date.today(), months_ahead)
+    partitions = month_partitions(first, last)
+
+    drop_event_foreign_keys(cursor, database)
+
+    # Every unique key on a partitioned table must contain the partitioning column
+    cursor.execute("ALTER TABLE Event DROP PRIMARY KEY, ADD PRIMARY KEY (event_id, event_date)")
+    cursor.execute(
+        "ALTER TABLE Event PARTITION BY RANGE COLUMNS(event_date) (\n    "
+        + partition_clause(partitions)
+        + "\n)"
+    )
+    print(f"Partitioned Event into {len(partitions) + 1} partitions "
+          f"({partitions[0][0]} .. {partitions[-1][0]}, {MAX_PARTITION})")
+    return True
+
+
+def extend_partitions(cursor, database, months_ahead):
+    """Split pmax so there are monthly partitions up to months_ahead from today"""
+    existing = get_partitions(cursor, database)
+    if not existing:
+        print("Event is not partitioned, nothing to extend")
+        return 0
+
+    monthly = [name for name in existing if name != MAX_PARTITION]
+    last = monthly[-1]
+    first_new = add_months(date(int(last[1:5]), int(last[5:7]), 1), 1)
+    partitions = month_partitions(first_new, add_months(date.today(), months_ahead))
+    if not partitions:
+        print("Partitions already cover the requested range")
+        return 0
+
+    cursor.execute(
+        f"ALTER TABLE Event REORGANIZE PARTITION {MAX_PARTITION} INTO (\n    "
+        + partition_clause(partitions)
+        + "\n)"
+    )
+    print(f"Added {len(partitions)} partitions ({partitions[0][0]} .. {partitions[-1][0]})")
+    return len(partitions)
+
+
+def explain_range(cursor, database, start_date, end_date):
+    """EXPLAIN the date-range listing and report which partitions are read"""
+    cursor.execute(
+        """
+        EXPLAIN SELECT event_id, event_name, event_date, start_time
+        FROM Event
+        WHERE event_date BETWEEN %s AND %s
+        ORDER BY event_date, start_time, event_id
+        """,
+        (start_date, end_date)
+    )
+    columns = [col[0] for col in cursor.description]
+    plan = dict(zip(columns, cursor.fetchone()))
+
+    total = get_partitions(cursor, database)
+    scanned = plan['partitions'].split(',') if plan.get('partitions') else []
+
+    print(f"EXPLAIN event_date BETWEEN {start_date} AND {end_date}")
+    print(f"  access type: {plan['type']}")
+    print(f"  key:         {plan['key']}")
+    print(f"  rows:        {plan['rows']}")
+    print(f"  extra:       {plan['Extra']}")
+    if total:
+        print(f"  partitions:  {len(scanned)}/{len(total)} ({', '.join(scanned)})")
+        if len(scanned) < len(total):
+            print("  Partition pruning is active")
+        else:
+            print("  WARNING: no partitions were pruned")
+    else:
+        print("  Event is not partitioned")
+    return plan
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Index and partition the Event table by event_date')
+    parser.add_argument('--index-only', action='store_true',
+                        help='Only add the composite date index, keep foreign keys')
+    parser.add_argument('--months-ahead', type=int, default=12,
+                        help='Monthly partitions to create past the current month')
+    parser.add_argument('--extend', type=int, metavar='MONTHS',
+                        help='Add monthly partitions up to MONTHS from today')
+    parser.add_argument('--explain', nargs=2, metavar=('START', 'END'),
+                        help='Show the plan and partitions read for a date range')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = load_config()
+    connection = mysql.connector.connect(
+        host=config['host'],
+        user=config['user'],
+        password=config['password'],
+        database=config['database']
+    )
+    cursor = connection.cursor()
+
+    try:
+        if args.explain:
+            explain_range(cursor, config['database'], *args.explain)
+        elif args.extend is not None:
+            extend_partitions(cursor, config['database'], args.extend)
+        else:
+            add_date_index(cursor, config['database'])
+            if not args.index_only:
+                partition_event_table(cursor, config['database'], args.months_ahead)
+        connection.commit()
+    except mysql.connector.Error as e:
+        print(f"Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        cursor.close()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+'''
+pipeline.py
+Scrapes Maine Public and imports the events in one process, with no
+subprocesses and no JSON file in between.
+
+The scraper runs in a producer thread and puts each unique event on a
+bounded queue as soon as its batch of pages completes. The importer reads
+the queue in --batch-size chunks and commits each one, so importing
+overlaps scraping. A full queue blocks the scraper, so at most
+--queue-size scraped events wait in memory. --save keeps an NDJSON copy of
+what was scraped, and --file feeds an existing JSON/NDJSON file through the
+same path instead of scraping. --engine async scrapes with the asyncio
+crawler in async_crawler.py, whose concurrency adapts to the server,
+instead of the scraper's thread pool.
+
+The report gives each stage's wall time: scraping (first page to last
+event) and how long it was blocked on a full queue, importing and how long
+it waited on an empty one, the derived-table refresh, and the end-to-end
+total.
+
+Usage:
+    python pipeline.py                          # scrape every page and import as it goes
+    python pipeline.py --pages 20 --bulk        # first 20 pages, set-based import
+    python pipeline.py --engine async           # adaptive asyncio crawler instead of threads
+    python pipeline.py --file maine_events.json # import a saved feed
+'''
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import mysql.connector
+
+from event_stream import iter_events
+from jsonTOsql import connect_to_db, import_bulk, import_rows, print_import_summary, refresh_derived_tables
+from normalize import RejectLog
+from startup import load_config
+
+BASE_DIR = Path(__file__).parent
+
+FULL_SCRAPE_PAGES = 400
+QUEUE_SIZE = 1000
+# Smaller than the file importer's default so the first commits land while scraping continues
+BATCH_SIZE = 500
+PUT_TIMEOUT = 0.5
+
+ENGINES = ('threads', 'async')
+
+STAGES = ('migrate', 'scrape', 'import', 'derived_tables')
+WAITS = {'scrape': 'blocked on full queue', 'import': 'waiting for scraper'}
+
+
+def scraped_events(pages, scrape_details=True, engine='threads', max_concurrency=None):
+    """Events from the first `pages` calendar pages, as the scraper finishes them"""
+    # Imported here so --file runs need neither requests nor BeautifulSoup, and only
+    # the async engine needs aiohttp
+    from maine_public_scraper import CALENDAR_URL, iter_pages_concurrent
+    if engine == 'async':
+        from async_crawler import MAX_CONCURRENCY, iter_pages_async
+        return iter_pages_async(CALENDAR_URL, 1, pages, scrape_details=scrape_details,
+                                max_concurrency=max_concurrency or MAX_CONCURRENCY)
+    return iter_pages_concurrent(CALENDAR_URL, 1, pages, scrape_details=scrape_details)
+
+
+def saved(events, path):
+    """Pass events through, writing each to an NDJSON file"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False) + '\n')
+            yield event
+
+
+def produce(events, out, stop, timings, failures):
+    """Put every event on the queue, then the None end marker.
+
+    Gives up as soon as stop is set (the importer failed), closing the
+    event source so the scraper cancels its remaining pages.
+    """
+    started = time.perf_counter()
+    try:
+        for event in events:
+            if not put(out, event, stop, timings):
+                break
+    except Exception as e:
+        failures.append(e)
+    finally:
+        if hasattr(events, 'close'):
+            events.close()
+        timings['scrape'] = time.perf_counter() - started
+        put(out, None, stop, timings)
+
+
+def put(out, item, stop, timings):
+    """Put item on the queue, waiting while it is full; False if stopped first"""
+    started = time.perf_counter()
+    try:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+    finally:
+        timings['scrape_wait'] += time.perf_counter() - started
+
+
+def drain(source, timings):
+    """Yield events from the queue until the end marker, timing the waits"""
+    while True:
+        started = time.perf_counter()
+        event = source.get()
+        timings['import_wait'] += time.perf_counter() - started
+        if event is None:
+            return
+        yield event
+
+
+def run_pipeline(config, pages=FULL_SCRAPE_PAGES, json_file=None, scrape_details=True, bulk=False,
+                 batch_size=BATCH_SIZE, queue_size=QUEUE_SIZE, save_file=None, rejects_file=None,
+                 timings=None, engine='threads', max_concurrency=None):
+    """Scrape (or read json_file) and import through a bounded queue; returns (totals, timings).
+
+    A scrape that fails part-way still imports and summarizes what it
+    produced, then raises RuntimeError.
+    """
+    timings = timings if timings is not None else Counter()
+    started = time.perf_counter()
+
+    events = iter_events(json_file) if json_file else scraped_events(pages, scrape_details, engine, max_concurrency)
+    if save_file:
+        events = saved(events, save_file)
+    source = json_file or f"{pages} calendar pages ({engine} engine)"
+
+    rejects = RejectLog(rejects_file or str(BASE_DIR / 'pipeline.rejected.ndjson'))
+    connection = connect_to_db(config['host'], config['user'], config['password'], config['database'])
+
+    events_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    failures = []
+    producer = threading.Thread(target=produce, args=(events, events_queue, stop, timings, failures),
+                                name='scrape')
+    print(f"Starting pipeline from {source} ({'bulk' if bulk else 'row'} import, "
+          f"batches of {batch_size}, queue of {queue_size})...")
+    producer.start()
+
+    import_started = time.perf_counter()
+    try:
+        importer = import_bulk if bulk else import_rows
+        totals = importer(connection, drain(events_queue, timings), batch_size, rejects=rejects)
+    finally:
+        # Unblocks the scraper if the import failed; a no-op once it has finished
+        stop.set()
+        producer.join()
+    timings['import'] = time.perf_counter() - import_started
+    import_elapsed = timings['import']
+
+    derived_started = time.perf_counter()
+    refresh_derived_tables(connection)
+    timings['derived_tables'] = time.perf_counter() - derived_started
+    connection.close()
+    timings['total'] += time.perf_counter() - started
+
+    print(f"{'=' * 60}")
+    print(f"Pipeline Summary:")
+    print_import_summary(totals, import_elapsed, rejects)
+    if save_file:
+        print(f"Scraped events saved to {save_file}")
+    print(f"{'-' * 60}")
+    print_timings(timings)
+    print(f"{'=' * 60}")
+    if failures:
+        raise RuntimeError(f"Scrape failed: {failures[0]} (events scraped before it were imported)")
+    return totals, timings
+
+
+def print_timings(timings):
+    print(f"{'Stage':<16} {'Wall (s)':>9} {'Waiting (s)':>12}")
+    for name in STAGES:
+        if name not in timings:
+            continue
+        wait = timings.get(f'{name}_wait')
+        line = f"{name:<16} {timings[name]:>9.2f}"
+        if wait is not None:
+            line += f" {wait:>12.2f}  {WAITS[name]}"
+        print(line)
+    print(f"{'total':<16} {timings['total']:>9.2f}")
+    # Scrape and import run at the same time, so their sum exceeds the wall time by the overlap
+    overlap = timings['scrape'] + timings['import'] - (timings['total'] - timings['migrate']
+                                                       - timings['derived_tables'])
+    if overlap > 0:
+        print(f"Scrape/import overlap: {overlap:.2f}s")
+
+
+def add_arguments(parser):
+    """The pipeline's flags, shared with startup.py"""
+    parser.add_argument('--pages', type=int, default=FULL_SCRAPE_PAGES,
+                        help=f'Calendar pages to scrape (default: {FULL_SCRAPE_PAGES}, every page)')
+    parser.add_argument('--file', help='Import this JSON/NDJSON feed instead of scraping')
+    parser.add_argument('--no-details', action='store_true',
+                        help='Skip the per-event pages (no venue addresses, much faster)')
+    parser.add_argument('--engine', choices=ENGINES, default='threads',
+                        help='Scrape with the thread pool or the adaptive asyncio crawler (default: threads)')
+    parser.add_argument('--max-concurrency', type=int,
+                        help='Most requests the async engine may have in flight (default: 256)')
+    parser.add_argument('--bulk', action='store_true', help='Import through the set-based staging table')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f'Events per committed batch (default: {BATCH_SIZE})')
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE,
+                        help=f'Scraped events that may wait for the importer (default: {QUEUE_SIZE})')
+    parser.add_argument('--save', metavar='PATH', help='Also write the scraped events to this NDJSON file')
+    parser.add_argument('--rejects', metavar='PATH',
+                        help='NDJSON file for rejected rows (default: pipeline.rejected.ndjson)')
+
+
+def run_from_args(config, args, timings=None):
+    return run_pipeline(
+        config,
+        pages=args.pages,
+        json_file=args.file,
+        scrape_details=not args.no_details,
+        bulk=args.bulk,
+        batch_size=args.batch_size,
+        queue_size=args.queue_size,
+        save_file=args.save,
+        rejects_file=args.rejects,
+        timings=timings,
+        engine=args.engine,
+        max_concurrency=args.max_concurrency
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Scrape Maine Public events and import them in one process')
+    add_arguments(parser)
+    parser.add_argument('--no-migrate', action='store_true', help='Do not apply pending schema migrations first')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = load_config()
+    timings = Counter()
+    try:
+        if not args.no_migrate:
+            import migrate
+            started = time.perf_counter()
+            migrate.migrate(config)
+            timings['migrate'] = timings['total'] = time.perf_counter() - started
+        run_from_args(config, args, timings)
+    except (mysql.connector.Error, RuntimeError, json.JSONDecodeError, ValueError) as e:
+        print(f"Error: Pipeline failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
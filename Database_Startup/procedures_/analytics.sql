@@ -1,12 +1,9 @@
 /*
 analytics.sql 
-Alters tables to include analytics attributes
-Creates procedures to update those attributes
+Creates procedures to update the analytics attributes
+(User.last_login and Event.view_count, declared with their tables)
 @author Mason Beale
 */
-ALTER TABLE User ADD COLUMN last_login DATETIME;
-ALTER TABLE Event ADD COLUMN view_count INT DEFAULT 0;
-
 DELIMITER //
 CREATE PROCEDURE IF NOT EXISTS user_login (p_user_id INT)
 BEGIN
@@ -18,6 +18,7 @@ BEGIN
                        organizer_id, location_id, description)
     VALUES (p_event_name, p_event_date, p_start_time, p_end_time, p_max_capacity,
             p_organizer_id, p_location_id, p_description);
+    CALL refresh_upcoming_event(LAST_INSERT_ID());
 END //
 DELIMITER ;
 
@@ -64,6 +65,8 @@ BEGIN
         location_id = p_location_id,
         description = p_description
     WHERE event_id = p_event_id;
+    UPDATE event_capacity SET capacity = p_max_capacity WHERE event_id = p_event_id;
+    CALL refresh_upcoming_event(p_event_id);
 END //
 DELIMITER ;
 
@@ -73,5 +76,7 @@ DELIMITER //
 CREATE PROCEDURE DeleteEvent(IN p_event_id INT)
 BEGIN
     DELETE FROM Event WHERE event_id = p_event_id;
+    DELETE FROM event_capacity WHERE event_id = p_event_id;
+    CALL refresh_upcoming_event(p_event_id);
 END //
 DELIMITER ;
@@ -0,0 +1,72 @@
+/*
+upcoming_listing_procedures.sql
+Maintains the upcoming_event_listing table.
+refresh_upcoming_event_listing rebuilds it into a new table and swaps it in
+with one atomic RENAME, so readers never see a partial listing.
+refresh_upcoming_event re-derives a single event's row after a write.
+Every event still in Event is listed; past events drop out when
+archive_events.py archives them.
+*/
+DELIMITER //
+CREATE PROCEDURE IF NOT EXISTS refresh_upcoming_event_listing()
+BEGIN
+    DROP TABLE IF EXISTS upcoming_event_listing_new;
+    DROP TABLE IF EXISTS upcoming_event_listing_old;
+    CREATE TABLE upcoming_event_listing_new LIKE upcoming_event_listing;
+
+    INSERT INTO upcoming_event_listing_new (
+        event_id, event_name, description, event_date, start_time, end_time, max_capacity,
+        venue_name, address, city, zip_code,
+        organizer_first_name, organizer_last_name, organizer_email,
+        rsvp_count, avg_rating, review_count
+    )
+    SELECT
+        e.event_id, e.event_name, e.description, e.event_date, e.start_time, e.end_time, e.max_capacity,
+        l.venue_name, l.address, l.city, l.zip_code,
+        u.first_name, u.last_name, u.email,
+        COALESCE(r.rsvp_count, 0), rv.avg_rating, COALESCE(rv.review_count, 0)
+    FROM Event e
+    LEFT JOIN Location l ON e.location_id = l.location_id
+    LEFT JOIN User u ON e.organizer_id = u.user_id
+    LEFT JOIN (
+        SELECT event_id, COUNT(*) AS rsvp_count
+        FROM RSVP WHERE RSVP_status = 'Going'
+        GROUP BY event_id
+    ) r ON e.event_id = r.event_id
+    LEFT JOIN (
+        SELECT event_id, AVG(rating) AS avg_rating, COUNT(*) AS review_count
+        FROM review
+        GROUP BY event_id
+    ) rv ON e.event_id = rv.event_id
+    ORDER BY e.event_date, e.start_time, e.event_id;
+
+    RENAME TABLE upcoming_event_listing TO upcoming_event_listing_old,
+                 upcoming_event_listing_new TO upcoming_event_listing;
+    DROP TABLE upcoming_event_listing_old;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE IF NOT EXISTS refresh_upcoming_event(IN p_event_id INT)
+BEGIN
+    DELETE FROM upcoming_event_listing WHERE event_id = p_event_id;
+
+    INSERT INTO upcoming_event_listing (
+        event_id, event_name, description, event_date, start_time, end_time, max_capacity,
+        venue_name, address, city, zip_code,
+        organizer_first_name, organizer_last_name, organizer_email,
+        rsvp_count, avg_rating, review_count
+    )
+    SELECT
+        e.event_id, e.event_name, e.description, e.event_date, e.start_time, e.end_time, e.max_capacity,
+        l.venue_name, l.address, l.city, l.zip_code,
+        u.first_name, u.last_name, u.email,
+        (SELECT COUNT(*) FROM RSVP WHERE event_id = e.event_id AND RSVP_status = 'Going'),
+        (SELECT AVG(rating) FROM review WHERE event_id = e.event_id),
+        (SELECT COUNT(*) FROM review WHERE event_id = e.event_id)
+    FROM Event e
+    LEFT JOIN Location l ON e.location_id = l.location_id
+    LEFT JOIN User u ON e.organizer_id = u.user_id
+    WHERE e.event_id = p_event_id;
+END //
+DELIMITER ;
@@ -0,0 +1,331 @@
+'''
+scrape_benchmark.py
+Measures the Maine Public scraper's HTTP throughput against a local
+stand-in for www.mainepublic.org, so changes can be compared without
+loading the real site.
+
+The stand-in is an HTTP/1.1 server that answers any path with a page the
+size of a calendar listing. --connect-delay makes it wait before serving
+each new connection. This stands in for the TCP and TLS handshakes of a
+real HTTPS connection, which a kept-alive connection pays only once.
+
+Fetches --requests pages with --workers threads, two ways:
+    per-request  requests.get() for every page, a new connection each time
+    session      maine_public_scraper.fetch(), each thread's keep-alive session
+
+--engines instead crawls --pages calendar pages, with their event pages,
+with each scrape engine:
+    threads  maine_public_scraper.scrape_pages_concurrent(), the thread pool
+             (--workers threads, default sized from the CPU count)
+    async    async_crawler.iter_pages_async(), adaptive concurrency up to
+             --max-concurrency requests in flight
+The stand-in then serves listing and event pages in the site's markup. It
+takes --latency seconds over each response, like a remote server's round
+trip. --capacity N lets it work on only N requests at once, queue N more
+and answer 503 to the rest, like an overloaded site. --error-rate answers
+that fraction of requests with 503 at random.
+
+Usage:
+    python scrape_benchmark.py --requests 2000 --workers 8 --connect-delay 0.02
+    python scrape_benchmark.py --engines --pages 20 --latency 0.05 --capacity 64
+'''
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+import maine_public_scraper
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; with Nagle on, a kept-alive
+    # connection would stall on the client's delayed ACK after every response
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        # Runs once per connection, like a handshake
+        self.server.count_connection()
+        time.sleep(self.server.connect_delay)
+        super().setup()
+
+    def do_GET(self):
+        if not self.server.site:
+            self.send_body(200, self.server.body)
+            return
+
+        if not self.server.admit():
+            self.send_body(503, b'Service Unavailable')
+            return
+        try:
+            time.sleep(self.server.latency)
+            if random.random() < self.server.error_rate:
+                self.send_body(503, b'Service Unavailable')
+            else:
+                self.send_body(200, self.server.page(self.path))
+        finally:
+            self.server.finish()
+
+    def send_body(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+LISTING_ITEM = '''<li class="EventSearchResultsModule-results-item">
+  <ps-promo class="PromoEvent">
+    <h3 class="PromoEvent-title"><a href="{url}">Stand-in Event {id}</a></h3>
+    <a class="PromoEvent-link-link" href="{url}"></a>
+    <p class="PromoEvent-date-date">{month} 15 Saturday</p>
+    <div class="PromoEvent-time">7:00 PM - 9:00 PM</div>
+    <div class="PromoEvent-description">A community event served by the benchmark stand-in.</div>
+  </ps-promo>
+</li>
+'''
+
+EVENT_PAGE = '''<html><body><div class="EventPage-venueInformation"><div class="VenueInformation">
+  <span class="VenueInformation-text-name">Stand-in Hall {id}</span>
+  <span class="VenueInformation-address-street">{number} Congress Street</span>
+  <span class="VenueInformation-address-city">Portland</span>
+  <span class="VenueInformation-address-state">ME</span>
+  <span class="VenueInformation-address-zip">04101</span>
+  <div class="VenueInformation-phone">207-555-0100</div>
+</div></div></body></html>
+'''
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Hundreds of connections may open at once
+    request_queue_size = 1024
+
+    def __init__(self, page_bytes, connect_delay, site_pages=0, latency=0.0, capacity=0, error_rate=0.0,
+                 events_per_page=20):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.page_bytes = page_bytes
+        self.body = self.pad(b'<html><body>', b'<li class="EventSearchResultsModule-results-item"></li>\n')
+        self.connect_delay = connect_delay
+        # With site_pages, serves that many calendar pages and their event pages
+        self.site = site_pages > 0
+        self.site_pages = site_pages
+        self.events_per_page = events_per_page
+        self.latency = latency
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Next month's events, which the scraper never skips as past
+        self.month = datetime(2000, datetime.now().month % 12 + 1, 1).strftime('%b')
+        self.connections = 0
+        self.requests = 0
+        self.rejected = 0
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        self._working = threading.Semaphore(capacity) if capacity else None
+
+    def pad(self, head, filler):
+        return (head + filler * (self.page_bytes // len(filler) + 1))[:self.page_bytes]
+
+    def handle_error(self, request, client_address):
+        # A crawl that is cancelled hangs up mid-response; that is not a server failure
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def reset(self):
+        with self._lock:
+            self.connections = self.requests = self.rejected = self.peak = 0
+
+    def admit(self):
+        """Start a request, waiting for a free worker; False if the queue is full"""
+        with self._lock:
+            self.requests += 1
+            if self.capacity and self.active >= 2 * self.capacity:
+                self.rejected += 1
+                return False
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        if self._working:
+            self._working.acquire()
+        return True
+
+    def finish(self):
+        if self._working:
+            self._working.release()
+        with self._lock:
+            self.active -= 1
+
+    def page(self, path):
+        """A calendar listing page (empty past the last page) or an event page"""
+        parts = urlsplit(path)
+        if parts.path.startswith('/event/'):
+            event_id = parts.path.rsplit('/', 1)[1]
+            return EVENT_PAGE.format(id=event_id, number=event_id.replace('-', '')).encode()
+
+        page_num = int(parse_qs(parts.query).get('p', ['1'])[0])
+        items = ''
+        if page_num <= self.site_pages:
+            items = ''.join(LISTING_ITEM.format(url=f"{self.url}/event/{page_num}-{i}", id=f"{page_num}-{i}",
+                                                month=self.month)
+                            for i in range(self.events_per_page))
+        html = f'<html><body><ul>{items}</ul>'.encode()
+        # Padded with an HTML comment to the size of a real listing page
+        padding = max(0, self.page_bytes - len(html) - 24)
+        return html + b'<!-- ' + b'x' * padding + b' --></body></html>'
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+def start_server(page_bytes, connect_delay, **site):
+    server = StandInServer(page_bytes, connect_delay, **site)
+    threading.Thread(target=server.serve_forever, name='stand-in', daemon=True).start()
+    return server
+
+
+def per_request_get(url):
+    """How the scraper fetched pages before: no session, so no connection reuse"""
+    return requests.get(url, headers=maine_public_scraper.HEADERS, timeout=maine_public_scraper.REQUEST_TIMEOUT)
+
+
+def run_fetches(fetch, base_url, count, workers):
+    """(seconds, failures) for fetching `count` pages with `workers` threads"""
+    failures = 0
+
+    def work(i):
+        response = fetch(f"{base_url}/community-calendar?p={i}")
+        return response.status_code == 200 and len(response.content) > 0
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for ok in executor.map(work, range(count)):
+            failures += not ok
+    return time.perf_counter() - started, failures
+
+
+def run_benchmark(count, workers, connect_delay, page_bytes):
+    server = start_server(page_bytes, connect_delay)
+    maine_public_scraper.configure_http(workers)
+    modes = [('per-request', per_request_get), ('session', maine_public_scraper.fetch)]
+
+    print(f"{'=' * 60}")
+    print(f"Scraper HTTP Benchmark: {count} pages of {page_bytes / 1000:.0f} KB, {workers} workers, "
+          f"{connect_delay * 1000:.0f} ms per new connection")
+    print(f"{'Mode':<14} {'Seconds':>9} {'Req/sec':>9} {'Connections':>12} {'Failures':>9}")
+    results = {}
+    for name, fetch in modes:
+        server.connections = 0
+        seconds, failures = run_fetches(fetch, server.url, count, workers)
+        results[name] = count / seconds
+        print(f"{name:<14} {seconds:>9.2f} {count / seconds:>9.0f} {server.connections:>12} {failures:>9}")
+    print(f"Speedup: {results['session'] / results['per-request']:.1f}x")
+    print(f"{'=' * 60}")
+    server.shutdown()
+    return results
+
+
+def run_engine(engine, server, pages, workers, max_concurrency):
+    """(seconds, events, errors printed, limiter) for crawling `pages` stand-in calendar pages"""
+    base_url = f"{server.url}/community-calendar?f0=&from=&to=&q="
+    limiter = None
+    cwd = os.getcwd()
+    # Both engines print every page and write scraper_progress.json; keep both out of the way
+    output = io.StringIO()
+    with tempfile.TemporaryDirectory() as scratch, redirect_stdout(output):
+        os.chdir(scratch)
+        try:
+            started = time.perf_counter()
+            if engine == 'threads':
+                events = maine_public_scraper.scrape_pages_concurrent(base_url, 1, pages, max_workers=workers)
+            else:
+                import async_crawler
+                limiter = async_crawler.AdaptiveLimiter(maximum=max_concurrency)
+                events = list(async_crawler.iter_pages_async(base_url, 1, pages, limiter=limiter))
+            seconds = time.perf_counter() - started
+        finally:
+            os.chdir(cwd)
+    errors = sum(1 for line in output.getvalue().splitlines() if 'Error' in line)
+    return seconds, events, errors, limiter
+
+
+def run_engine_benchmark(pages, workers, max_concurrency, connect_delay, page_bytes, latency, capacity,
+                         error_rate):
+    server = start_server(page_bytes, connect_delay, site_pages=pages, latency=latency, capacity=capacity,
+                          error_rate=error_rate)
+    threads = workers or maine_public_scraper.calculate_optimal_workers(pages)[1]
+
+    print(f"{'=' * 60}")
+    print(f"Scrape Engine Benchmark: {pages} calendar pages of {server.events_per_page} events, "
+          f"{latency * 1000:.0f} ms per response")
+    print(f"Server capacity: {capacity or 'unlimited'}, random 503s: {error_rate:.0%}")
+    print(f"{'Engine':<8} {'Seconds':>8} {'Events':>7} {'Venues':>7} {'Req/sec':>8} {'Peak':>5} {'Shed':>5} "
+          f"{'Errors':>7}")
+    results = {}
+    for engine in ('threads', 'async'):
+        server.reset()
+        seconds, events, errors, limiter = run_engine(engine, server, pages, threads, max_concurrency)
+        venues = sum(1 for event in events if event.get('street'))
+        results[engine] = seconds
+        print(f"{engine:<8} {seconds:>8.2f} {len(events):>7} {venues:>7} {server.requests / seconds:>8.0f} "
+              f"{server.peak:>5} {server.rejected:>5} {errors:>7}")
+        if limiter:
+            print(f"         {limiter.summary()}")
+    print(f"Threads: {threads} workers; async: up to {max_concurrency} requests in flight")
+    print(f"Speedup: {results['threads'] / results['async']:.1f}x")
+    print(f"{'=' * 60}")
+    server.shutdown()
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark scraper HTTP throughput against a local stand-in')
+    parser.add_argument('--requests', type=int, default=1000, help='Pages to fetch per mode (default: 1000)')
+    parser.add_argument('--workers', type=int,
+                        help='Fetching threads (default: 8, or with --engines sized from the CPU count)')
+    parser.add_argument('--connect-delay', type=float, default=0.02,
+                        help='Seconds the stand-in waits per new connection (default: 0.02)')
+    parser.add_argument('--page-kb', type=int, default=60, help='Page size in KB (default: 60)')
+    parser.add_argument('--engines', action='store_true',
+                        help='Compare the thread and async scrape engines on a stand-in calendar')
+    parser.add_argument('--pages', type=int, default=10, help='Calendar pages to crawl (default: 10)')
+    parser.add_argument('--max-concurrency', type=int, default=256,
+                        help='Most requests the async engine may have in flight (default: 256)')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Seconds the stand-in takes over each response (default: 0.05)')
+    parser.add_argument('--capacity', type=int, default=0,
+                        help='Requests the stand-in works on at once, 0 for no limit (default: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with 503 (default: 0)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.engines:
+        run_engine_benchmark(args.pages, args.workers, args.max_concurrency, args.connect_delay,
+                             args.page_kb * 1000, args.latency, args.capacity, args.error_rate)
+    else:
+        run_benchmark(args.requests, args.workers or 8, args.connect_delay, args.page_kb * 1000)
+
+
+if __name__ == "__main__":
+    main()
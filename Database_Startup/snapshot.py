@@ -0,0 +1,431 @@
+'''
+snapshot.py
+Exports the database to a compressed snapshot and bootstraps a fresh
+database from one, instead of a 30-60 minute scrape or a per-row import.
+
+A snapshot is a directory holding one gzipped file per table in the
+format LOAD DATA reads (tab-separated, backslash escapes, \\N for NULL,
+binary columns in hex), plus manifest.json. The manifest lists each
+table's file, columns, row count and SHA-256, and the schema version and
+migration checksums the data was exported at. Every table is read in one
+consistent-snapshot transaction, so the files agree with each other.
+
+Import verifies the files, creates the schema with migrate.py up to the
+snapshot's version, and loads each table with foreign key and unique
+checks off. Secondary indexes are dropped before the load and rebuilt
+afterwards in one ALTER per table, which sorts each index once instead of
+maintaining it row by row. Indexes that back a foreign key stay in place.
+Migrations newer than the snapshot then run as usual.
+
+Rows are loaded with LOAD DATA LOCAL INFILE. If the server or client
+refuses local files (local_infile=OFF), the import falls back to batched
+multi-row INSERTs. These are slower but need no server setting.
+
+Usage:
+    python snapshot.py --export snapshots/2025-11-20
+    python snapshot.py --import snapshots/2025-11-20              # into an empty database
+    python snapshot.py --import snapshots/2025-11-20 --replace    # drop the database first
+'''
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import mysql.connector
+
+import migrate
+from startup import load_config
+
+FORMAT = 'mysql-tsv-gzip'
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+
+FETCH_SIZE = 10000
+INSERT_BATCH = 5000
+COMPRESS_LEVEL = 6
+
+BINARY_TYPES = frozenset(('binary', 'varbinary', 'tinyblob', 'blob', 'mediumblob', 'longblob'))
+NULL = '\\N'
+ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+UNESCAPE_RE = re.compile(r'\\(.)')
+UNESCAPES = {'t': '\t', 'n': '\n', 'r': '\r', '0': '\0'}
+
+# ER_NOT_ALLOWED_COMMAND, CR_LOAD_DATA_LOCAL_INFILE_REJECTED, ER_CLIENT_LOCAL_FILES_DISABLED
+LOCAL_INFILE_REFUSED = (1148, 2068, 3948)
+
+
+def connect(config, database=None, local_infile=False):
+    # TIMESTAMP values are written and read back in UTC, so a snapshot loads
+    # unchanged whatever time zone either server defaults to
+    return mysql.connector.connect(
+        host=config['host'],
+        user=config['user'],
+        password=config['password'],
+        database=database,
+        allow_local_infile=local_infile,
+        time_zone='+00:00'
+    )
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_tables(cursor, database):
+    """[(table, [(column, is_binary)], [primary key columns])] for the tables worth exporting"""
+    cursor.execute(
+        """
+        SELECT c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE, c.COLUMN_KEY, c.GENERATION_EXPRESSION
+        FROM information_schema.COLUMNS c
+        JOIN information_schema.TABLES t ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+        WHERE c.TABLE_SCHEMA = %s AND t.TABLE_TYPE = 'BASE TABLE'
+        ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+        """,
+        (database,)
+    )
+    tables = {}
+    for table, column, data_type, column_key, generation in cursor.fetchall():
+        # Generated columns are recomputed on load. EXTRA is no test for them:
+        # MySQL 8 marks every DEFAULT CURRENT_TIMESTAMP column DEFAULT_GENERATED
+        if migrate.IGNORED_TABLES.match(table) or generation:
+            continue
+        columns, primary_key = tables.setdefault(table, ([], []))
+        columns.append((column, data_type.lower() in BINARY_TYPES))
+        if column_key == 'PRI':
+            primary_key.append(column)
+    return [(table, columns, primary_key) for table, (columns, primary_key) in tables.items()]
+
+
+def export_table(connection, table, columns, primary_key, path):
+    """Write one table to a gzipped LOAD DATA file; returns the row count"""
+    # The server formats every value as LOAD DATA will read it back
+    select = ', '.join(f"HEX(`{column}`)" if binary else f"CAST(`{column}` AS CHAR)"
+                       for column, binary in columns)
+    order = f" ORDER BY {', '.join(f'`{column}`' for column in primary_key)}" if primary_key else ''
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT {select} FROM `{table}`{order}")
+    rows = 0
+    with gzip.open(path, 'wt', encoding='utf-8', newline='\n', compresslevel=COMPRESS_LEVEL) as f:
+        while True:
+            batch = cursor.fetchmany(FETCH_SIZE)
+            if not batch:
+                break
+            f.write(''.join(
+                '\t'.join(NULL if value is None else value.translate(ESCAPES) for value in row) + '\n'
+                for row in batch
+            ))
+            rows += len(batch)
+    cursor.close()
+    return rows
+
+
+def export_snapshot(config, directory):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+
+    connection = connect(config, config['database'])
+    cursor = connection.cursor()
+    try:
+        applied = migrate.applied_versions(cursor)
+    except mysql.connector.Error:
+        applied = {}
+    if not applied:
+        raise RuntimeError("The database has no schema_version rows; run `python migrate.py` first")
+
+    # Every table is read from the same point in time
+    cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+    cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+    tables = snapshot_tables(cursor, config['database'])
+    cursor.close()
+
+    entries = []
+    for table, columns, primary_key in tables:
+        table_started = time.perf_counter()
+        path = directory / f"{table}.tsv.gz"
+        rows = export_table(connection, table, columns, primary_key, path)
+        entries.append({
+            'table': table,
+            'file': path.name,
+            'columns': [column for column, _ in columns],
+            'binary_columns': [column for column, binary in columns if binary],
+            'rows': rows,
+            'bytes': path.stat().st_size,
+            'sha256': file_sha256(path),
+        })
+        print(f"  {table}: {rows} rows ({time.perf_counter() - table_started:.2f}s)")
+    connection.rollback()
+    connection.close()
+
+    manifest = {
+        'format': FORMAT,
+        'format_version': FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'database': config['database'],
+        'schema_version': max(applied),
+        'migrations': {str(version): checksum for version, (_, checksum) in sorted(applied.items())},
+        'tables': entries,
+    }
+    with open(directory / MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    elapsed = time.perf_counter() - started
+    print(f"{'=' * 60}")
+    print(f"Snapshot Export: {directory}")
+    print(f"Tables: {len(entries)}, rows: {sum(entry['rows'] for entry in entries)}, "
+          f"compressed size: {sum(entry['bytes'] for entry in entries) / 1e6:.1f} MB")
+    print(f"Schema version: {manifest['schema_version']}")
+    print(f"Time: {elapsed:.2f}s")
+    print(f"{'=' * 60}")
+    return manifest
+
+
+def read_manifest(directory):
+    """The snapshot's manifest, after checking its format and every file's checksum"""
+    directory = Path(directory)
+    with open(directory / MANIFEST, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT or manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format: {manifest.get('format')} v{manifest.get('format_version')}")
+    for entry in manifest['tables']:
+        path = directory / entry['file']
+        if not path.exists():
+            raise FileNotFoundError(f"Snapshot file not found: {path}")
+        if file_sha256(path) != entry['sha256']:
+            raise ValueError(f"Snapshot file {entry['file']} does not match its checksum")
+    return manifest
+
+
+def check_schema(manifest):
+    """Make sure the snapshot's migrations are the ones in this tree"""
+    known = {version: checksum for version, _, _, checksum in migrate.load_migrations()}
+    for version, checksum in manifest['migrations'].items():
+        if known.get(int(version)) != checksum:
+            raise ValueError(f"Snapshot was exported at migration {version}, which differs from (or is missing "
+                             f"in) this tree's migrations; export a new snapshot")
+
+
+def deferrable_indexes(cursor, database, table):
+    """[(name, definition)] of the secondary indexes that can be dropped while the table loads.
+
+    Indexes that a foreign key needs (on either side) and functional
+    indexes are left alone.
+    """
+    cursor.execute(
+        """
+        SELECT INDEX_NAME, NON_UNIQUE, INDEX_TYPE, COLUMN_NAME, SUB_PART, COLLATION, EXPRESSION
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND INDEX_NAME <> 'PRIMARY'
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+        """,
+        (database, table)
+    )
+    indexes = {}
+    for name, non_unique, index_type, column, sub_part, collation, expression in cursor.fetchall():
+        index = indexes.setdefault(name, {'unique': not int(non_unique), 'type': index_type,
+                                          'columns': [], 'parts': [], 'expression': False})
+        index['expression'] = index['expression'] or expression is not None
+        index['columns'].append(column)
+        index['parts'].append(f"`{column}`" + (f"({sub_part})" if sub_part else '')
+                              + (' DESC' if collation == 'D' else ''))
+
+    # Column lists a foreign key relies on: its own columns, or the parent columns it references
+    cursor.execute(
+        """
+        SELECT GROUP_CONCAT(IF(TABLE_NAME = %s, COLUMN_NAME, REFERENCED_COLUMN_NAME) ORDER BY ORDINAL_POSITION)
+        FROM information_schema.KEY_COLUMN_USAGE
+        WHERE TABLE_SCHEMA = %s AND REFERENCED_TABLE_NAME IS NOT NULL
+          AND (TABLE_NAME = %s OR REFERENCED_TABLE_NAME = %s)
+        GROUP BY TABLE_NAME, CONSTRAINT_NAME
+        """,
+        (table, database, table, table)
+    )
+    foreign_keys = [columns.split(',') for (columns,) in cursor.fetchall()]
+
+    deferred = []
+    for name, index in indexes.items():
+        if index['expression'] or any(index['columns'][:len(key)] == key for key in foreign_keys):
+            continue
+        kind = {'FULLTEXT': 'FULLTEXT INDEX', 'SPATIAL': 'SPATIAL INDEX'}.get(
+            index['type'], 'UNIQUE INDEX' if index['unique'] else 'INDEX')
+        deferred.append((name, f"{kind} `{name}` ({', '.join(index['parts'])})"))
+    return deferred
+
+
+def unescape(field):
+    if field == NULL:
+        return None
+    if '\\' not in field:
+        return field
+    return UNESCAPE_RE.sub(lambda match: UNESCAPES.get(match.group(1), match.group(1)), field)
+
+
+def load_data_infile(cursor, entry, path):
+    """LOAD DATA LOCAL INFILE one decompressed snapshot file; returns the rows loaded"""
+    binary = set(entry['binary_columns'])
+    targets = [f"@v{i}" if column in binary else f"`{column}`" for i, column in enumerate(entry['columns'])]
+    assignments = [f"`{column}` = UNHEX(@v{i})" for i, column in enumerate(entry['columns']) if column in binary]
+    cursor.execute(
+        f"LOAD DATA LOCAL INFILE %s INTO TABLE `{entry['table']}` CHARACTER SET utf8mb4 "
+        f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+        f"({', '.join(targets)})" + (f" SET {', '.join(assignments)}" if assignments else ''),
+        (str(path),)
+    )
+    return cursor.rowcount
+
+
+def load_inserts(cursor, entry, path):
+    """Load one snapshot file with batched multi-row INSERTs; returns the rows loaded"""
+    binary = [column in set(entry['binary_columns']) for column in entry['columns']]
+    statement = (f"INSERT INTO `{entry['table']}` ({', '.join(f'`{column}`' for column in entry['columns'])}) "
+                 f"VALUES ({', '.join(['%s'] * len(entry['columns']))})")
+    rows = 0
+    batch = []
+    with gzip.open(path, 'rt', encoding='utf-8', newline='\n') as f:
+        for line in f:
+            values = [unescape(field) for field in line[:-1].split('\t')]
+            batch.append(tuple(bytes.fromhex(value) if is_binary and value is not None else value
+                               for value, is_binary in zip(values, binary)))
+            if len(batch) == INSERT_BATCH:
+                cursor.executemany(statement, batch)
+                rows += len(batch)
+                batch = []
+    if batch:
+        cursor.executemany(statement, batch)
+        rows += len(batch)
+    return rows
+
+
+def load_table(cursor, directory, entry, use_local_infile):
+    """Load one table; returns (rows, used LOAD DATA)"""
+    path = Path(directory) / entry['file']
+    if use_local_infile:
+        fd, temp_path = tempfile.mkstemp(suffix='.tsv')
+        try:
+            with os.fdopen(fd, 'wb') as out, gzip.open(path, 'rb') as f:
+                shutil.copyfileobj(f, out, 1 << 20)
+            return load_data_infile(cursor, entry, temp_path), True
+        except mysql.connector.Error as e:
+            if e.errno not in LOCAL_INFILE_REFUSED:
+                raise
+            print(f"  LOAD DATA LOCAL INFILE refused ({e.msg}); using batched INSERTs")
+        finally:
+            os.unlink(temp_path)
+    return load_inserts(cursor, entry, path), False
+
+
+def import_snapshot(config, directory, replace=False, defer_indexes=True):
+    started = time.perf_counter()
+    manifest = read_manifest(directory)
+    check_schema(manifest)
+    database = config['database']
+
+    server = connect(config)
+    cursor = server.cursor()
+    if replace:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+    cursor.close()
+    server.close()
+
+    connection = connect(config, database, local_infile=True)
+    schema_started = time.perf_counter()
+    migrate.apply(connection, adopt=False, target=manifest['schema_version'])
+    schema_seconds = time.perf_counter() - schema_started
+
+    cursor = connection.cursor()
+    for entry in manifest['tables']:
+        cursor.execute(f"SELECT 1 FROM `{entry['table']}` LIMIT 1")
+        if cursor.fetchall():
+            raise RuntimeError(f"{database}.{entry['table']} already has rows; import into an empty "
+                               f"database or pass --replace")
+
+    cursor.execute("SET SESSION foreign_key_checks = 0")
+    cursor.execute("SET SESSION unique_checks = 0")
+    use_local_infile = True
+    results = []
+    try:
+        for entry in manifest['tables']:
+            table = entry['table']
+            indexes = deferrable_indexes(cursor, database, table) if defer_indexes else []
+            if indexes:
+                cursor.execute(f"ALTER TABLE `{table}` " + ', '.join(f"DROP INDEX `{name}`" for name, _ in indexes))
+
+            load_started = time.perf_counter()
+            rows, use_local_infile = load_table(cursor, directory, entry, use_local_infile)
+            connection.commit()
+            load_seconds = time.perf_counter() - load_started
+            if rows != entry['rows']:
+                # LOAD DATA LOCAL turns bad rows into warnings, so the count is the check
+                raise RuntimeError(f"{table}: loaded {rows} rows, snapshot has {entry['rows']}")
+
+            index_started = time.perf_counter()
+            if indexes:
+                cursor.execute(f"ALTER TABLE `{table}` " + ', '.join(f"ADD {definition}" for _, definition in indexes))
+            index_seconds = time.perf_counter() - index_started
+            results.append((table, rows, load_seconds, len(indexes), index_seconds))
+    finally:
+        cursor.execute("SET SESSION unique_checks = 1")
+        cursor.execute("SET SESSION foreign_key_checks = 1")
+        cursor.close()
+
+    # Anything added to migrations_/ since the export
+    summary = migrate.apply(connection, adopt=False)
+    connection.close()
+
+    elapsed = time.perf_counter() - started
+    total_rows = sum(rows for _, rows, _, _, _ in results)
+    print(f"{'=' * 60}")
+    print(f"Snapshot Import: {directory} -> {database}")
+    print(f"{'Table':<28} {'Rows':>9} {'Load (s)':>9} {'Indexes':>8} {'Index (s)':>10}")
+    for table, rows, load_seconds, index_count, index_seconds in results:
+        print(f"{table:<28} {rows:>9} {load_seconds:>9.2f} {index_count:>8} {index_seconds:>10.2f}")
+    print(f"Schema: {schema_seconds:.2f}s (version {manifest['schema_version']}"
+          + (f", then {len(summary['migrations'])} newer migrations" if summary['migrations'] else '') + ")")
+    print(f"Loaded with: {'LOAD DATA LOCAL INFILE' if use_local_infile else 'batched INSERT'}")
+    print(f"Total: {total_rows} rows in {elapsed:.2f}s ({total_rows / elapsed if elapsed else 0:.0f} rows/sec)")
+    print(f"{'=' * 60}")
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Export or import a compressed database snapshot')
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--export', metavar='DIR', help='Write a snapshot of the configured database to DIR')
+    action.add_argument('--import', dest='import_dir', metavar='DIR',
+                        help='Create the schema and load the snapshot in DIR')
+    parser.add_argument('--replace', action='store_true',
+                        help='Drop the configured database before importing (destroys its data)')
+    parser.add_argument('--no-defer-indexes', action='store_true',
+                        help='Keep secondary indexes in place while loading')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = load_config()
+    try:
+        if args.export:
+            export_snapshot(config, args.export)
+        else:
+            import_snapshot(config, args.import_dir, replace=args.replace,
+                            defer_indexes=not args.no_defer_indexes)
+    except (mysql.connector.Error, RuntimeError, ValueError, FileNotFoundError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,20 @@
 '''
 startup.py
-Initializes the database by creating necessary tables and stored procedures.
-Then runs the Maine Public scraper and imports the data into the database.
+Brings the database schema up to date (migrate.py applies only pending
+migrations, so existing data is kept). With --scrape it then scrapes Maine
+Public and imports the events in the same process (see pipeline.py); with
+--file FILE it imports a saved feed. Run with --check to report schema
+drift instead.
 Uses config.ini file for database connection parameters.
 @author Mason Beale
 '''
+import argparse
 import sys
-import subprocess
+import time
+from collections import Counter
 from pathlib import Path
 import mysql.connector
 import configparser
-import json
 
 def load_config(config_file='config.ini'):
     config = configparser.ConfigParser()
@@ -53,113 +57,6 @@ def load_config(config_file='config.ini'):
         'database': database_name,
     }
 
-def find_sql_files(directory):
-    sql_files = []
-    root_path = Path(directory)
-    for sql_file in root_path.rglob("*.sql"):
-        sql_files.append(sql_file)
-    return sql_files
-
-def execute_sql_files(files, cursor):
-    for file in files:
-        file = Path(file)
-        if not file.exists():
-            raise FileNotFoundError(f"SQL file not found: {file}")
-
-        with open(file, 'r', encoding='utf-8') as f:
-            sql_script = f.read()
-
-        try:
-            cursor.execute(sql_script)
-        except Exception as e:
-            raise RuntimeError(f"Error executing SQL file {file}: {e}")
-
-def run_maine_public_scraper():
-    
-    scraper_file = Path(__file__).parent / 'maine_public_scraper.py'
-    
-    if not scraper_file.exists():
-        print(f"Scraper file not found: {scraper_file}")
-        print("Please ensure maine_public_scraper.py exists in the same directory.")
-        return False
-    
-    try:
-        print("Running scraper...")
-        
-        # Run the scraper as a subprocess
-        result = subprocess.run(
-            [sys.executable, str(scraper_file)],
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='ignore'
-        )
-        
-        # Print the output
-        if result.stdout:
-            print(result.stdout)
-        if result.stderr:
-            print("Scraper stderr:", result.stderr)
-        
-        if result.returncode == 0:
-            print("Maine Public scraper completed successfully!")
-            return True
-        else:
-            print(f"Maine Public scraper failed with exit code: {result.returncode}")
-            return False
-            
-    except Exception as e:
-        print(f"Error running scraper: {e}")
-        return False
-
-def run_json_to_sql_importer(db_config):
-    
-    importer_file = Path(__file__).parent / 'jsonTOsql.py'
-    json_file = Path(__file__).parent / 'maine_events.json'
-    
-    if not importer_file.exists():
-        print(f"Importer file not found: {importer_file}")
-        print("Please ensure jsonTOsql.py is in the same directory.")
-        return False
-    
-    if not json_file.exists():
-        print(f"JSON file not found: {json_file}")
-        print("Please run the scraper first to generate maine_events.json")
-        return False
-    
-    try:
-        result = subprocess.run(
-            [
-                sys.executable,
-                str(importer_file),
-                '--host', db_config['host'],
-                '--user', db_config['user'],
-                '--password', db_config['password'],
-                '--database', db_config['database']
-            ],
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='ignore'
-        )
-        
-        # Print the output
-        if result.stdout:
-            print(result.stdout)
-        if result.stderr:
-            print("Importer stderr:", result.stderr)
-        
-        if result.returncode == 0:
-            print("JSON to SQL import completed successfully!")
-            return True
-        else:
-            print(f"JSON to SQL import failed with exit code: {result.returncode}")
-            return False
-            
-    except Exception as e:
-        print(f"Error running importer: {e}")
-        return False
-
 def setup_database():
     
     # Load configuration
@@ -170,104 +67,50 @@ def setup_database():
         print("Make sure config.ini exists with proper database configuration")
         return False, None
     
-    # Connect to MySQL server
+    # Apply pending schema migrations; existing data is kept (see migrate.py)
+    import migrate
     try:
-        mydb = mysql.connector.connect(
-            host=config['host'],
-            user=config['user'],
-            password=config['password']
-        )
-        mycursor = mydb.cursor()
-        
-        # Create database if it doesn't exist
-        mycursor.execute(f"DROP DATABASE IF EXISTS `{config['database']}`")
-        mycursor.execute(f"CREATE DATABASE IF NOT EXISTS `{config['database']}`")
-        
-        # Connect to the specific database
-        mydb = mysql.connector.connect(
-            host=config['host'],
-            user=config['user'],
-            password=config['password'],
-            database=config['database']
-        )
-        mycursor = mydb.cursor()
-        
-        print(f"Successfully connected to database: {config['database']}")
-        
-    except mysql.connector.Error as err:
-        print(f"Database connection error: {err}")
+        migrate.migrate(config)
+    except (mysql.connector.Error, RuntimeError, ValueError, FileNotFoundError) as err:
+        print(f"Database migration error: {err}")
         return False, None
     
-    # Execute table creation scripts (use script directory as base)
-    base_dir = Path(__file__).parent
-    table_dir = base_dir / 'tables_'
-    table_files = [
-        table_dir / 'location_table.sql',
-        table_dir / 'User_Table.sql',
-        table_dir / 'event_table.sql',
-        table_dir / 'User_fav_table.sql',
-        table_dir / 'Category_Table.sql',
-        table_dir / 'review_table.sql',
-        table_dir / 'RSVP_table.sql',
-    ]
-
-    print("Creating tables...")
-    for file in table_files:
-        if not file.exists():
-            print(f"Table SQL file not found: {file}")
-            return False, None
-    
-    execute_sql_files(table_files, mycursor)
-    
-    # Execute stored procedure scripts
-    print("Creating stored procedures...")
-    procedure_files = find_sql_files(str(base_dir / 'procedures_/'))
-    if not procedure_files:
-        print("No stored procedure files found in procedures_/ directory")
-    else:
-        execute_sql_files(procedure_files, mycursor)
-    
-    # Commit changes
-    mydb.commit()
     print("Database initialization completed successfully!")
-    
-    # Close connections
-    mycursor.close()
-    mydb.close()
-    
     return True, config
 
 def main():
+    # pipeline and migrate import load_config from this module, so they are imported late
+    import pipeline
+    parser = argparse.ArgumentParser(
+        description='Set up the database, then optionally scrape and import events in one process'
+    )
+    parser.add_argument('--check', action='store_true',
+                        help='Report pending migrations and schema drift, then exit')
+    parser.add_argument('--scrape', action='store_true',
+                        help='Scrape Maine Public and import the events (can take 30-60 minutes)')
+    pipeline.add_arguments(parser)
+    args = parser.parse_args()
+    if args.check:
+        import migrate
+        sys.exit(1 if migrate.check(load_config()) else 0)
+
+    started = time.perf_counter()
     success, config = setup_database()
     if not success:
         print("Database setup failed. Exiting.")
         sys.exit(1)
-    print("="*60)
-    print("Scraper and Importer Options")
-    print("="*60)
-    print("1. Run scraper and import data (full process: can take several minutes)")
-    print("2. Skip scraper, import existing JSON data only (recomended)")
-    print("3. Exit (database only setup)")
-    
-    choice = input("Enter your choice [1/2/3]: ").strip()
-    
-    if choice == '1':
-        if not run_maine_public_scraper():
-            print("Scraper failed. Trying to import existing data if available...")
-        
-        if not run_json_to_sql_importer(config):
-            print("Import failed, but database is ready")
-    
-    elif choice == '2':
-        if not run_json_to_sql_importer(config):
+    timings = Counter(migrate=time.perf_counter() - started)
+    timings['total'] = timings['migrate']
+
+    if args.scrape or args.file:
+        try:
+            pipeline.run_from_args(config, args, timings)
+        except (mysql.connector.Error, RuntimeError, ValueError) as e:
+            print(f"Error: {e}")
             print("Import failed, but database is ready")
-    
-    elif choice == '3':
-        print("Database setup complete. Exiting.")
-    
+            sys.exit(1)
     else:
-        print("Invalid choice. Exiting.")
-        sys.exit(1)
+        print("Database setup complete (pass --scrape or --file FILE to load events).")
     
     print("\nYou can now run your Meetup Mapper application!")
 
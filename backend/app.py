@@ -3,9 +3,15 @@ from flask_mysqldb import MySQL
 from flask_bcrypt import Bcrypt
 from flask_cors import CORS
 from backend_analytics import BackendAnalytics
+from query_cache import TTLCache
+from autocomplete import PrefixIndex
+from db_router import DatabaseRouter, load_config, load_replica_config
+from single_flight import SingleFlight, SingleFlightTimeout
+from rsvp import create_rsvp, update_rsvp, cancel_rsvp
 import MySQLdb.cursors
 import os
-import mysql.connector
+import threading
+import time
 
 app = Flask(__name__)
 #Session
@@ -13,54 +19,13 @@ app.config["SESSION_COOKIE_SAMESITE"] = "None"
 app.config["SESSION_COOKIE_SECURE"] = True  # True if running over HTTPS
 
 # Config
-def load_config(config_file='config.ini'):
-    config = configparser.ConfigParser()
-    base_dir = Path(__file__).parent
-    possible_paths = [
-        Path(config_file),
-        base_dir / config_file,
-        base_dir.parent / config_file,
-        base_dir.parent / 'Database_Startup' / config_file,
-        Path.cwd() / config_file,
-    ]
-
-    found = None
-    for path in possible_paths:
-        if Path(path).exists():
-            config.read(path)
-            if 'database' in config:
-                found = path
-                break
-
-    if not found:
-        raise FileNotFoundError(
-            "Could not find a valid config.ini with a [database] section. "
-            f"Searched: {', '.join(str(p) for p in possible_paths)}"
-        )
-
-    host = config.get('database', 'host', fallback='localhost')
-    user = config.get('database', 'user', fallback='root')
-    password = config.get('database', 'password', fallback=None)
-    database_name = config.get('database', 'database_name', fallback='mmmdb')
-
-    if not password:
-        raise ValueError(
-            "Missing database configuration in config.ini. Ensure 'password' is set under the [database] section."
-        )
-
-    return {
-        'host': host,
-        'user': user,
-        'password': password,
-        'database': database_name,
-    }
 config = load_config()
 
 app.secret_key = os.environ.get("SECRET_KEY", "dev-secret")  # update for security
 app.config["MYSQL_HOST"] = config["host"]
 app.config["MYSQL_USER"] = config["user"]
 app.config["MYSQL_PASSWORD"] = config["password"]
-app.config["MYSQL_DB"] = config["databse"]
+app.config["MYSQL_DB"] = config["database"]
 
 mysql = MySQL(app)
 bcrypt = Bcrypt(app)
@@ -69,14 +34,28 @@ bcrypt = Bcrypt(app)
 CORS(app, supports_credentials=True, origins=["http://localhost:3001","http://127.0.0.1:3001"])
 
 
-# Database connection
+# Database connections
+# Writes use the primary; GET endpoints read from the replica configured in
+# the [replica] section of config.ini while its replication lag is acceptable.
+db_router = DatabaseRouter(config, load_replica_config())
+
 def get_db_connection():
-    return mysql.connector.connect(
-        host= config["host"],
-        user=config["user"],
-        password= config["password"],  # MySQL password
-        database= config["databse"]
-    )
+    return db_router.primary_connection()
+
+def read_db_connection():
+    """Connection for reads, pinned to the primary right after this session wrote"""
+    return db_router.read_connection(pin_primary=read_pinned())
+
+def read_pinned():
+    """True while this session's reads are pinned to the primary"""
+    return session.get("primary_until", 0) > time.time()
+
+def pin_to_primary():
+    """Keep this session's reads on the primary until the replica has its writes"""
+    session["primary_until"] = time.time() + db_router.pin_seconds
+
+# Identical concurrent reads share one in-flight query (see single_flight.py)
+single_flight = SingleFlight(timeout=15)
 
 # ============================================
 # LOCATION ENDPOINTS - Logan
@@ -85,7 +64,7 @@ def get_db_connection():
 # GET all locations (with optional zip filter)
 @app.route("/api/locations", methods=["GET"])
 def get_locations():
-    conn = get_db_connection()
+    conn = read_db_connection()
     cursor = conn.cursor(dictionary=True)
     
     zip_code = request.args.get("zip")
@@ -104,7 +83,7 @@ def get_locations():
 # GET single location by ID
 @app.route("/api/locations/<int:location_id>", methods=["GET"])
 def get_location(location_id):
-    conn = get_db_connection()
+    conn = read_db_connection()
     cursor = conn.cursor(dictionary=True)
     
     cursor.execute("SELECT * FROM Location WHERE location_id = %s", (location_id,))
@@ -121,7 +100,7 @@ def get_location(location_id):
 # GET locations by city
 @app.route("/api/locations/city/<city>", methods=["GET"])
 def get_locations_by_city(city):
-    conn = get_db_connection()
+    conn = read_db_connection()
     cursor = conn.cursor(dictionary=True)
     
     cursor.execute("SELECT * FROM Location WHERE city = %s", (city,))
@@ -150,10 +129,116 @@ def create_location():
     
     cursor.close()
     conn.close()
+    pin_to_primary()
+    
+    autocomplete_index.add_location(new_id, data["venue_name"], data["city"])
     
     return jsonify({"message": "Location created", "location_id": new_id}), 201
 
 
+# In-memory prefix index for typeahead, refreshed from the database as it goes stale
+autocomplete_index = PrefixIndex()
+
+
+def autocomplete_connection():
+    # Also used off the request thread, where there is no session to pin reads
+    conn = db_router.read_connection(pin_primary=False)
+    return conn, conn.cursor(dictionary=True)
+
+
+def refresh_autocomplete():
+    try:
+        autocomplete_index.refresh_if_stale(autocomplete_connection)
+    except Exception as e:
+        print(f"Autocomplete refresh failed: {e}")
+
+
+@app.route("/api/autocomplete", methods=['GET'])
+def autocomplete():
+    """Suggest event names, venue names and cities starting with ?q="""
+    try:
+        query = request.args.get('q', '')
+        limit = request.args.get('limit', 8, type=int)
+
+        if not autocomplete_index.is_built():
+            # Only the first searches wait; later refreshes run behind them
+            autocomplete_index.refresh_if_stale(autocomplete_connection)
+        elif autocomplete_index.is_stale() and not autocomplete_index.is_refreshing():
+            threading.Thread(target=refresh_autocomplete, name='autocomplete-refresh', daemon=True).start()
+
+        started = time.perf_counter()
+        results = autocomplete_index.search(query, limit)
+        took_ms = (time.perf_counter() - started) * 1000
+
+        return jsonify({
+            'query': query,
+            'results': results,
+            'took_ms': round(took_ms, 3)
+        })
+
+    except Exception as e:
+        print(f"Database error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+# Archived events are only read when a request passes ?include_past=true
+ARCHIVED_EVENTS = """(
+    SELECT event_id, event_name, description, event_date, start_time, end_time,
+           max_capacity, organizer_id, location_id
+    FROM event
+    UNION ALL
+    SELECT event_id, event_name, description, event_date, start_time, end_time,
+           max_capacity, organizer_id, location_id
+    FROM Event_archive
+)"""
+ARCHIVED_RSVPS = """(
+    SELECT RSVP_id, RSVP_status, user_id, event_id FROM rsvp
+    UNION ALL
+    SELECT RSVP_id, RSVP_status, user_id, event_id FROM RSVP_archive
+)"""
+ARCHIVED_REVIEWS = """(
+    SELECT review_id, rating, comments, user_id, event_id FROM review
+    UNION ALL
+    SELECT review_id, rating, comments, user_id, event_id FROM review_archive
+)"""
+
+
+def event_sources(include_past):
+    """Return the event, rsvp and review table expressions to query"""
+    if include_past:
+        return ARCHIVED_EVENTS, ARCHIVED_RSVPS, ARCHIVED_REVIEWS
+    return "event", "rsvp", "review"
+
+
+def event_filters(search, city, start_date, end_date, city_column="l.city"):
+    """Build the WHERE conditions shared by the event listing queries.
+
+    There is no default date filter: past events leave the listings when
+    archive_events.py moves them out of Event, not before.
+    """
+    conditions = ""
+    params = []
+
+    if search:
+        conditions += " AND (e.event_name LIKE %s OR e.description LIKE %s)"
+        search_param = f"%{search}%"
+        params.extend([search_param, search_param])
+
+    if city and city != 'all':
+        conditions += f" AND {city_column} = %s"
+        params.append(city)
+
+    if start_date:
+        conditions += " AND e.event_date >= %s"
+        params.append(start_date)
+
+    if end_date:
+        conditions += " AND e.event_date <= %s"
+        params.append(end_date)
+
+    return conditions, params
+
+
 @app.route("/api/events", methods=['GET'])
 def get_events():
     """Get all events with optional filtering"""
@@ -166,260 +251,503 @@ def get_events():
         sort_by = request.args.get('sort_by', 'date')  # date, name, rating, popular
         limit = request.args.get('limit', 100, type=int)
         offset = request.args.get('offset', 0, type=int)
+        include_past = request.args.get('include_past', 'false').lower() == 'true'
         
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        
-        # Build query
-        query = """
-            SELECT 
-                e.event_id,
-                e.event_name,
-                e.description,
-                e.event_date,
-                e.start_time,
-                e.end_time,
-                e.max_capacity,
-                l.venue_name,
-                l.address,
-                l.city,
-                l.zip_code,
-                u.first_name as organizer_first_name,
-                u.last_name as organizer_last_name,
-                u.email as organizer_email,
-                COUNT(DISTINCT r.RSVP_id) as rsvp_count,
-                AVG(rev.rating) as avg_rating,
-                COUNT(DISTINCT rev.review_id) as review_count
-            FROM event e
-            LEFT JOIN location l ON e.location_id = l.location_id
-            LEFT JOIN user u ON e.organizer_id = u.user_id
-            LEFT JOIN rsvp r ON e.event_id = r.event_id AND r.RSVP_status = 'Going'
-            LEFT JOIN review rev ON e.event_id = rev.event_id
-            WHERE 1=1
-        """
-        
-        params = []
-        
-        # Add search filter
-        if search:
-            query += " AND (e.event_name LIKE %s OR e.description LIKE %s)"
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param])
-        
-        # Add city filter - NEW!
-        if city and city != 'all':
-            query += " AND l.city = %s"
-            params.append(city)
-        
-        # Add date range filters - NEW!
-        if start_date:
-            query += " AND e.event_date >= %s"
-            params.append(start_date)
-        
-        if end_date:
-            query += " AND e.event_date <= %s"
-            params.append(end_date)
-        
-        query += " GROUP BY e.event_id"
-        
-        # Add sorting - NEW!
-        if sort_by == 'name':
-            query += " ORDER BY e.event_name ASC"
-        elif sort_by == 'rating':
-            query += " ORDER BY avg_rating DESC"
-        elif sort_by == 'popular':
-            query += " ORDER BY rsvp_count DESC"
-        else:  # default to date
-            query += " ORDER BY e.event_date ASC"
-        
-        # Add pagination - NEW!
-        query += " LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        
-        cursor.execute(query, params)
-        events = cursor.fetchall()
-        
-        # Get total count for pagination
-        count_query = """
-            SELECT COUNT(DISTINCT e.event_id) as total
-            FROM event e
-            LEFT JOIN location l ON e.location_id = l.location_id
-            WHERE 1=1
-        """
-        count_params = []
-        
-        if search:
-            count_query += " AND (e.event_name LIKE %s OR e.description LIKE %s)"
-            count_params.extend([search_param, search_param])
-        
-        if city and city != 'all':
-            count_query += " AND l.city = %s"
-            count_params.append(city)
-        
-        if start_date:
-            count_query += " AND e.event_date >= %s"
-            count_params.append(start_date)
-        
-        if end_date:
-            count_query += " AND e.event_date <= %s"
-            count_params.append(end_date)
-        
-        cursor.execute(count_query, count_params)
-        total_count = cursor.fetchone()['total']
-        
-        # Format the results (same as before)
-        formatted_events = []
-        for event in events:
-            formatted_event = {
-                'id': event['event_id'],
-                'name': event['event_name'],
-                'description': event['description'],
-                'date': event['event_date'].isoformat() if event['event_date'] else None,
-                'time': str(event['start_time']) if event['start_time'] else None,
-                'end_time': str(event['end_time']) if event['end_time'] else None,
-                'max_capacity': event['max_capacity'],
-                'location': event['venue_name'],
-                'address': event['address'],
-                'city': event['city'],
-                'zip_code': event['zip_code'],
-                'state': 'ME',
-                'organizer': f"{event['organizer_first_name']} {event['organizer_last_name']}" if event['organizer_first_name'] else 'Unknown',
-                'organizer_email': event['organizer_email'],
-                'rsvp_count': event['rsvp_count'] or 0,
-                'avg_rating': round(float(event['avg_rating']), 1) if event['avg_rating'] else 0,
-                'review_count': event['review_count'] or 0,
-                'price': 0
-            }
-            formatted_events.append(formatted_event)
-        
-        cursor.close()
-        
-        return jsonify({
-            'events': formatted_events,
-            'total': total_count,
-            'limit': limit,
-            'offset': offset
-        })
+        key = ('events', search.strip().lower(), city, start_date, end_date,
+               sort_by, limit, offset, include_past, read_pinned())
+        return jsonify(single_flight.do(key, lambda: query_events(
+            search, city, start_date, end_date, sort_by, limit, offset, include_past)))
+    
+    except SingleFlightTimeout as e:
+        return jsonify({"error": str(e)}), 504
     
     except Exception as e:
         print(f"Database error: {e}")
         return jsonify({"error": str(e)}), 500
 
+
+def query_events(search, city, start_date, end_date, sort_by, limit, offset, include_past):
+    """Run the listing and count queries behind /api/events"""
+    conn = read_db_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    # Unarchived events come from the materialized table; archived ones need the live join
+    if include_past:
+        events, total_count = query_live_events(
+            cursor, search, city, start_date, end_date, sort_by, limit, offset, include_past)
+    else:
+        events, total_count = query_listing_events(
+            cursor, search, city, start_date, end_date, sort_by, limit, offset)
+
+    formatted_events = [format_listing_event(event) for event in events]
+
+    cursor.close()
+    conn.close()
+
+    return {
+        'events': formatted_events,
+        'total': total_count,
+        'limit': limit,
+        'offset': offset
+    }
+
+
+def format_listing_event(event):
+    """Shape a listing row (live join or upcoming_event_listing) for the API"""
+    return {
+        'id': event['event_id'],
+        'name': event['event_name'],
+        'description': event['description'],
+        'date': event['event_date'].isoformat() if event['event_date'] else None,
+        'time': str(event['start_time']) if event['start_time'] else None,
+        'end_time': str(event['end_time']) if event['end_time'] else None,
+        'max_capacity': event['max_capacity'],
+        'location': event['venue_name'],
+        'address': event['address'],
+        'city': event['city'],
+        'zip_code': event['zip_code'],
+        'state': 'ME',
+        'organizer': f"{event['organizer_first_name']} {event['organizer_last_name']}" if event['organizer_first_name'] else 'Unknown',
+        'organizer_email': event['organizer_email'],
+        'rsvp_count': event['rsvp_count'] or 0,
+        'avg_rating': round(float(event['avg_rating']), 1) if event['avg_rating'] else 0,
+        'review_count': event['review_count'] or 0,
+        'price': 0
+    }
+
+
+# upcoming_event_listing columns read by format_listing_event
+LISTING_COLUMNS = """
+    e.event_id, e.event_name, e.description, e.event_date, e.start_time, e.end_time,
+    e.max_capacity, e.venue_name, e.address, e.city, e.zip_code,
+    e.organizer_first_name, e.organizer_last_name, e.organizer_email,
+    e.rsvp_count, e.avg_rating, e.review_count
+"""
+
+# Sort orders for upcoming_event_listing; each matches one of its indexes
+LISTING_ORDER = {
+    'name': "e.event_name ASC, e.event_id ASC",
+    'rating': "e.avg_rating DESC, e.event_id ASC",
+    'popular': "e.rsvp_count DESC, e.event_id ASC",
+    'date': "e.event_date ASC, e.start_time ASC, e.event_id ASC",
+}
+
+
+def query_listing_events(cursor, search, city, start_date, end_date, sort_by, limit, offset):
+    """Read a page of unarchived events from the materialized upcoming_event_listing"""
+    filters, params = event_filters(search, city, start_date, end_date, city_column="e.city")
+    order = LISTING_ORDER.get(sort_by, LISTING_ORDER['date'])
+
+    cursor.execute(f"""
+        SELECT {LISTING_COLUMNS}
+        FROM upcoming_event_listing e
+        WHERE 1=1 {filters}
+        ORDER BY {order}
+        LIMIT %s OFFSET %s
+    """, params + [limit, offset])
+    events = cursor.fetchall()
+
+    cursor.execute(f"SELECT COUNT(*) AS total FROM upcoming_event_listing e WHERE 1=1 {filters}", params)
+    total_count = cursor.fetchone()['total']
+
+    return events, total_count
+
+
+def query_live_events(cursor, search, city, start_date, end_date, sort_by, limit, offset, include_past):
+    """Aggregate a page of events straight from the event, rsvp and review tables"""
+    events_table, rsvp_table, review_table = event_sources(include_past)
+    filters, filter_params = event_filters(search, city, start_date, end_date)
+
+    # Build query
+    query = f"""
+        SELECT 
+            e.event_id,
+            e.event_name,
+            e.description,
+            e.event_date,
+            e.start_time,
+            e.end_time,
+            e.max_capacity,
+            l.venue_name,
+            l.address,
+            l.city,
+            l.zip_code,
+            u.first_name as organizer_first_name,
+            u.last_name as organizer_last_name,
+            u.email as organizer_email,
+            COUNT(DISTINCT r.RSVP_id) as rsvp_count,
+            AVG(rev.rating) as avg_rating,
+            COUNT(DISTINCT rev.review_id) as review_count
+        FROM {events_table} e
+        LEFT JOIN location l ON e.location_id = l.location_id
+        LEFT JOIN user u ON e.organizer_id = u.user_id
+        LEFT JOIN {rsvp_table} r ON e.event_id = r.event_id AND r.RSVP_status = 'Going'
+        LEFT JOIN {review_table} rev ON e.event_id = rev.event_id
+        WHERE 1=1
+    """
+
+    # Add search, city and date range filters
+    query += filters
+    params = list(filter_params)
+
+    query += " GROUP BY e.event_id"
+
+    # Add sorting - NEW!
+    if sort_by == 'name':
+        query += " ORDER BY e.event_name ASC"
+    elif sort_by == 'rating':
+        query += " ORDER BY avg_rating DESC"
+    elif sort_by == 'popular':
+        query += " ORDER BY rsvp_count DESC"
+    else:  # default to date
+        query += " ORDER BY e.event_date ASC"
+
+    # Add pagination - NEW!
+    query += " LIMIT %s OFFSET %s"
+    params.extend([limit, offset])
+
+    cursor.execute(query, params)
+    events = cursor.fetchall()
+
+    # Get total count for pagination
+    count_query = f"""
+        SELECT COUNT(DISTINCT e.event_id) as total
+        FROM {events_table} e
+        LEFT JOIN location l ON e.location_id = l.location_id
+        WHERE 1=1
+    """ + filters
+
+    cursor.execute(count_query, filter_params)
+    total_count = cursor.fetchone()['total']
+
+    return events, total_count
+
+
+# Facet counts keyed by the normalized filter signature
+facet_cache = TTLCache(ttl=60)
+
+
+@app.route("/api/events/facets", methods=['GET'])
+def get_event_facets():
+    """Get event counts per city and week for the current filters"""
+    try:
+        search = request.args.get('search', '').strip()
+        city = request.args.get('city', '')
+        start_date = request.args.get('start_date', '')
+        end_date = request.args.get('end_date', '')
+        include_past = request.args.get('include_past', 'false').lower() == 'true'
+
+        if city == 'all':
+            city = ''
+        signature = (search.lower(), city, start_date, end_date, include_past)
+        cached = facet_cache.get(signature)
+        if cached is not None:
+            return jsonify(dict(cached, cached=True))
+
+        facets = single_flight.do(
+            ('facets',) + signature + (read_pinned(),),
+            lambda: query_facets(search, city, start_date, end_date, include_past))
+        facet_cache.set(signature, facets)
+
+        return jsonify(dict(facets, cached=False))
+
+    except SingleFlightTimeout as e:
+        return jsonify({"error": str(e)}), 504
+
+    except Exception as e:
+        print(f"Database error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+def query_facets(search, city, start_date, end_date, include_past):
+    """Compute the city and week counts behind /api/events/facets"""
+    conn = read_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    events_table, _, _ = event_sources(include_past)
+
+    # One grouped pass over (city, week). The city filter is left out so the
+    # city dropdown keeps showing the other cities; weeks are narrowed in Python.
+    filters, params = event_filters(search, '', start_date, end_date)
+    cursor.execute(f"""
+        SELECT
+            l.city AS city,
+            DATE_SUB(e.event_date, INTERVAL WEEKDAY(e.event_date) DAY) AS week_start,
+            COUNT(*) AS count
+        FROM {events_table} e
+        LEFT JOIN location l ON e.location_id = l.location_id
+        WHERE 1=1 {filters}
+        GROUP BY city, week_start
+    """, params)
+    cells = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    city_counts = {}
+    week_counts = {}
+    for cell in cells:
+        if cell['city']:
+            city_counts[cell['city']] = city_counts.get(cell['city'], 0) + cell['count']
+        if not city or cell['city'] == city:
+            week = cell['week_start'].isoformat()
+            week_counts[week] = week_counts.get(week, 0) + cell['count']
+
+    facets = {
+        'total': sum(week_counts.values()),
+        'cities': [
+            {'city': name, 'count': count}
+            for name, count in sorted(city_counts.items(), key=lambda item: (-item[1], item[0]))
+        ],
+        'weeks': [
+            {'week_start': week, 'count': count}
+            for week, count in sorted(week_counts.items())
+        ],
+    }
+    return facets
+
 @app.route("/api/events/<int:event_id>", methods=['GET'])
 def get_event_detail(event_id):
     """Get detailed information about a specific event"""
     try:
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        
-        # Get event details with correct column names
-        query = """
-            SELECT 
-                e.*,
-                l.venue_name,
-                l.address,
-                l.city,
-                l.zip_code,
-                u.first_name as organizer_first_name,
-                u.last_name as organizer_last_name,
-                u.email as organizer_email,
-                u.username as organizer_username
-            FROM event e
-            LEFT JOIN location l ON e.location_id = l.location_id
-            LEFT JOIN user u ON e.organizer_id = u.user_id
-            WHERE e.event_id = %s
-        """
-        
-        cursor.execute(query, (event_id,))
-        event = cursor.fetchone()
+        include_past = request.args.get('include_past', 'false').lower() == 'true'
+        key = ('event_detail', event_id, include_past, read_pinned())
+        event = single_flight.do(key, lambda: query_event_detail(event_id, include_past))
         
-        if not event:
+        if event is None:
             return jsonify({"error": "Event not found"}), 404
         
-        # Get reviews for this event
-        review_query = """
-            SELECT 
-                r.review_id,
-                r.rating,
-                r.comments,
-                u.first_name,
-                u.last_name,
-                u.username
-            FROM review r
-            LEFT JOIN user u ON r.user_id = u.user_id
-            WHERE r.event_id = %s
-            ORDER BY r.review_id DESC
-        """
-        cursor.execute(review_query, (event_id,))
-        reviews = cursor.fetchall()
-        
-        # Get RSVP count (only "Going" status)
-        rsvp_query = "SELECT COUNT(*) as count FROM rsvp WHERE event_id = %s AND RSVP_status = 'Going'"
-        cursor.execute(rsvp_query, (event_id,))
-        rsvp_result = cursor.fetchone()
-        
-        # Format the response
-        formatted_event = {
-            'id': event['event_id'],
-            'name': event['event_name'],
-            'description': event['description'],
-            'date': event['event_date'].isoformat() if event['event_date'] else None,
-            'time': str(event['start_time']) if event['start_time'] else None,
-            'end_time': str(event['end_time']) if event['end_time'] else None,
-            'max_capacity': event['max_capacity'],
-            'price': 0,  # No price field in database
-            'location': {
-                'name': event['venue_name'],
-                'address': event['address'],
-                'city': event['city'],
-                'state': 'ME',  # Assuming Maine
-                'zip_code': event['zip_code']
-            },
-            'category': None,  # No category link in your event table
-            'organizer': {
-                'name': f"{event['organizer_first_name']} {event['organizer_last_name']}" if event['organizer_first_name'] else 'Unknown',
-                'username': event['organizer_username'],
-                'email': event['organizer_email'],
-                'phone': None  # No phone field in user table
-            },
-            'rsvp_count': rsvp_result['count'] if rsvp_result else 0,
-            'reviews': [
-                {
-                    'id': r['review_id'],
-                    'rating': r['rating'],
-                    'comment': r['comments'],
-                    'user_name': f"{r['first_name']} {r['last_name']}" if r['first_name'] else r['username']
-                }
-                for r in reviews
-            ],
-            'avg_rating': sum(r['rating'] for r in reviews) / len(reviews) if reviews else 0
-        }
-        
-        cursor.close()
-        
-        return jsonify(formatted_event)
+        return jsonify(event)
+    
+    except SingleFlightTimeout as e:
+        return jsonify({"error": str(e)}), 504
     
     except Exception as e:
         print(f"Database error: {e}")
         return jsonify({"error": str(e)}), 500
 
+
+def query_event_detail(event_id, include_past):
+    """Load one event with its reviews and RSVP count; None if it does not exist"""
+    events_table, rsvp_table, review_table = event_sources(include_past)
+    conn = read_db_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    # Get event details with correct column names
+    query = f"""
+        SELECT 
+            e.*,
+            l.venue_name,
+            l.address,
+            l.city,
+            l.zip_code,
+            u.first_name as organizer_first_name,
+            u.last_name as organizer_last_name,
+            u.email as organizer_email,
+            u.username as organizer_username
+        FROM {events_table} e
+        LEFT JOIN location l ON e.location_id = l.location_id
+        LEFT JOIN user u ON e.organizer_id = u.user_id
+        WHERE e.event_id = %s
+    """
+
+    cursor.execute(query, (event_id,))
+    event = cursor.fetchone()
+
+    if not event:
+        cursor.close()
+        conn.close()
+        return None
+
+    # Get reviews for this event
+    review_query = f"""
+        SELECT 
+            r.review_id,
+            r.rating,
+            r.comments,
+            u.first_name,
+            u.last_name,
+            u.username
+        FROM {review_table} r
+        LEFT JOIN user u ON r.user_id = u.user_id
+        WHERE r.event_id = %s
+        ORDER BY r.review_id DESC
+    """
+    cursor.execute(review_query, (event_id,))
+    reviews = cursor.fetchall()
+
+    # Get RSVP count (only "Going" status)
+    rsvp_query = f"SELECT COUNT(*) as count FROM {rsvp_table} r WHERE r.event_id = %s AND r.RSVP_status = 'Going'"
+    cursor.execute(rsvp_query, (event_id,))
+    rsvp_result = cursor.fetchone()
+
+    # Format the response
+    formatted_event = {
+        'id': event['event_id'],
+        'name': event['event_name'],
+        'description': event['description'],
+        'date': event['event_date'].isoformat() if event['event_date'] else None,
+        'time': str(event['start_time']) if event['start_time'] else None,
+        'end_time': str(event['end_time']) if event['end_time'] else None,
+        'max_capacity': event['max_capacity'],
+        'price': 0,  # No price field in database
+        'location': {
+            'name': event['venue_name'],
+            'address': event['address'],
+            'city': event['city'],
+            'state': 'ME',  # Assuming Maine
+            'zip_code': event['zip_code']
+        },
+        'category': None,  # No category link in your event table
+        'organizer': {
+            'name': f"{event['organizer_first_name']} {event['organizer_last_name']}" if event['organizer_first_name'] else 'Unknown',
+            'username': event['organizer_username'],
+            'email': event['organizer_email'],
+            'phone': None  # No phone field in user table
+        },
+        'rsvp_count': rsvp_result['count'] if rsvp_result else 0,
+        'reviews': [
+            {
+                'id': r['review_id'],
+                'rating': r['rating'],
+                'comment': r['comments'],
+                'user_name': f"{r['first_name']} {r['last_name']}" if r['first_name'] else r['username']
+            }
+            for r in reviews
+        ],
+        'avg_rating': sum(r['rating'] for r in reviews) / len(reviews) if reviews else 0
+    }
+
+    cursor.close()
+    conn.close()
+
+    return formatted_event
+
+@app.route("/api/events/<int:event_id>/similar", methods=['GET'])
+def get_similar_events(event_id):
+    """Upcoming events most similar to this one, precomputed by build_similarity.py"""
+    try:
+        limit = max(1, min(request.args.get('limit', 6, type=int), 20))
+        key = ('similar', event_id, limit, read_pinned())
+        return jsonify(single_flight.do(key, lambda: query_similar_events(event_id, limit)))
+
+    except SingleFlightTimeout as e:
+        return jsonify({"error": str(e)}), 504
+
+    except Exception as e:
+        print(f"Database error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+def query_similar_events(event_id, limit):
+    conn = read_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(f"""
+        SELECT {LISTING_COLUMNS}, s.score
+        FROM event_similarity s
+        JOIN upcoming_event_listing e ON e.event_id = s.similar_event_id
+        WHERE s.event_id = %s
+        ORDER BY s.rank_no
+        LIMIT %s
+    """, (event_id, limit))
+    events = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    return {
+        'event_id': event_id,
+        'events': [dict(format_listing_event(event), similarity=round(event['score'], 3)) for event in events]
+    }
+
+
+@app.route("/api/recommendations", methods=['GET'])
+def get_recommendations():
+    """Upcoming events similar to the signed-in user's favorites"""
+    user_id = session.get("user_id")
+    if not user_id:
+        return jsonify({"events": []}), 200
+
+    try:
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+        conn = read_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        # Each favorite votes for its precomputed neighbours, weighted by similarity
+        cursor.execute(f"""
+            SELECT {LISTING_COLUMNS}, SUM(s.score) AS score
+            FROM UserFavoriteEvent f
+            JOIN event_similarity s ON s.event_id = f.event_id
+            JOIN upcoming_event_listing e ON e.event_id = s.similar_event_id
+            WHERE f.user_id = %s
+              AND s.similar_event_id NOT IN (
+                  SELECT event_id FROM UserFavoriteEvent WHERE user_id = %s
+              )
+            GROUP BY e.event_id
+            ORDER BY score DESC, e.event_date ASC, e.event_id ASC
+            LIMIT %s
+        """, (user_id, user_id, limit))
+        events = cursor.fetchall()
+        cursor.close()
+        conn.close()
+
+        return jsonify({
+            'events': [dict(format_listing_event(event), score=round(event['score'], 3)) for event in events]
+        })
+
+    except Exception as e:
+        print(f"Database error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/categories", methods=['GET'])
 def get_categories():
     """Get all event categories"""
     try:
-        cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute("SELECT * FROM category")
-        categories = cursor.fetchall()
-        
-        cursor.close()
-        
-        return jsonify(categories)
+        key = ('categories', read_pinned())
+        return jsonify(single_flight.do(key, query_categories))
+    
+    except SingleFlightTimeout as e:
+        return jsonify({"error": str(e)}), 504
     
     except Exception as e:
         print(f"Database error: {e}")
         return jsonify({"error": str(e)}), 500
 
+def query_categories():
+    conn = read_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM category")
+    categories = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return categories
+
 @app.route('/api/analytics', methods=['GET'])
 def get_analytics():
-    return jsonify(BackendAnalytics.get_analytics())
+    try:
+        return jsonify(single_flight.do(('analytics', read_pinned()), query_analytics))
+    except SingleFlightTimeout as e:
+        return jsonify({"error": str(e)}), 504
+
+def query_analytics():
+    conn = read_db_connection()
+    try:
+        return BackendAnalytics.get_analytics(conn)
+    finally:
+        conn.close()
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Expose request coalescing, cache and replica routing counters"""
+    return jsonify({
+        'single_flight': single_flight.stats(),
+        'facet_cache': facet_cache.stats(),
+        'db': db_router.status(),
+    })
+
+
+@app.route('/api/health/db', methods=['GET'])
+def get_db_health():
+    """Report replica routing state (lag, health and read counts)"""
+    db_router.replica_healthy()
+    return jsonify(db_router.status())
 
 @app.post("/api/register")
 def register():
@@ -445,6 +773,7 @@ def register():
     mysql.connection.commit()
     user_id = cursor.lastrowid
     cursor.close()
+    pin_to_primary()
 
     session["user_id"] = user_id
     session["username"] = username
@@ -553,6 +882,7 @@ def update_me():
 
     cursor.execute(query, tuple(params))
     mysql.connection.commit()
+    pin_to_primary()
 
     cursor.execute(
       "SELECT user_id, username, email, first_name, last_name FROM User WHERE user_id = %s",
@@ -568,19 +898,18 @@ def me():
     if not user_id:
         return jsonify({"user": None}), 200
 
-    cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    conn = read_db_connection()
+    cursor = conn.cursor(dictionary=True)
     cursor.execute("SELECT user_id, username, first_name, last_name, email FROM User WHERE user_id = %s", (user_id,))
     user = cursor.fetchone()
     cursor.close()
+    conn.close()
 
     if not user:
         return jsonify({"user": None}), 200
 
     return jsonify({"user": user}), 200
 
-if __name__ == "__main__":
-    app.run(debug=True)
-
 @app.route("/api/me", methods=["DELETE"])
 def delete_me():
     user_id = session.get("user_id")
@@ -607,7 +936,8 @@ def get_favorites():
     if not user_id:
         return jsonify({"events": []}), 200
 
-    cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    conn = read_db_connection()
+    cursor = conn.cursor(dictionary=True)
     cursor.execute(
         """
         SELECT
@@ -625,6 +955,7 @@ def get_favorites():
     )
     events = cursor.fetchall()
     cursor.close()
+    conn.close()
     return jsonify({"events": events}), 200
 
 
@@ -641,6 +972,7 @@ def add_favorite(event_id):
     )
     mysql.connection.commit()
     cursor.close()
+    pin_to_primary()
     return jsonify({"message": "Favorited"}), 200
 
 
@@ -657,4 +989,58 @@ def remove_favorite(event_id):
     )
     mysql.connection.commit()
     cursor.close()
+    pin_to_primary()
     return jsonify({"message": "Unfavorited"}), 200
+
+
+# RSVPs
+# Seats are claimed from event_capacity with one conditional UPDATE, so
+# concurrent requests can't overbook. Full events put 'Going' RSVPs on a
+# waitlist. Send an Idempotency-Key header to make retries safe.
+def rsvp_response(action):
+    """Run an RSVP write on the primary and return its (status code, body) as a response"""
+    conn = get_db_connection()
+    try:
+        status_code, body = action(conn, request.headers.get("Idempotency-Key"))
+    except Exception as e:
+        print(f"Database error: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+
+    pin_to_primary()
+    return jsonify(body), status_code
+
+
+@app.route("/api/events/<int:event_id>/rsvp", methods=["POST"])
+def create_event_rsvp(event_id):
+    user_id = session.get("user_id")
+    if not user_id:
+        return jsonify({"error": "Not authenticated"}), 401
+
+    status = (request.get_json(silent=True) or {}).get("status", "Going")
+    return rsvp_response(lambda conn, key: create_rsvp(conn, user_id, event_id, status, key))
+
+
+@app.route("/api/events/<int:event_id>/rsvp", methods=["PUT"])
+def update_event_rsvp(event_id):
+    user_id = session.get("user_id")
+    if not user_id:
+        return jsonify({"error": "Not authenticated"}), 401
+
+    status = (request.get_json(silent=True) or {}).get("status")
+    return rsvp_response(lambda conn, key: update_rsvp(conn, user_id, event_id, status, key))
+
+
+@app.route("/api/events/<int:event_id>/rsvp", methods=["DELETE"])
+def cancel_event_rsvp(event_id):
+    user_id = session.get("user_id")
+    if not user_id:
+        return jsonify({"error": "Not authenticated"}), 401
+
+    return rsvp_response(lambda conn, key: cancel_rsvp(conn, user_id, event_id, key))
+
+
+# Last, so every route above is registered before the server starts
+if __name__ == "__main__":
+    app.run(debug=True)
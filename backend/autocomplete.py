@@ -0,0 +1,256 @@
+import bisect
+import heapq
+import threading
+import time
+import unicodedata
+
+# Queries shorter than this would match most of the index
+MIN_PREFIX = 2
+
+# Refresh new rows every REFRESH_INTERVAL seconds, rebuild scores every REBUILD_INTERVAL
+REFRESH_INTERVAL = 30
+REBUILD_INTERVAL = 15 * 60
+
+# Above this many new keys, merge into a fresh list instead of insort one by one
+MERGE_THRESHOLD = 64
+
+# Prefixes matching more keys than this get their top results precomputed
+HOT_THRESHOLD = 1000
+MAX_LIMIT = 20
+
+
+def normalize(text):
+    """Lowercase, strip accents and curly quotes, collapse whitespace"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.replace('’', "'").replace('‘', "'")
+    return ' '.join(text.lower().split())
+
+
+def word_suffixes(text):
+    """Keys for every word start, so 'port city music hall' also matches 'music'"""
+    words = normalize(text).split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    """Sorted-array prefix index over event names, venue names and cities.
+
+    Keys are (normalized suffix, kind, display text) tuples kept sorted so a
+    prefix lookup is one bisect plus a scan of the matching range. Each
+    (kind, display text) item carries a score for ranking: the number of
+    upcoming events (plus their RSVPs) that use that name, venue or city.
+    Prefixes whose range is too long to scan per keystroke ("the", "ma")
+    have their top results precomputed whenever the index changes.
+    """
+
+    def __init__(self):
+        # (sorted keys, {hot prefix: top items}, {item: score}), swapped as one
+        # reference so a search never pairs keys with another state's scores
+        self._state = ([], {}, {})
+        self._lock = threading.Lock()
+        self.last_event_id = 0
+        self.last_location_id = 0
+        self.last_refresh = 0.0
+        self.last_rebuild = 0.0
+
+    def __len__(self):
+        return len(self._state[2])
+
+    def _add_items(self, items, state):
+        """state with (kind, text, score) items added, summing scores for repeated names.
+
+        The scores dict is updated in place: scores only grow, and a new
+        item's score exists before any published key points at it.
+        """
+        keys, hot, scores = state
+        new_keys = []
+        touched = set()
+        for kind, text, score in items:
+            if not text:
+                continue
+            item = (kind, text)
+            if item not in scores:
+                scores[item] = 0
+                new_keys.extend((key, kind, text) for key in word_suffixes(text))
+            scores[item] += score
+            touched.add(item)
+
+        if len(touched) < MERGE_THRESHOLD:
+            keys = list(keys)
+            for key in new_keys:
+                bisect.insort(keys, key)
+            hot = self._merge_hot(hot, touched, scores)
+        else:
+            new_keys.sort()
+            keys = list(heapq.merge(keys, new_keys))
+            hot = self._hot_prefixes(keys, scores)
+        return keys, hot, scores
+
+    def _top(self, keys, lo, hi, limit, scores):
+        items = {(key[1], key[2]) for key in keys[lo:hi]}
+        return heapq.nsmallest(limit, items, key=lambda item: (-scores[item], item[1]))
+
+    def _merge_hot(self, hot, touched, scores):
+        """Fold new or re-scored items into the precomputed top lists.
+
+        Scores only grow between rebuilds, so an untouched item can never
+        overtake the current top list; merging the touched items is exact.
+        """
+        candidates = {}
+        for kind, text in touched:
+            for key in word_suffixes(text):
+                for length in range(MIN_PREFIX, len(key) + 1):
+                    prefix = key[:length]
+                    # Every parent of a hot prefix is hot, so stop at the first miss
+                    if prefix not in hot:
+                        break
+                    candidates.setdefault(prefix, set()).add((kind, text))
+
+        if not candidates:
+            return hot
+        hot = dict(hot)
+        for prefix, items in candidates.items():
+            items.update(hot[prefix])
+            hot[prefix] = heapq.nsmallest(MAX_LIMIT, items, key=lambda item: (-scores[item], item[1]))
+        return hot
+
+    def _hot_prefixes(self, keys, scores):
+        """Precompute top items for every prefix whose key range exceeds HOT_THRESHOLD"""
+        hot = {}
+        stack = [(MIN_PREFIX, 0, len(keys))]
+        while stack:
+            length, lo, hi = stack.pop()
+            i = lo
+            while i < hi:
+                prefix = keys[i][0][:length]
+                if len(prefix) < length:
+                    # The whole key is shorter than this level; it sorts first in its group
+                    i += 1
+                    continue
+                j = bisect.bisect_left(keys, (prefix + '\U0010ffff',), i, hi)
+                if j - i > HOT_THRESHOLD:
+                    hot[prefix] = self._top(keys, i, j, MAX_LIMIT, scores)
+                    stack.append((length + 1, i, j))
+                i = j
+        return hot
+
+    def rebuild(self, cursor):
+        """Rebuild the whole index and its scores from the database"""
+        with self._lock:
+            self._rebuild(cursor)
+
+    def refresh(self, cursor):
+        """Add events and locations inserted since the last refresh"""
+        with self._lock:
+            self._refresh(cursor)
+
+    def _rebuild(self, cursor):
+        items, last_event_id, last_location_id = self._load(cursor, 0, 0)
+        # Built aside; searches keep the old index until this one assignment
+        self._state = self._add_items(items, ([], {}, {}))
+        self.last_event_id = last_event_id
+        self.last_location_id = last_location_id
+        self.last_rebuild = self.last_refresh = time.monotonic()
+
+    def _refresh(self, cursor):
+        items, last_event_id, last_location_id = self._load(cursor, self.last_event_id, self.last_location_id)
+        self._state = self._add_items(items, self._state)
+        self.last_event_id = last_event_id
+        self.last_location_id = last_location_id
+        self.last_refresh = time.monotonic()
+
+    def is_stale(self):
+        return time.monotonic() - self.last_refresh > REFRESH_INTERVAL
+
+    def is_built(self):
+        return self.last_rebuild > 0
+
+    def is_refreshing(self):
+        return self._lock.locked()
+
+    def refresh_if_stale(self, connect):
+        """Rebuild or refresh if due, with a cursor from connect().
+
+        Only one caller does the work. Anyone arriving meanwhile returns at
+        once and searches the current index. Staleness is checked again
+        under the lock, so a caller that waited on a finished refresh does
+        not start another. connect() returns a (connection, cursor) pair
+        and is only called when there is work to do.
+        """
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            rebuild = now - self.last_rebuild > REBUILD_INTERVAL
+            if not rebuild and now - self.last_refresh <= REFRESH_INTERVAL:
+                return
+            connection, cursor = connect()
+            try:
+                if rebuild:
+                    self._rebuild(cursor)
+                else:
+                    self._refresh(cursor)
+            finally:
+                cursor.close()
+                connection.close()
+        finally:
+            self._lock.release()
+
+    def _load(self, cursor, last_event_id, last_location_id):
+        """(items, last event id, last location id) for rows after the given ids"""
+        cursor.execute(
+            """
+            SELECT e.event_id, e.event_name, l.venue_name, l.city,
+                   COUNT(r.RSVP_id) AS rsvp_count
+            FROM event e
+            LEFT JOIN location l ON e.location_id = l.location_id
+            LEFT JOIN rsvp r ON e.event_id = r.event_id AND r.RSVP_status = 'Going'
+            WHERE e.event_id > %s AND e.event_date >= CURDATE()
+            GROUP BY e.event_id
+            """,
+            (last_event_id,)
+        )
+        events = cursor.fetchall()
+
+        cursor.execute(
+            "SELECT location_id, venue_name, city FROM location WHERE location_id > %s",
+            (last_location_id,)
+        )
+        locations = cursor.fetchall()
+
+        items = []
+        for event in events:
+            popularity = 1 + (event['rsvp_count'] or 0)
+            items.append(('event', event['event_name'], popularity))
+            items.append(('venue', event['venue_name'], popularity))
+            items.append(('city', event['city'], popularity))
+            last_event_id = max(last_event_id, event['event_id'])
+        for location in locations:
+            items.append(('venue', location['venue_name'], 0))
+            items.append(('city', location['city'], 0))
+            last_location_id = max(last_location_id, location['location_id'])
+
+        return items, last_event_id, last_location_id
+
+    def add_location(self, location_id, venue_name, city):
+        """Index a location inserted through the API without waiting for a refresh"""
+        with self._lock:
+            self._state = self._add_items([('venue', venue_name, 0), ('city', city, 0)], self._state)
+            self.last_location_id = max(self.last_location_id, location_id)
+
+    def search(self, query, limit=8):
+        """Return the top `limit` items whose name (or a word in it) starts with query"""
+        prefix = normalize(query)
+        if len(prefix) < MIN_PREFIX:
+            return []
+
+        limit = max(1, min(limit, MAX_LIMIT))
+        keys, hot, scores = self._state
+        if prefix in hot:
+            top = hot[prefix][:limit]
+        else:
+            lo = bisect.bisect_left(keys, (prefix,))
+            hi = bisect.bisect_left(keys, (prefix + '\U0010ffff',), lo)
+            top = self._top(keys, lo, hi, limit, scores)
+        return [{'type': kind, 'text': text, 'score': scores[(kind, text)]} for kind, text in top]
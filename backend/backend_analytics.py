@@ -48,15 +48,18 @@ class BackendAnalytics:
         }
 
     @staticmethod
-    def get_analytics():
+    def get_analytics(connection=None):
+        # Callers may pass an open connection (e.g. a read replica); it is left open
+        owns_connection = connection is None
         try:
-            config = BackendAnalytics.load_config()
-            connection = MySQLdb.connect(
-                host=config['host'],
-                user=config['user'],
-                passwd=config['password'],
-                db=config['database']
-            )
+            if owns_connection:
+                config = BackendAnalytics.load_config()
+                connection = MySQLdb.connect(
+                    host=config['host'],
+                    user=config['user'],
+                    passwd=config['password'],
+                    db=config['database']
+                )
             cursor = connection.cursor()
             
             # Get total number of users
@@ -72,7 +75,8 @@ class BackendAnalytics:
             total_locations = cursor.fetchone()[0]
             
             cursor.close()
-            connection.close()
+            if owns_connection:
+                connection.close()
             
             return {
                 'totalUsers': total_users,
@@ -0,0 +1,187 @@
+from pathlib import Path
+import configparser
+import threading
+import time
+
+import mysql.connector
+
+
+def load_config(config_file='config.ini'):
+    """Read the [database] section of config.ini (the primary server)"""
+    config = configparser.ConfigParser()
+    base_dir = Path(__file__).parent
+    possible_paths = [
+        Path(config_file),
+        base_dir / config_file,
+        base_dir.parent / config_file,
+        base_dir.parent / 'Database_Startup' / config_file,
+        Path.cwd() / config_file,
+    ]
+
+    found = None
+    for path in possible_paths:
+        if Path(path).exists():
+            config.read(path)
+            if 'database' in config:
+                found = path
+                break
+
+    if not found:
+        raise FileNotFoundError(
+            "Could not find a valid config.ini with a [database] section. "
+            f"Searched: {', '.join(str(p) for p in possible_paths)}"
+        )
+
+    host = config.get('database', 'host', fallback='localhost')
+    user = config.get('database', 'user', fallback='root')
+    password = config.get('database', 'password', fallback=None)
+    database_name = config.get('database', 'database_name', fallback='mmmdb')
+
+    if not password:
+        raise ValueError(
+            "Missing database configuration in config.ini. Ensure 'password' is set under the [database] section."
+        )
+
+    return {
+        'host': host,
+        'user': user,
+        'password': password,
+        'database': database_name,
+    }
+
+
+def load_replica_config(config_file='config.ini'):
+    """Read the optional [replica] section; returns None when no replica is configured"""
+    config = configparser.ConfigParser()
+    base_dir = Path(__file__).parent
+    possible_paths = [
+        Path(config_file),
+        base_dir / config_file,
+        base_dir.parent / config_file,
+        base_dir.parent / 'Database_Startup' / config_file,
+        Path.cwd() / config_file,
+    ]
+
+    for path in possible_paths:
+        if Path(path).exists():
+            config.read(path)
+            if 'database' in config:
+                break
+
+    if 'replica' not in config or not config.get('replica', 'host', fallback='').strip():
+        return None
+
+    return {
+        'host': config.get('replica', 'host'),
+        'port': config.getint('replica', 'port', fallback=3306),
+        'user': config.get('replica', 'user', fallback=None),
+        'password': config.get('replica', 'password', fallback=None),
+        'max_lag_seconds': config.getfloat('replica', 'max_lag_seconds', fallback=5),
+        'check_interval': config.getfloat('replica', 'check_interval', fallback=5),
+    }
+
+
+class DatabaseRouter:
+    """Hands out primary or replica connections.
+
+    Writes always go to the primary. Reads go to the replica while its
+    replication lag, checked at most every `check_interval` seconds, stays
+    under `max_lag_seconds`; otherwise (or if the replica is unreachable)
+    they fall back to the primary.
+    """
+
+    def __init__(self, primary, replica=None):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = replica['max_lag_seconds'] if replica else 0
+        self.check_interval = replica['check_interval'] if replica else 0
+        # Sessions that just wrote read from the primary for this long
+        self.pin_seconds = max(self.max_lag * 2, 5)
+
+        self._lock = threading.Lock()
+        self._healthy = False
+        self._lag = None
+        self._checked_at = 0.0
+        self.counts = {'primary_reads': 0, 'replica_reads': 0, 'fallbacks': 0, 'pinned_reads': 0}
+
+    def _connect(self, target):
+        return mysql.connector.connect(
+            host=target['host'],
+            port=target.get('port', 3306),
+            user=target['user'] or self.primary['user'],
+            password=target['password'] or self.primary['password'],
+            database=self.primary['database']
+        )
+
+    def primary_connection(self):
+        return self._connect(self.primary)
+
+    def _replication_lag(self, connection):
+        """Seconds behind the source, or None if replication is not running"""
+        cursor = connection.cursor(dictionary=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except mysql.connector.Error:
+                cursor.execute("SHOW SLAVE STATUS")  # MySQL < 8.0.22
+            status = cursor.fetchone()
+        finally:
+            cursor.close()
+
+        if not status:
+            return None
+        running = status.get('Replica_SQL_Running', status.get('Slave_SQL_Running'))
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        if running != 'Yes' or lag is None:
+            return None
+        return float(lag)
+
+    def replica_healthy(self):
+        """Re-check replication lag if the last check is older than check_interval"""
+        if not self.replica:
+            return False
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return self._healthy
+        # Only one request re-checks; the others use the previous answer
+        if not self._lock.acquire(blocking=False):
+            return self._healthy
+        try:
+            try:
+                connection = self._connect(self.replica)
+                try:
+                    self._lag = self._replication_lag(connection)
+                finally:
+                    connection.close()
+            except mysql.connector.Error as e:
+                print(f"Replica check failed: {e}")
+                self._lag = None
+            self._healthy = self._lag is not None and self._lag <= self.max_lag
+            self._checked_at = time.monotonic()
+            return self._healthy
+        finally:
+            self._lock.release()
+
+    def read_connection(self, pin_primary=False):
+        """Connection for a read: the replica when healthy, otherwise the primary"""
+        if pin_primary:
+            self.counts['pinned_reads'] += 1
+        elif self.replica_healthy():
+            try:
+                connection = self._connect(self.replica)
+                self.counts['replica_reads'] += 1
+                return connection
+            except mysql.connector.Error as e:
+                print(f"Replica connection failed, using primary: {e}")
+                self._healthy = False
+                self.counts['fallbacks'] += 1
+        self.counts['primary_reads'] += 1
+        return self.primary_connection()
+
+    def status(self):
+        return {
+            'replica_configured': self.replica is not None,
+            'replica_healthy': self._healthy,
+            'replication_lag_seconds': self._lag,
+            'max_lag_seconds': self.max_lag,
+            'counts': dict(self.counts),
+        }
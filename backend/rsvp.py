@@ -0,0 +1,289 @@
+import json
+import time
+
+import mysql.connector
+from mysql.connector import errorcode
+
+# Statuses a user can ask for; 'Waitlisted' is only ever assigned
+REQUESTED_STATUSES = ('Going', 'Interested', 'Not Going')
+MAX_KEY_LENGTH = 64
+
+# Deadlocks and lock waits are retried with a short backoff
+MAX_RETRIES = 3
+RETRY_ERRORS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+# One conditional increment per seat; never matches once the event is full
+TAKE_SEAT = """
+    UPDATE event_capacity SET seats_taken = seats_taken + 1
+    WHERE event_id = %s AND (capacity IS NULL OR seats_taken < capacity)
+"""
+
+
+def run_transaction(connection, user_id, idempotency_key, action):
+    """Run action(cursor) -> (status code, body) in one transaction.
+
+    With an idempotency key, the key row is inserted first in the same
+    transaction. A concurrent retry blocks on that insert until the first
+    attempt commits and then replays its stored response; if the first
+    attempt rolled back, the retry simply runs.
+    """
+    for attempt in range(MAX_RETRIES):
+        cursor = connection.cursor(dictionary=True)
+        try:
+            connection.start_transaction()
+            if idempotency_key:
+                try:
+                    cursor.execute(
+                        "INSERT INTO rsvp_idempotency (user_id, idempotency_key) VALUES (%s, %s)",
+                        (user_id, idempotency_key)
+                    )
+                except mysql.connector.IntegrityError:
+                    cursor.execute(
+                        "SELECT status_code, response_body FROM rsvp_idempotency "
+                        "WHERE user_id = %s AND idempotency_key = %s",
+                        (user_id, idempotency_key)
+                    )
+                    stored = cursor.fetchone()
+                    connection.rollback()
+                    body = json.loads(stored['response_body'])
+                    body['replayed'] = True
+                    return stored['status_code'], body
+
+            status_code, body = action(cursor)
+
+            if idempotency_key:
+                cursor.execute(
+                    "UPDATE rsvp_idempotency SET status_code = %s, response_body = %s "
+                    "WHERE user_id = %s AND idempotency_key = %s",
+                    (status_code, json.dumps(body, default=str), user_id, idempotency_key)
+                )
+            connection.commit()
+            return status_code, body
+        except mysql.connector.Error as e:
+            connection.rollback()
+            if e.errno not in RETRY_ERRORS or attempt == MAX_RETRIES - 1:
+                raise
+            time.sleep(0.01 * 2 ** attempt)
+        finally:
+            cursor.close()
+
+
+def find_rsvp(cursor, user_id, event_id):
+    """Lock and return the user's RSVP for an event, or None"""
+    cursor.execute(
+        "SELECT RSVP_id, RSVP_status FROM RSVP WHERE user_id = %s AND event_id = %s FOR UPDATE",
+        (user_id, event_id)
+    )
+    return cursor.fetchone()
+
+
+def ensure_counter(connection, event_id):
+    """Create the event's seat counter if needed; False if the event does not exist.
+
+    Runs in its own short transaction ahead of the RSVP's. Creating the row
+    inside a burst of first RSVPs would leave them all holding locks on it
+    while queueing to update it.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT event_id FROM event_capacity WHERE event_id = %s", (event_id,))
+        if cursor.fetchone():
+            return True
+        cursor.execute(
+            """
+            INSERT IGNORE INTO event_capacity (event_id, capacity, seats_taken)
+            SELECT e.event_id, e.max_capacity,
+                   (SELECT COUNT(*) FROM RSVP r WHERE r.event_id = e.event_id AND r.RSVP_status = 'Going')
+            FROM Event e
+            WHERE e.event_id = %s
+            """,
+            (event_id,)
+        )
+        if cursor.rowcount:
+            return True
+        # Either another request created it first or there is no such event
+        cursor.execute("SELECT event_id FROM Event WHERE event_id = %s", (event_id,))
+        return cursor.fetchone() is not None
+    finally:
+        connection.commit()
+        cursor.close()
+
+
+def take_seat(cursor, event_id):
+    """Claim one seat; False when the event is full"""
+    cursor.execute(TAKE_SEAT, (event_id,))
+    return cursor.rowcount == 1
+
+
+def release_seat(cursor, event_id):
+    """Give a freed seat to the oldest waitlisted RSVP, or back to the counter.
+
+    The counter row is locked first. A request that just found the event
+    full still holds that lock until its waitlist row commits (under
+    REPEATABLE READ a non-matching UPDATE keeps its row lock), so the
+    waitlist query below always sees it. Returns the promoted RSVP id.
+    """
+    cursor.execute("SELECT seats_taken FROM event_capacity WHERE event_id = %s FOR UPDATE", (event_id,))
+    cursor.fetchone()
+    cursor.execute(
+        """
+        SELECT RSVP_id FROM RSVP
+        WHERE event_id = %s AND RSVP_status = 'Waitlisted'
+        ORDER BY status_changed_at, RSVP_id
+        LIMIT 1
+        FOR UPDATE
+        """,
+        (event_id,)
+    )
+    waiting = cursor.fetchone()
+    if waiting:
+        # The seat changes hands; seats_taken and the listing count stay the same
+        cursor.execute("UPDATE RSVP SET RSVP_status = 'Going' WHERE RSVP_id = %s", (waiting['RSVP_id'],))
+        return waiting['RSVP_id']
+
+    cursor.execute(
+        "UPDATE event_capacity SET seats_taken = seats_taken - 1 WHERE event_id = %s AND seats_taken > 0",
+        (event_id,)
+    )
+    adjust_listing(cursor, event_id, -1)
+    return None
+
+
+def adjust_listing(cursor, event_id, delta):
+    """Keep upcoming_event_listing.rsvp_count in step without re-aggregating"""
+    cursor.execute(
+        "UPDATE upcoming_event_listing SET rsvp_count = rsvp_count + %s WHERE event_id = %s",
+        (delta, event_id)
+    )
+
+
+def waitlist_position(cursor, rsvp_id, event_id):
+    cursor.execute(
+        """
+        SELECT COUNT(*) AS ahead FROM RSVP w
+        JOIN RSVP me ON me.RSVP_id = %s
+        WHERE w.event_id = %s AND w.RSVP_status = 'Waitlisted'
+          AND (w.status_changed_at, w.RSVP_id) <= (me.status_changed_at, me.RSVP_id)
+        """,
+        (rsvp_id, event_id)
+    )
+    return cursor.fetchone()['ahead']
+
+
+def rsvp_body(cursor, rsvp_id, event_id, status):
+    body = {'rsvp_id': rsvp_id, 'event_id': event_id, 'status': status}
+    if status == 'Waitlisted':
+        body['waitlist_position'] = waitlist_position(cursor, rsvp_id, event_id)
+    return body
+
+
+def check_status(status):
+    """Return an error (status code, body) for a status users cannot request, else None"""
+    if status not in REQUESTED_STATUSES:
+        return 400, {'error': f"status must be one of {', '.join(REQUESTED_STATUSES)}"}
+    return None
+
+
+def check_key(idempotency_key):
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+        return 400, {'error': f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"}
+    return None
+
+
+def create_rsvp(connection, user_id, event_id, status='Going', idempotency_key=None):
+    """RSVP a user to an event; 'Going' takes a seat or joins the waitlist"""
+    error = check_status(status) or check_key(idempotency_key)
+    if error:
+        return error
+    if not ensure_counter(connection, event_id):
+        return 404, {'error': 'Event not found'}
+
+    def action(cursor):
+        # Insert first and let the unique (user_id, event_id) index reject
+        # duplicates; a locking existence check would take gap locks that
+        # deadlock concurrent RSVPs. 'Going' is inserted as 'Interested' so a
+        # waitlist scan in release_seat never waits on a row still deciding.
+        try:
+            cursor.execute(
+                "INSERT INTO RSVP (RSVP_status, user_id, event_id) VALUES (%s, %s, %s)",
+                ('Interested' if status == 'Going' else status, user_id, event_id)
+            )
+        except mysql.connector.IntegrityError as e:
+            if e.errno == errorcode.ER_NO_REFERENCED_ROW_2:
+                return 404, {'error': 'Event not found'}
+            if e.errno != errorcode.ER_DUP_ENTRY:
+                raise
+            existing = find_rsvp(cursor, user_id, event_id)
+            return 409, {'error': 'RSVP already exists; use PUT to change it',
+                         'rsvp_id': existing['RSVP_id'], 'status': existing['RSVP_status']}
+        rsvp_id = cursor.lastrowid
+
+        new_status = status
+        if status == 'Going':
+            new_status = 'Going' if take_seat(cursor, event_id) else 'Waitlisted'
+            cursor.execute("UPDATE RSVP SET RSVP_status = %s WHERE RSVP_id = %s", (new_status, rsvp_id))
+            if new_status == 'Going':
+                adjust_listing(cursor, event_id, 1)
+        return 201, rsvp_body(cursor, rsvp_id, event_id, new_status)
+
+    return run_transaction(connection, user_id, idempotency_key, action)
+
+
+def update_rsvp(connection, user_id, event_id, status, idempotency_key=None):
+    """Change an RSVP's status, moving seats and the waitlist as needed"""
+    error = check_status(status) or check_key(idempotency_key)
+    if error:
+        return error
+    if status == 'Going' and not ensure_counter(connection, event_id):
+        return 404, {'error': 'Event not found'}
+
+    def action(cursor):
+        existing = find_rsvp(cursor, user_id, event_id)
+        if not existing:
+            return 404, {'error': 'RSVP not found'}
+
+        rsvp_id, old_status = existing['RSVP_id'], existing['RSVP_status']
+        if status == old_status or (status == 'Going' and old_status == 'Waitlisted'):
+            return 200, rsvp_body(cursor, rsvp_id, event_id, old_status)
+
+        promoted = None
+        if old_status == 'Going':
+            promoted = release_seat(cursor, event_id)
+
+        new_status = status
+        if status == 'Going':
+            new_status = 'Going' if take_seat(cursor, event_id) else 'Waitlisted'
+
+        cursor.execute(
+            "UPDATE RSVP SET RSVP_status = %s, status_changed_at = CURRENT_TIMESTAMP(6) WHERE RSVP_id = %s",
+            (new_status, rsvp_id)
+        )
+        if new_status == 'Going':
+            adjust_listing(cursor, event_id, 1)
+
+        body = rsvp_body(cursor, rsvp_id, event_id, new_status)
+        body['promoted_rsvp_id'] = promoted
+        return 200, body
+
+    return run_transaction(connection, user_id, idempotency_key, action)
+
+
+def cancel_rsvp(connection, user_id, event_id, idempotency_key=None):
+    """Remove an RSVP; a released seat goes to the head of the waitlist"""
+    error = check_key(idempotency_key)
+    if error:
+        return error
+
+    def action(cursor):
+        existing = find_rsvp(cursor, user_id, event_id)
+        if not existing:
+            return 404, {'error': 'RSVP not found'}
+
+        promoted = None
+        if existing['RSVP_status'] == 'Going':
+            promoted = release_seat(cursor, event_id)
+        cursor.execute("DELETE FROM RSVP WHERE RSVP_id = %s", (existing['RSVP_id'],))
+        return 200, {'message': 'RSVP cancelled', 'rsvp_id': existing['RSVP_id'],
+                     'promoted_rsvp_id': promoted}
+
+    return run_transaction(connection, user_id, idempotency_key, action)
@@ -0,0 +1,230 @@
+'''
+rsvp_load_test.py
+Fires concurrent RSVPs at one event and checks that it never overbooks.
+
+Creates a throwaway location, event and users, then:
+  1. releases --requests 'Going' RSVPs at once from --workers threads
+     (one connection each), each with its own Idempotency-Key
+  2. replays a sample of those requests with the same keys
+  3. cancels some seats concurrently to exercise waitlist promotion
+and verifies the seat counter, RSVP rows and waitlist after each phase.
+Everything it created is deleted at the end.
+
+    python rsvp_load_test.py --requests 1000 --capacity 100 --workers 200
+
+MySQL's default max_connections (151) caps --workers; raise it to give all
+1,000 requests their own connection.
+'''
+import argparse
+import statistics
+import sys
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+import mysql.connector
+
+from db_router import load_config
+from rsvp import create_rsvp, cancel_rsvp
+
+
+def connect(config):
+    return mysql.connector.connect(
+        host=config['host'],
+        user=config['user'],
+        password=config['password'],
+        database=config['database']
+    )
+
+
+def setup(connection, run_id, users, capacity):
+    """Create a location, an event with `capacity` seats and `users` users"""
+    cursor = connection.cursor()
+    cursor.execute(
+        "INSERT INTO Location (venue_name, address, city, zip_code) VALUES (%s, %s, %s, %s)",
+        (f"Load Test Hall {run_id}", '1 Test St', 'Portland', '04101')
+    )
+    location_id = cursor.lastrowid
+    cursor.execute(
+        """
+        INSERT INTO Event (event_name, event_date, start_time, end_time, max_capacity, location_id)
+        VALUES (%s, %s, '19:00:00', '21:00:00', %s, %s)
+        """,
+        (f"RSVP load test {run_id}", date.today() + timedelta(days=30), capacity, location_id)
+    )
+    event_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO User (username, email, password_hash) VALUES (%s, %s, 'x')",
+        [(f"load_{run_id}_{i}", f"load_{run_id}_{i}@example.com") for i in range(users)]
+    )
+    cursor.execute("SELECT user_id FROM User WHERE username LIKE %s ORDER BY user_id", (f"load_{run_id}_%",))
+    user_ids = [row[0] for row in cursor.fetchall()]
+    connection.commit()
+    cursor.close()
+    return location_id, event_id, user_ids
+
+
+def cleanup(connection, run_id, location_id, event_id, user_ids):
+    cursor = connection.cursor()
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    cursor.execute("DELETE FROM RSVP WHERE event_id = %s", (event_id,))
+    cursor.execute(f"DELETE FROM rsvp_idempotency WHERE user_id IN ({placeholders})", tuple(user_ids))
+    cursor.execute("DELETE FROM event_capacity WHERE event_id = %s", (event_id,))
+    cursor.execute("DELETE FROM Event WHERE event_id = %s", (event_id,))
+    cursor.execute("DELETE FROM Location WHERE location_id = %s", (location_id,))
+    cursor.execute("DELETE FROM User WHERE username LIKE %s", (f"load_{run_id}_%",))
+    connection.commit()
+    cursor.close()
+
+
+def run_concurrently(config, calls, workers):
+    """Run calls (fn(connection) -> result) across `workers` threads released together.
+
+    Returns [(result, seconds)] in call order and the wall-clock time.
+    """
+    results = [None] * len(calls)
+    workers = min(workers, len(calls))
+    barrier = threading.Barrier(workers + 1)
+    errors = []
+
+    def worker(index):
+        connection = connect(config)
+        try:
+            barrier.wait()
+            for i in range(index, len(calls), workers):
+                started = time.perf_counter()
+                try:
+                    result = calls[i](connection)
+                except mysql.connector.Error as e:
+                    errors.append(e)
+                    result = (500, {'error': str(e)})
+                results[i] = (result, time.perf_counter() - started)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()  # every worker is connected; start the clock
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    for e in errors[:5]:
+        print(f"  Error: {e}")
+    return results, elapsed
+
+
+def event_state(connection, event_id):
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(
+        "SELECT RSVP_status, COUNT(*) AS count FROM RSVP WHERE event_id = %s GROUP BY RSVP_status",
+        (event_id,)
+    )
+    statuses = {row['RSVP_status']: row['count'] for row in cursor.fetchall()}
+    cursor.execute("SELECT capacity, seats_taken FROM event_capacity WHERE event_id = %s", (event_id,))
+    counter = cursor.fetchone() or {'capacity': None, 'seats_taken': None}
+    connection.commit()
+    cursor.close()
+    return statuses, counter
+
+
+def check(label, condition, failures):
+    print(f"  [{'ok' if condition else 'FAIL'}] {label}")
+    if not condition:
+        failures.append(label)
+
+
+def report_latency(label, results, elapsed):
+    if not results:
+        print(f"{label}: no requests")
+        return
+    latencies = sorted(seconds * 1000 for _, seconds in results)
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    print(f"{label}: {len(results)} requests in {elapsed:.2f}s "
+          f"({len(results) / elapsed:.0f}/s), latency p50 {cuts[49]:.1f}ms, "
+          f"p95 {cuts[94]:.1f}ms, p99 {cuts[98]:.1f}ms, max {latencies[-1]:.1f}ms")
+
+
+def run_load_test(config, requests, capacity, workers, replays, cancels):
+    run_id = uuid.uuid4().hex[:8]
+    failures = []
+    connection = connect(config)
+    location_id, event_id, user_ids = setup(connection, run_id, requests, capacity)
+    print(f"Event {event_id}: {capacity} seats, {requests} users, {workers} workers")
+
+    try:
+        # 1. Everyone RSVPs 'Going' at once
+        calls = [lambda conn, uid=uid: create_rsvp(conn, uid, event_id, 'Going', f"load-{uid}")
+                 for uid in user_ids]
+        results, elapsed = run_concurrently(config, calls, workers)
+        report_latency("Create", results, elapsed)
+
+        granted = sum(1 for (code, body), _ in results if code == 201 and body['status'] == 'Going')
+        waitlisted = sum(1 for (code, body), _ in results if code == 201 and body['status'] == 'Waitlisted')
+        statuses, counter = event_state(connection, event_id)
+        check(f"{granted} seats granted, expected {min(capacity, requests)}",
+              granted == min(capacity, requests), failures)
+        check(f"{waitlisted} waitlisted, expected {max(requests - capacity, 0)}",
+              waitlisted == max(requests - capacity, 0), failures)
+        check(f"Going rows ({statuses.get('Going', 0)}) = seats_taken ({counter['seats_taken']}) <= capacity",
+              statuses.get('Going', 0) == counter['seats_taken'] <= capacity, failures)
+
+        # 2. Retries with the same Idempotency-Key replay the first answer
+        sample = list(zip(user_ids, results))[:replays]
+        calls = [lambda conn, uid=uid: create_rsvp(conn, uid, event_id, 'Going', f"load-{uid}")
+                 for uid, _ in sample]
+        replayed, elapsed = run_concurrently(config, calls, workers)
+        report_latency("Replay", replayed, elapsed)
+        same = all(again[0][1].get('replayed') and again[0][1]['status'] == first[0][1]['status']
+                   for (_, first), again in zip(sample, replayed))
+        after_statuses, _ = event_state(connection, event_id)
+        check(f"{len(replayed)} retries replayed their original status", same, failures)
+        check("Retries created no RSVP rows", after_statuses == statuses, failures)
+
+        # 3. Cancelled seats go to the head of the waitlist
+        going = [uid for uid, ((code, body), _) in zip(user_ids, results)
+                 if code == 201 and body['status'] == 'Going'][:cancels]
+        calls = [lambda conn, uid=uid: cancel_rsvp(conn, uid, event_id) for uid in going]
+        cancelled, elapsed = run_concurrently(config, calls, workers)
+        report_latency("Cancel", cancelled, elapsed)
+        promoted = sum(1 for (code, body), _ in cancelled if code == 200 and body['promoted_rsvp_id'])
+        statuses, counter = event_state(connection, event_id)
+        expected_promoted = min(len(going), waitlisted)
+        check(f"{promoted} waitlisted RSVPs promoted, expected {expected_promoted}",
+              promoted == expected_promoted, failures)
+        check(f"Going rows ({statuses.get('Going', 0)}) = seats_taken ({counter['seats_taken']}) <= capacity",
+              statuses.get('Going', 0) == counter['seats_taken'] <= capacity, failures)
+        check(f"Waitlist holds {statuses.get('Waitlisted', 0)}, expected {waitlisted - expected_promoted}",
+              statuses.get('Waitlisted', 0) == waitlisted - expected_promoted, failures)
+    finally:
+        cleanup(connection, run_id, location_id, event_id, user_ids)
+        connection.close()
+
+    return failures
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Concurrent RSVP load test against one event')
+    parser.add_argument('--requests', type=int, default=1000, help='Concurrent RSVPs (one user each)')
+    parser.add_argument('--capacity', type=int, default=100, help='Seats on the test event')
+    parser.add_argument('--workers', type=int, default=100, help='Threads, each with its own connection')
+    parser.add_argument('--replays', type=int, default=100, help='Requests retried with the same key')
+    parser.add_argument('--cancels', type=int, default=10, help='Seats cancelled to test promotion')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    failures = run_load_test(load_config(), args.requests, args.capacity,
+                             args.workers, args.replays, args.cancels)
+    print(f"{'=' * 60}")
+    print("All checks passed" if not failures else f"{len(failures)} check(s) failed")
+    print(f"{'=' * 60}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import threading
+
+
+class SingleFlightTimeout(Exception):
+    """Raised to a waiter whose in-flight computation did not finish in time"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces identical concurrent computations.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive with the same key while it is running wait for and share its
+    result, or its exception. Nothing is cached once the call finishes.
+
+    Keys are tuples whose first element names the endpoint, which is also
+    how the counters in `stats()` are grouped.
+    """
+
+    def __init__(self, timeout=15):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def _count(self, key, field, amount=1):
+        counts = self._counts.setdefault(key[0], {
+            'leaders': 0,
+            'coalesced': 0,
+            'max_waiters': 0,
+            'timeouts': 0,
+            'errors': 0,
+        })
+        counts[field] += amount
+        return counts
+
+    def do(self, key, fn, timeout=None):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self._count(key, 'leaders')
+                leader = True
+            else:
+                call.waiters += 1
+                self._count(key, 'coalesced')
+                leader = False
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                    counts = self._count(key, 'errors', 1 if call.error else 0)
+                    counts['max_waiters'] = max(counts['max_waiters'], call.waiters)
+                call.done.set()
+        elif not call.done.wait(timeout or self.timeout):
+            with self._lock:
+                self._count(key, 'timeouts')
+            raise SingleFlightTimeout(f"Timed out waiting for in-flight {key[0]} query")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'waiting': sum(call.waiters for call in self._calls.values()),
+                'endpoints': {name: dict(counts) for name, counts in self._counts.items()},
+            }